@@ -43,6 +43,55 @@ try:
 except NameError:
    pass
 
+# Optional lambda parameters that are copied from config.json into the lambda environment when present
+OPTIONAL_LAMBDA_PARAMS = [
+    "PARAM_NUM_REQUESTS",
+    "PARAM_CAPTURE_QUEUE_SIZE",
+    "PARAM_PUBLISH_QUEUE_SIZE",
+    "PARAM_PUBLISH_OVERFLOW",
+    "PARAM_BATCH_SIZE",
+    "PARAM_BATCH_MAX_WAIT",
+    "PARAM_MIN_CONFIDENCE",
+    "PARAM_REPORT_MODE",
+    "PARAM_STREAM_SCHEDULE",
+    "PARAM_NETWORK_CACHE_DIR",
+    "PARAM_NETWORK_CACHE_SIZE_MB",
+    "PARAM_NUM_WORKERS",
+    "PARAM_DECODE_PROCESSES",
+    "PARAM_METRICS",
+    "PARAM_METRICS_INTERVAL",
+    "PARAM_METRICS_TOPIC",
+    "PARAM_TARGET_FPS",
+    "PARAM_TARGET_LATENCY",
+    "PARAM_MAX_STALENESS",
+    "PARAM_MOTION_THRESHOLD",
+    "PARAM_MOTION_REFRESH",
+    "PARAM_DETECT_EVERY",
+    "PARAM_TRACKING",
+    "PARAM_ROIS",
+    "PARAM_NMS_IOU",
+    "PARAM_NMS_MODE",
+    "PARAM_NMS_MERGE",
+    "PARAM_MAX_DETECTIONS",
+    "PARAM_DECODE_BACKEND",
+    "PARAM_DECODE_WIDTH",
+    "PARAM_DECODE_HEIGHT",
+    "PARAM_DECODE_KEYFRAMES_ONLY",
+    "PARAM_SNAPSHOT_WIDTH",
+    "PARAM_SNAPSHOT_QUALITY",
+    "PARAM_SNAPSHOT_BUDGET_KB",
+    "PARAM_S3_BATCH_SIZE",
+    "PARAM_S3_BATCH_SECONDS",
+    "PARAM_S3_UPLOAD_ATTEMPTS",
+    "PARAM_S3_MAX_PENDING_MB",
+    "PARAM_KINESIS_PARTITION",
+    "PARAM_KINESIS_BATCH_RECORDS",
+    "PARAM_KINESIS_BATCH_SECONDS",
+    "PARAM_KINESIS_ATTEMPTS",
+    "PARAM_PAYLOAD_CODEC",
+    "PARAM_PAYLOAD_CODEC_FALLBACK",
+]
+
 def build_argparser():
     parser = ArgumentParser()
     parser.add_argument("-l", "--lambda_file", help="Path to the python script with the lambda function", required=True, type=str)
@@ -410,6 +459,11 @@ def main():
         print("[ERROR]: Folder: greengrasssdk is not found")
         sys.exit(-1)
     
+    # Check if the shared faas_common package exists
+    if not os.path.isdir("./faas_common"):
+        print("[ERROR]: Folder: faas_common is not found")
+        sys.exit(-1)
+    
     # Check if lambda file exists
     if not os.path.isfile(args.lambda_file):
         print("[ERROR]: Lambda file: {0} is not found".format(args.lambda_file))
@@ -420,12 +474,13 @@ def main():
         print("[ERROR]: Config file: {0} is not found".format(args.config_file))
         sys.exit(-1)
     
-    # Zip lambda function along with greengrasssdk folder
+    # Zip lambda function along with greengrasssdk and faas_common folders
     cmd = [
         "zip",
         "-r",
         lambda_zip,
         "greengrasssdk",
+        "faas_common",
         args.lambda_file
     ]
     output = execute_command(cmd)
@@ -638,6 +693,12 @@ def main():
         function = function_definition_dict["InitialVersion"]["Functions"][0]
         function["FunctionConfiguration"]["Environment"]["Variables"]["PARAM_LABELMAP_FILE"] = labelmap_file_name
 
+    # Add optional parameters provided in the config file to the dict
+    for param_name in OPTIONAL_LAMBDA_PARAMS:
+        if param_name in config_dict:
+            function = function_definition_dict["InitialVersion"]["Functions"][0]
+            function["FunctionConfiguration"]["Environment"]["Variables"][param_name] = str(config_dict[param_name])
+
     if "FPGA" in param_device:
         function = function_definition_dict["InitialVersion"]["Functions"][0]
         function["FunctionConfiguration"]["Environment"]["Variables"]["DLA_AOCX"] = dla_aocx
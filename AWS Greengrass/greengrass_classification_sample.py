@@ -31,16 +31,37 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import sys
 import os
-import cv2
 import numpy as np
 import greengrasssdk
 import boto3
 import timeit
 import datetime
 import json
+import threading
 from collections import OrderedDict 
 
-from openvino.inference_engine import IENetwork, IEPlugin
+from openvino.inference_engine import IEPlugin
+
+# Make the shared faas_common package importable when running from a source checkout
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.aggregation import ClassificationAggregator, REPORT_AGGREGATE, REPORT_LAST
+from faas_common.batching import FrameBatcher, split_classification_output
+from faas_common.bounded_queue import DROP_OLDEST
+from faas_common.classification import top_k
+from faas_common.decode import DecodeOptions, BACKEND_DEFAULT
+from faas_common.frame_skipping import AdaptiveFrameSkipper, INFER, REUSE, CACHED
+from faas_common.inference import InferRequestRing, next_frame_timeout
+from faas_common.metrics import StageMetrics
+from faas_common.motion_gate import MotionGate
+from faas_common.network_cache import NetworkCache, load_network
+from faas_common.preprocess import Preprocessor
+from faas_common.publisher import Publisher
+from faas_common.snapshots import SnapshotEncoder, SnapshotSink
+from faas_common.uploads import S3Uploader
+from faas_common.kinesis import KinesisSink
+from faas_common.payloads import PayloadCodec
+from faas_common.streams import MultiStreamCapture, SCHEDULE_ROUND_ROBIN, split_sources
+from faas_common.worker_pool import InferenceWorkerPool
 
 # Specify the delta in seconds between each report
 reporting_interval = 1.0
@@ -81,96 +102,321 @@ PARAM_CPU_EXTENSION_PATH = os.environ.get("PARAM_CPU_EXTENSION_PATH")
 PARAM_LABELMAP_FILE = os.environ.get("PARAM_LABELMAP_FILE")
 PARAM_TOPIC_NAME = os.environ.get("PARAM_TOPIC_NAME", "intel/faas/classification")
 PARAM_NUM_TOP_RESULTS = int(os.environ.get("PARAM_NUM_TOP_RESULTS", "10"))
+# Candidates scoring below this probability are left out of the top results
+PARAM_MIN_CONFIDENCE = float(os.environ.get("PARAM_MIN_CONFIDENCE", "0"))
+PARAM_NUM_REQUESTS = int(os.environ.get("PARAM_NUM_REQUESTS", "2"))
+# Frames per infer request and the longest time in seconds a partial batch waits for more frames
+PARAM_BATCH_SIZE = int(os.environ.get("PARAM_BATCH_SIZE", "1"))
+PARAM_BATCH_MAX_WAIT = float(os.environ.get("PARAM_BATCH_MAX_WAIT", "0.1"))
+# Report the results of the last frame of each interval, or a summary of all its frames (last or aggregate)
+PARAM_REPORT_MODE = os.environ.get("PARAM_REPORT_MODE", REPORT_LAST)
+# Frames buffered between the decode thread and the inference loop (1 for live sources, 4 for files by default)
+PARAM_CAPTURE_QUEUE_SIZE = os.environ.get("PARAM_CAPTURE_QUEUE_SIZE")
+# Number of worker processes, each pinned to a NUMA node with its own loaded network (1 infers in this process)
+PARAM_NUM_WORKERS = int(os.environ.get("PARAM_NUM_WORKERS", "1"))
+# Directory and size bound of the cache of compiled networks (cache disabled if the size is 0)
+PARAM_NETWORK_CACHE_DIR = os.environ.get("PARAM_NETWORK_CACHE_DIR",
+                                         os.path.join(PARAM_OUTPUT_DIRECTORY, "network_cache") if PARAM_OUTPUT_DIRECTORY else None)
+PARAM_NETWORK_CACHE_SIZE_MB = int(os.environ.get("PARAM_NETWORK_CACHE_SIZE_MB", "512"))
+# Decode every source in its own process into shared memory instead of a thread (true or false)
+PARAM_DECODE_PROCESSES = os.environ.get("PARAM_DECODE_PROCESSES", "false").lower() == "true"
+# Decode with the default, gstreamer or ffmpeg backend at PARAM_DECODE_WIDTH x PARAM_DECODE_HEIGHT (0 keeps the source
+# size), with gstreamer only the keyframes if PARAM_DECODE_KEYFRAMES_ONLY; unavailable backends fall back to default
+PARAM_DECODE_BACKEND = os.environ.get("PARAM_DECODE_BACKEND", BACKEND_DEFAULT)
+PARAM_DECODE_WIDTH = int(os.environ.get("PARAM_DECODE_WIDTH", "0"))
+PARAM_DECODE_HEIGHT = int(os.environ.get("PARAM_DECODE_HEIGHT", "0"))
+PARAM_DECODE_KEYFRAMES_ONLY = os.environ.get("PARAM_DECODE_KEYFRAMES_ONLY", "false").lower() == "true"
+# Infer at most PARAM_TARGET_FPS frames per second and stream, and skip frames while the infer latency exceeds
+# PARAM_TARGET_LATENCY seconds (0 disables either). Skipped frames reuse the last result of their stream if it is
+# at most PARAM_MAX_STALENESS seconds old and are dropped otherwise.
+PARAM_TARGET_FPS = float(os.environ.get("PARAM_TARGET_FPS", "0"))
+PARAM_TARGET_LATENCY = float(os.environ.get("PARAM_TARGET_LATENCY", "0"))
+PARAM_MAX_STALENESS = float(os.environ.get("PARAM_MAX_STALENESS", "1.0"))
+# Carry the last result forward while less than PARAM_MOTION_THRESHOLD of a downsampled frame changed since the last
+# inferred frame of its stream (0 infers static scenes too), renewing it every PARAM_MOTION_REFRESH seconds
+PARAM_MOTION_THRESHOLD = float(os.environ.get("PARAM_MOTION_THRESHOLD", "0"))
+PARAM_MOTION_REFRESH = float(os.environ.get("PARAM_MOTION_REFRESH", "60"))
+# Order in which the streams of a comma-separated PARAM_INPUT_SOURCE share the network (round_robin or fair)
+PARAM_STREAM_SCHEDULE = os.environ.get("PARAM_STREAM_SCHEDULE", SCHEDULE_ROUND_ROBIN)
+
+# Reports buffered per output sink and the policy applied when a sink falls behind (drop_oldest, drop_newest or block)
+PARAM_PUBLISH_QUEUE_SIZE = int(os.environ.get("PARAM_PUBLISH_QUEUE_SIZE", "8"))
+PARAM_PUBLISH_OVERFLOW = os.environ.get("PARAM_PUBLISH_OVERFLOW", DROP_OLDEST)
+# Record per-stage latency histograms (true or false, switchable at runtime through the function handler),
+# published every PARAM_METRICS_INTERVAL seconds on PARAM_METRICS_TOPIC
+PARAM_METRICS = os.environ.get("PARAM_METRICS", "false").lower() == "true"
+PARAM_METRICS_INTERVAL = float(os.environ.get("PARAM_METRICS_INTERVAL", "10"))
+PARAM_METRICS_TOPIC = os.environ.get("PARAM_METRICS_TOPIC", PARAM_TOPIC_NAME + "/metrics")
+metrics = StageMetrics(enabled=PARAM_METRICS)
+# JPEG snapshots of reported frames are encoded once in memory, downscaled to PARAM_SNAPSHOT_WIDTH pixels (0 keeps the
+# size) at PARAM_SNAPSHOT_QUALITY, which is lowered as needed to stay within PARAM_SNAPSHOT_BUDGET_KB per minute
+# (0 for no budget)
+PARAM_SNAPSHOT_WIDTH = int(os.environ.get("PARAM_SNAPSHOT_WIDTH", "0"))
+PARAM_SNAPSHOT_QUALITY = int(os.environ.get("PARAM_SNAPSHOT_QUALITY", "95"))
+PARAM_SNAPSHOT_BUDGET_KB = int(os.environ.get("PARAM_SNAPSHOT_BUDGET_KB", "0"))
+snapshot_encoder = SnapshotEncoder(PARAM_SNAPSHOT_WIDTH, PARAM_SNAPSHOT_QUALITY, PARAM_SNAPSHOT_BUDGET_KB << 10)
+# Snapshots are uploaded to S3 from memory, PARAM_S3_BATCH_SIZE per request as a tar archive or after
+# PARAM_S3_BATCH_SECONDS, with PARAM_S3_UPLOAD_ATTEMPTS attempts and at most PARAM_S3_MAX_PENDING_MB kept for retries
+PARAM_S3_BATCH_SIZE = int(os.environ.get("PARAM_S3_BATCH_SIZE", "1"))
+PARAM_S3_BATCH_SECONDS = float(os.environ.get("PARAM_S3_BATCH_SECONDS", "5"))
+PARAM_S3_UPLOAD_ATTEMPTS = int(os.environ.get("PARAM_S3_UPLOAD_ATTEMPTS", "3"))
+PARAM_S3_MAX_PENDING_MB = int(os.environ.get("PARAM_S3_MAX_PENDING_MB", "16"))
+# Reports are put to Kinesis with PutRecords, PARAM_KINESIS_BATCH_RECORDS at a time or after PARAM_KINESIS_BATCH_SECONDS,
+# partitioned by source "stream", by "frame" or with the "fixed" kinesis_partition_key
+PARAM_KINESIS_PARTITION = os.environ.get("PARAM_KINESIS_PARTITION", "stream")
+PARAM_KINESIS_BATCH_RECORDS = int(os.environ.get("PARAM_KINESIS_BATCH_RECORDS", "500"))
+PARAM_KINESIS_BATCH_SECONDS = float(os.environ.get("PARAM_KINESIS_BATCH_SECONDS", "1"))
+PARAM_KINESIS_ATTEMPTS = int(os.environ.get("PARAM_KINESIS_ATTEMPTS", "3"))
+# Results are published to IoT Cloud and Kinesis as "json", "msgpack" or "packed" binary records of the detections
+PARAM_PAYLOAD_CODEC = os.environ.get("PARAM_PAYLOAD_CODEC", "json")
+# "json" or "packed" to publish instead of "msgpack" where the msgpack package is missing, which fails otherwise
+PARAM_PAYLOAD_CODEC_FALLBACK = os.environ.get("PARAM_PAYLOAD_CODEC_FALLBACK") or None
+payload_codec = PayloadCodec(PARAM_PAYLOAD_CODEC, PARAM_PAYLOAD_CODEC_FALLBACK)
+
+# The inference workers and the decode processes are forked here, before the publisher threads start or a plugin is
+# loaded: a process forked while another thread holds a lock deadlocks on it. The workers load their networks while
+# the module finishes loading.
+startup_time = timeit.default_timer()
+cpu_extension = PARAM_CPU_EXTENSION_PATH if "CPU" in PARAM_DEVICE else None
+cache_size = PARAM_NETWORK_CACHE_SIZE_MB << 20 if PARAM_NETWORK_CACHE_DIR else 0
+worker_pool = None
+if PARAM_NUM_WORKERS > 1:
+    # Fan inference out to worker processes pinned to NUMA nodes, each loading its own network
+    worker_pool = InferenceWorkerPool(PARAM_NUM_WORKERS, PARAM_MODEL_XML, PARAM_DEVICE, PARAM_BATCH_SIZE, cpu_extension,
+                                      slots_per_worker=PARAM_NUM_REQUESTS, cache_dir=PARAM_NETWORK_CACHE_DIR,
+                                      cache_size=cache_size)
+# One decode thread (or process) per source, all served by the same executable network.
+# Frames decoded into shared memory are held by the batches in flight and the one being filled until released.
+cap = MultiStreamCapture(split_sources(PARAM_INPUT_SOURCE),
+                         int(PARAM_CAPTURE_QUEUE_SIZE) if PARAM_CAPTURE_QUEUE_SIZE else None,
+                         schedule=PARAM_STREAM_SCHEDULE, decode_processes=PARAM_DECODE_PROCESSES,
+                         hold_frames=PARAM_BATCH_SIZE * (PARAM_NUM_REQUESTS * PARAM_NUM_WORKERS + 1),
+                         decode=DecodeOptions(PARAM_DECODE_BACKEND, PARAM_DECODE_WIDTH, PARAM_DECODE_HEIGHT,
+                                              PARAM_DECODE_KEYFRAMES_ONLY))
+# The decode processes start decoding once the inference loop starts the capture
+cap.fork_decoders()
+
+# Output sinks, each called with a Report from its own publisher thread
+def publish_iot_cloud(report):
+    data = payload_codec.encode(report.payload)
+    client.publish(topic=PARAM_TOPIC_NAME, payload=data)
+
+# Snapshot outputs, each called with the Report and its JPEG bytes
+def write_local_jpeg(report, jpeg):
+    date_prefix = str(report.timestamp).replace(" ", "_")
+    with open(os.path.join(PARAM_OUTPUT_DIRECTORY, date_prefix + ".jpeg"), "wb") as jpeg_file:
+        jpeg_file.write(jpeg)
+
+sinks = OrderedDict()
+if enable_iot_cloud_output:
+    sinks["iot_cloud"] = publish_iot_cloud
+if enable_kinesis_output:
+    kinesis_sink = KinesisSink(kinesis_client, kinesis_stream_name, PARAM_KINESIS_PARTITION, kinesis_partition_key,
+                               PARAM_KINESIS_BATCH_RECORDS, max_delay=PARAM_KINESIS_BATCH_SECONDS,
+                               attempts=PARAM_KINESIS_ATTEMPTS, encode=payload_codec.encode)
+    sinks["kinesis"] = kinesis_sink
+snapshot_outputs = OrderedDict()
+if enable_local_jpeg_output:
+    snapshot_outputs["local_jpeg"] = write_local_jpeg
+if enable_s3_jpeg_output:
+    s3_uploader = S3Uploader(s3_client, s3_bucket_name, PARAM_S3_BATCH_SIZE, PARAM_S3_BATCH_SECONDS,
+                             PARAM_S3_UPLOAD_ATTEMPTS, max_pending_bytes=PARAM_S3_MAX_PENDING_MB << 20)
+    snapshot_outputs["s3"] = s3_uploader
+if snapshot_outputs:
+    # Encode each reported frame once, on the thread of the snapshot sink, for all snapshot outputs
+    sinks["snapshots"] = SnapshotSink(snapshot_encoder, snapshot_outputs)
+publisher = Publisher(sinks, PARAM_PUBLISH_QUEUE_SIZE, PARAM_PUBLISH_OVERFLOW, metrics)
 
 def report(res_json, frame):
-    now = datetime.datetime.now()
-    date_prefix = str(now).replace(" ", "_")
-    if enable_iot_cloud_output:
-        data = json.dumps(res_json)
-        client.publish(topic=PARAM_TOPIC_NAME, payload=data)
-    if enable_kinesis_output:
-        kinesis_client.put_record(StreamName=kinesis_stream_name, Data=json.dumps(res_json), PartitionKey=kinesis_partition_key)
-    if enable_s3_jpeg_output:
-        temp_image = os.path.join(PARAM_OUTPUT_DIRECTORY, "inference_result.jpeg")
-        cv2.imwrite(temp_image, frame)
-        with open(temp_image) as file:
-            image_contents = file.read()
-            s3_client.put_object(Body=image_contents, Bucket=s3_bucket_name, Key=date_prefix + ".jpeg") 
-    if enable_local_jpeg_output:
-        cv2.imwrite(os.path.join(PARAM_OUTPUT_DIRECTORY, date_prefix + ".jpeg"), frame)
+    # Hand the report over to the publisher threads so that cloud round-trips do not stall inference
+    publisher.publish(res_json, frame)
 
     
 def greengrass_classification_sample_run():
     client.publish(topic=PARAM_TOPIC_NAME, payload="OpenVINO: Initializing...")
-    model_bin = os.path.splitext(PARAM_MODEL_XML)[0] + ".bin"
-
-    # Plugin initialization for specified device and load extensions library if specified
-    plugin = IEPlugin(device=PARAM_DEVICE, plugin_dirs="")
-    if "CPU" in PARAM_DEVICE:
-        plugin.add_cpu_extension(PARAM_CPU_EXTENSION_PATH)
-    # Read IR
-    net = IENetwork.from_ir(model=PARAM_MODEL_XML, weights=model_bin)
-    assert len(net.inputs.keys()) == 1, "Sample supports only single input topologies"
-    assert len(net.outputs) == 1, "Sample supports only single output topologies"
-    input_blob = next(iter(net.inputs))
-    out_blob = next(iter(net.outputs))
-    # Read and pre-process input image
-    n, c, h, w = net.inputs[input_blob].shape
-    cap = cv2.VideoCapture(PARAM_INPUT_SOURCE)
-    exec_net = plugin.load(network=net)
-    del net
+    if worker_pool is not None:
+        # Wait for the workers forked at module init to load their networks
+        infer_ring = worker_pool
+        startup = OrderedDict(infer_ring.wait_ready())
+        input_blob, out_blob, (n, c, h, w) = infer_ring.input_blob, infer_ring.out_blob, infer_ring.shape
+    else:
+        # Plugin initialization for specified device and load extensions library if specified
+        plugin = IEPlugin(device=PARAM_DEVICE, plugin_dirs="")
+        if cpu_extension:
+            plugin.add_cpu_extension(cpu_extension)
+        startup = OrderedDict([("plugin", timeit.default_timer() - startup_time)])
+        # Read IR and load it with PARAM_BATCH_SIZE frames per infer request, or import the network compiled on a previous start
+        cache = NetworkCache(PARAM_NETWORK_CACHE_DIR, cache_size) if cache_size else None
+        # One infer request more than kept in flight, the next batch is pre-processed into its input blob
+        exec_net, input_blob, out_blob, (n, c, h, w), load_timings = load_network(
+            plugin, PARAM_MODEL_XML, PARAM_DEVICE, PARAM_NUM_REQUESTS + 1, PARAM_BATCH_SIZE, cpu_extension, cache)
+        startup.update(load_timings)
+        infer_ring = InferRequestRing(exec_net, PARAM_NUM_REQUESTS)
+    startup["decode_backends"] = [stream.decode_backend for stream in cap.streams]
+    if PARAM_NUM_WORKERS > 1:
+        # The batches are copied into the shared memory slots of the workers
+        batcher = FrameBatcher(n, PARAM_BATCH_MAX_WAIT, (c, h, w), PARAM_NUM_REQUESTS)
+    else:
+        # Pre-process straight into the input blobs of the infer requests, which start without copying them
+        batcher = FrameBatcher(n, PARAM_BATCH_MAX_WAIT, buffers=infer_ring.input_buffers(input_blob))
+    preprocessor = Preprocessor(w, h, c)
+    # Reporting state kept per stream
+    num_streams = len(cap.streams)
+    aggregators = [ClassificationAggregator() if PARAM_REPORT_MODE == REPORT_AGGREGATE else None
+                   for _ in range(num_streams)]
     client.publish(topic=PARAM_TOPIC_NAME, payload="Starting inference on %s" % PARAM_INPUT_SOURCE)
-    start_time = timeit.default_timer()
-    inf_seconds = 0.0
-    frame_count = 0
-    res_json = []
+    start_times = [timeit.default_timer()] * num_streams
+    inf_seconds = [0.0] * num_streams
+    frame_counts = [0] * num_streams
+    gate = MotionGate(num_streams, PARAM_MOTION_THRESHOLD, refresh=PARAM_MOTION_REFRESH) if PARAM_MOTION_THRESHOLD else None
+    skipper = AdaptiveFrameSkipper(num_streams, PARAM_TARGET_FPS, PARAM_TARGET_LATENCY, PARAM_MAX_STALENESS, gate=gate)
     labeldata = None
     if PARAM_LABELMAP_FILE is not None:
        with open(PARAM_LABELMAP_FILE) as labelmap_file:
             labeldata = json.load(labelmap_file)
+    class_name = lambda i: labeldata[str(i)] if labeldata else str(i)
     
-    while (cap.isOpened()):
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frameid = cap.get(cv2.CAP_PROP_POS_FRAMES)
-        initial_w = cap.get(3)
-        initial_h = cap.get(4)
-        in_frame = cv2.resize(frame, (w, h))
-        in_frame = in_frame.transpose((2, 0, 1))  # Change data layout from HWC to CHW
-        in_frame = in_frame.reshape((n, c, h, w))
-        # Start synchronous inference
-        inf_start_time = timeit.default_timer()
-        res = exec_net.infer(inputs={input_blob: in_frame})
-        inf_seconds += timeit.default_timer() - inf_start_time
-        top_ind = np.argsort(res[out_blob], axis=1)[0, -PARAM_NUM_TOP_RESULTS:][::-1]
-        # Parse detection results of the current request
-        res_json = OrderedDict()
-        res_json["Candidates"] = OrderedDict()
-        frame_timestamp = datetime.datetime.now()
-            
-        for i in top_ind:
-            classlabel = labeldata[str(i)] if labeldata else str(i)
-            res_json["Candidates"][classlabel] = round(res[out_blob][0, i], 2)
-            
-        frame_count += 1
-        # Measure elapsed seconds since the last report
-        seconds_elapsed = timeit.default_timer() - start_time
-        if seconds_elapsed >= reporting_interval:
-            res_json["timestamp"] = frame_timestamp.isoformat()
-            res_json["frame_id"] = int(frameid)   
-            res_json["inference_fps"] = frame_count / inf_seconds
-            start_time = timeit.default_timer()
-            report(res_json, frame)
-            frame_count = 0
-            inf_seconds = 0.0
+    input_exhausted = not cap.isOpened()
+    cap.start()
+    while not input_exhausted or infer_ring.pending() or batcher.pending():
+        # Decode and pre-process the next frame while earlier requests are in flight
+        ret = False
+        results = []
+        if not input_exhausted:
+            span_start = timeit.default_timer()
+            # Waiting for a frame holds back neither the result of the oldest request nor a partial batch due after
+            # PARAM_BATCH_MAX_WAIT
+            ret, frame, frameid, stream_id = cap.read(next_frame_timeout(infer_ring, batcher))
+            input_exhausted = ret is False
+        if ret:
+            metrics.add("capture", timeit.default_timer() - span_start)
+            span_start = timeit.default_timer()
+            # Infer the frame, post-process it with the last result of its stream, or drop it
+            decision = skipper.decide(stream_id, infer_ring.pending() * n + batcher.pending(), frame)
+            if decision == INFER:
+                # Resize and change data layout from HWC to CHW straight into the input blob
+                batcher.add_frame(frame, preprocessor, (frame, frameid, stream_id))
+            elif decision in (REUSE, CACHED) and skipper.must_hold(stream_id):
+                # Wait for the result of the frame inferred before, a shared frame would not outlive its slot
+                skipper.hold(stream_id, ((frame.copy() if cap.shared_frames else frame, frameid, stream_id), decision))
+                cap.release(stream_id, frame)
+            elif decision in (REUSE, CACHED):
+                results.append(((frame, frameid, stream_id), skipper.last_result(stream_id), 0.0, decision))
+            else:
+                cap.release(stream_id, frame)
+            metrics.add("preprocess", timeit.default_timer() - span_start)
+        # Wait for the oldest request once the ring is full, the input has ended or no frame came in before the
+        # request was due, otherwise take its result as soon as it is in. A skipped frame never waits, it is held
+        # back until the results before it are in
+        if (infer_ring.full() or (input_exhausted and infer_ring.pending()) or infer_ring.ready() or
+                (ret is None and infer_ring.time_to_result() == 0)):
+            batch_info, res, latency = infer_ring.collect()
+            metrics.add("infer", latency)
+            skipper.update(latency)
+            if startup is not None:
+                # Publish how long the start took, broken down by phase, once the first result is in
+                startup["first_infer"] = latency
+                startup["total"] = timeit.default_timer() - startup_time
+                client.publish(topic=PARAM_TOPIC_NAME, payload=json.dumps({"startup": startup}))
+                startup = None
+            # The frames of the batch, each followed by the skipped frames it held back, come before a reused frame
+            # decoded after them
+            batch_probs = split_classification_output(res[out_blob], len(batch_info))
+            batch_results = []
+            for info, probs in zip(batch_info, batch_probs):
+                batch_results.append((info, probs, latency / len(batch_info), INFER))
+                batch_results.extend((held_info, probs, 0.0, held_decision)
+                                     for held_info, held_decision in skipper.release(info[-1]))
+            results[:0] = batch_results
+        # Fan the probabilities out to the frames and streams they belong to
+        for info, probs, frame_latency, decision in results:
+            res_frame, res_frameid, stream_id = info
+            span_start = timeit.default_timer()
+            if decision == INFER:
+                frame_counts[stream_id] += 1
+                inf_seconds[stream_id] += frame_latency
+                if skipper.enabled:
+                    # The outputs belong to the infer request and are overwritten by its next inference
+                    skipper.set_result(stream_id, probs.copy())
+            aggregator = aggregators[stream_id]
+            if aggregator is not None:
+                # Account for every frame of the interval in the summary
+                aggregator.add(probs)
+            # Measure elapsed seconds since the last report
+            seconds_elapsed = timeit.default_timer() - start_times[stream_id]
+            metrics.add("postprocess", timeit.default_timer() - span_start)
+            if seconds_elapsed >= reporting_interval:
+                span_start = timeit.default_timer()
+                if cap.shared_frames:
+                    # The reported frame outlives its shared memory slot
+                    res_frame = res_frame.copy()
+                if aggregator is None:
+                    # Select the top candidates only for frames that are reported
+                    top_ind, top_scores = top_k(probs, PARAM_NUM_TOP_RESULTS, PARAM_MIN_CONFIDENCE)
+                    # Parse classification results of the completed request
+                    res_json = OrderedDict()
+                    res_json["Candidates"] = OrderedDict()
+                    for i, score in zip(top_ind.tolist(), np.round(top_scores.astype(np.float64), 2).tolist()):
+                        res_json["Candidates"][class_name(i)] = score
+                else:
+                    res_json = aggregator.summary(PARAM_NUM_TOP_RESULTS, PARAM_MIN_CONFIDENCE, class_name)
+                    aggregator.reset()
+                res_json["timestamp"] = datetime.datetime.now().isoformat()
+                res_json["stream_id"] = stream_id
+                res_json["frame_id"] = int(res_frameid)   
+                res_json["inference_fps"] = frame_counts[stream_id] / inf_seconds[stream_id] if inf_seconds[stream_id] else 0.0
+                res_json["end_to_end_fps"] = frame_counts[stream_id] / seconds_elapsed
+                res_json["capture_queue_depth"] = cap.queue_depth(stream_id)
+                res_json["dropped_frames"] = cap.dropped_frames(stream_id)
+                res_json["dropped_reports"] = publisher.dropped()
+                if skipper.enabled:
+                    # How this frame was handled, and how many frames of the interval were inferred, reused or dropped
+                    res_json["frame_skipping"] = skipper.take_counts(stream_id)
+                    res_json["frame_skipping"]["decision"] = decision
+                    res_json["frame_skipping"]["result_age"] = round(skipper.result_age(stream_id), 3)
+                    # Static scene, the result was carried forward from an earlier frame
+                    res_json["cached"] = decision == CACHED
+                start_times[stream_id] = timeit.default_timer()
+                metrics.add("annotate", start_times[stream_id] - span_start)
+                report(res_json, res_frame)
+                frame_counts[stream_id] = 0
+                inf_seconds[stream_id] = 0.0
+            # Done with the frame, hand its shared memory slot back to the decoder
+            cap.release(stream_id, info[0])
+        if metrics.due(PARAM_METRICS_INTERVAL):
+            # Publish the latency percentiles of every stage on their own topic, apart from the results
+            metrics_json = {"metrics": metrics.snapshot(), "publisher": publisher.stats(),
+                            "snapshots": snapshot_encoder.stats()}
+            if enable_s3_jpeg_output:
+                metrics_json["s3"] = s3_uploader.stats()
+            if enable_kinesis_output:
+                metrics_json["kinesis"] = kinesis_sink.stats()
+            client.publish(topic=PARAM_METRICS_TOPIC, payload=json.dumps(metrics_json))
+        if batcher.ready() or (input_exhausted and batcher.pending()):
+            # Start asynchronous inference of the batch on the next free request
+            batch, batch_info = batcher.take()
+            infer_ring.submit({input_blob: batch}, batch_info)
 
+    cap.stop()
+    publisher.close()
+    if enable_s3_jpeg_output:
+        # Upload the snapshots of a batch that is not full yet
+        s3_uploader.close()
+    if enable_kinesis_output:
+        # Put the records of a batch that is not full yet
+        kinesis_sink.close()
     client.publish(topic=PARAM_TOPIC_NAME, payload="End of the input, exiting...")
-    del exec_net
-    del plugin
-
-greengrass_classification_sample_run()
+    infer_ring.close()
 
 def function_handler(event, context):
+    # Switch the latency metrics on or off at runtime with an event such as {"metrics": true}
+    if isinstance(event, dict) and "metrics" in event:
+        metrics.set_enabled(bool(event["metrics"]))
     client.publish(topic=PARAM_TOPIC_NAME, payload='HANDLER_CALLED!')
     return
+
+# Run the loop in the background, so that the lambda runtime finishes loading
+# the module and delivers the events to function_handler meanwhile
+inference_thread = threading.Thread(target=greengrass_classification_sample_run)
+inference_thread.daemon = True
+inference_thread.start()
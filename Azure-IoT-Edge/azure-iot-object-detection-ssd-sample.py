@@ -43,9 +43,30 @@ import json
 
 from iothub_client import IoTHubClient, IoTHubClientError, IoTHubTransportProvider, IoTHubClientResult
 from iothub_client import IoTHubMessage, IoTHubMessageDispositionResult, IoTHubError, DeviceMethodReturnValue
-from openvino.inference_engine import IENetwork, IEPlugin
+from openvino.inference_engine import IEPlugin
 from collections import OrderedDict
 
+# Make the shared faas_common package importable when running from a source checkout
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.aggregation import DetectionAggregator, REPORT_AGGREGATE, REPORT_LAST, REPORT_MODES
+from faas_common.batching import FrameBatcher, split_ssd_output
+from faas_common.bounded_queue import OVERFLOW_POLICIES, DROP_OLDEST
+from faas_common.decode import DecodeOptions, DECODE_BACKENDS, BACKEND_DEFAULT
+from faas_common.detections import SsdParser, NMS_MODES, NMS_PER_CLASS, detection_boxes, detections_to_json
+from faas_common.frame_skipping import AdaptiveFrameSkipper, INFER, REUSE, CACHED
+from faas_common.inference import InferRequestRing, next_frame_timeout
+from faas_common.metrics import StageMetrics
+from faas_common.motion_gate import MotionGate
+from faas_common.network_cache import NetworkCache, load_network
+from faas_common.preprocess import Preprocessor
+from faas_common.publisher import Publisher
+from faas_common.snapshots import SnapshotEncoder, SnapshotSink
+from faas_common.payloads import PayloadCodec, CODECS, CODEC_JSON, CODEC_PACKED
+from faas_common.streams import MultiStreamCapture, SCHEDULES, SCHEDULE_ROUND_ROBIN
+from faas_common.tiling import Tiler, parse_regions
+from faas_common.tracking import IouTracker
+from faas_common.worker_pool import InferenceWorkerPool
+
 reporting_interval = 1.0
 PROTOCOL = IoTHubTransportProvider.MQTT
 MESSAGE_TIMEOUT = 10000
@@ -58,8 +79,11 @@ def build_argparser():
     parser = ArgumentParser()
     parser.add_argument("-m", "--model", help="Path to an .xml file with a trained model.", required=True, type=str)
     parser.add_argument("-i", "--input",
-                        help="Path to video file or image. 'cam' for capturing video stream from camera", required=True,
-                        type=str)
+                        help="Path to video file or image. 'cam' for capturing video stream from camera. Several "
+                        "inputs are processed as separate streams sharing the loaded network", required=True,
+                        nargs="+", type=str)
+    parser.add_argument("--stream_schedule", help="Order in which several input streams share the network",
+                        choices=SCHEDULES, default=SCHEDULE_ROUND_ROBIN, type=str)
     parser.add_argument("-l", "--cpu_extension",
                         help="MKLDNN (CPU)-targeted custom layers.Absolute path to a shared library with the kernels "
                              "impl.", type=str, default=None)
@@ -71,6 +95,78 @@ def build_argparser():
     parser.add_argument("--labels", help="Labels mapping file", default=None, type=str)
     parser.add_argument("-pt", "--prob_threshold", help="Probability threshold for detections filtering",
                         default=0.5, type=float)
+    parser.add_argument("--async", help="Run inference asynchronously, overlapping capture and pre-processing of the "
+                        "next frame with inference of the current one", dest="async_mode", action="store_true")
+    parser.add_argument("-nireq", "--num_requests", help="Number of infer requests kept in flight in async mode",
+                        default=2, type=int)
+    parser.add_argument("-nw", "--num_workers", help="Number of worker processes, each pinned to a NUMA node with "
+                        "its own loaded network. 1 infers in the module process", default=1, type=int)
+    parser.add_argument("-b", "--batch_size", help="Number of frames batched into one infer request", default=1, type=int)
+    parser.add_argument("--batch_max_wait", help="Longest time in seconds a partial batch waits for more frames",
+                        default=0.1, type=float)
+    parser.add_argument("-cq", "--capture_queue_size", help="Number of frames buffered between the decode thread and "
+                        "inference (1 for camera input, 4 for files by default)", default=None, type=int)
+    parser.add_argument("--decode_processes", help="Decode every input in its own process into shared memory "
+                        "instead of a thread", action="store_true")
+    parser.add_argument("--decode_backend", help="Decode with OpenCV's default path, a GStreamer pipeline or FFmpeg "
+                        "with hardware acceleration, falling back to the default path if unavailable",
+                        default=BACKEND_DEFAULT, choices=DECODE_BACKENDS, type=str)
+    parser.add_argument("--decode_width", help="Width frames are decoded at, 0 keeps the source size", default=0,
+                        type=int)
+    parser.add_argument("--decode_height", help="Height frames are decoded at, 0 keeps the source size", default=0,
+                        type=int)
+    parser.add_argument("--decode_keyframes_only", help="Decode only the keyframes of file and network sources "
+                        "(GStreamer backend)", action="store_true")
+    parser.add_argument("-pq", "--publish_queue_size", help="Number of reports buffered per output sink", default=8,
+                        type=int)
+    parser.add_argument("-po", "--publish_overflow", help="What to do when an output sink falls behind",
+                        choices=OVERFLOW_POLICIES, default=DROP_OLDEST, type=str)
+    parser.add_argument("--report_mode", help="Report the results of the last frame of each interval, or a summary "
+                        "of all its frames", choices=REPORT_MODES, default=REPORT_LAST, type=str)
+    parser.add_argument("--network_cache_dir", help="Directory of the on-disk cache of compiled networks, "
+                        "disabled by default and not used with -pp", default=None, type=str)
+    parser.add_argument("--network_cache_size_mb", help="Size bound of the network cache in MB", default=512, type=int)
+    parser.add_argument("--target_fps", help="Infer at most this many frames per second and stream, 0 infers "
+                        "every frame", default=0.0, type=float)
+    parser.add_argument("--target_latency", help="Skip frames while the infer latency exceeds this many seconds, "
+                        "0 never skips for latency", default=0.0, type=float)
+    parser.add_argument("--max_staleness", help="Seconds for which a skipped frame reuses the last result of its "
+                        "stream, older results are not reused and the frame is dropped", default=1.0, type=float)
+    parser.add_argument("--motion_threshold", help="Share of a downsampled frame that must change since the last "
+                        "inferred frame of its stream for the frame to be inferred, 0 infers static scenes too",
+                        default=0.0, type=float)
+    parser.add_argument("--motion_refresh", help="Seconds after which a static scene is inferred again", default=60.0,
+                        type=float)
+    parser.add_argument("--detect_every", help="Detect objects on every Nth frame of a stream only", default=1,
+                        type=int)
+    parser.add_argument("--tracking", help="Give detected objects stable track ids and move their boxes on over the "
+                        "frames where detection is skipped", action="store_true")
+    parser.add_argument("--rois", help="Infer only these regions of every frame, each resized to the network input "
+                        "on its own: semicolon-separated \"x,y,width,height\" fractions of the frame and/or "
+                        "\"grid:<columns>x<rows>[:<overlap>]\" tiles, the whole frame by default", default=None,
+                        type=str)
+    parser.add_argument("--nms_iou", help="Suppress detections overlapping a better one by more than this IoU, 0 "
+                        "keeps them all", default=0.0, type=float)
+    parser.add_argument("--nms_mode", help="Suppress only detections of the same label, or all overlapping ones",
+                        default=NMS_PER_CLASS, choices=NMS_MODES, type=str)
+    parser.add_argument("--nms_merge", help="Replace a kept box by the confidence-weighted mean of the boxes it "
+                        "suppressed", action="store_true")
+    parser.add_argument("--max_detections", help="Keep at most this many detections per frame, best first, 0 keeps "
+                        "them all", default=0, type=int)
+    parser.add_argument("--metrics", help="Record per-stage latency histograms, also switchable at runtime with the "
+                        "SetMetrics direct method", action="store_true")
+    parser.add_argument("--metrics_interval", help="Seconds between two messages with the latency histograms",
+                        default=10.0, type=float)
+    parser.add_argument("--snapshot_width", help="Width in pixels the JPEG snapshots are downscaled to, 0 keeps the "
+                        "frame size", default=0, type=int)
+    parser.add_argument("--snapshot_quality", help="JPEG quality of the snapshots", default=95, type=int)
+    parser.add_argument("--snapshot_budget_kb", help="Kilobytes of JPEG snapshots per minute, reached by lowering "
+                        "the quality and then skipping snapshots, 0 for no budget", default=0, type=int)
+    parser.add_argument("--payload_codec", help="Encoding of the results sent to IoT Hub: JSON, MessagePack or "
+                        "packed binary records of the detections", default=CODEC_JSON, choices=CODECS, type=str)
+    parser.add_argument("--payload_codec_fallback", help="Codec to use instead of msgpack where the msgpack package "
+                        "is missing, the sample fails to start otherwise", default=None,
+                        choices=(CODEC_JSON, CODEC_PACKED), type=str)
     parser.add_argument("-o", "--connectionstring", help="connectionstring for iotedge", default="connection", type=str)
     return parser
 
@@ -89,6 +185,15 @@ def device_method_callback(method_name, payload, user_context):
             # Build and send an error response.
             device_method_return_value.response = "{ \"Response\": \"Invalid parameter\" }"
             device_method_return_value.status = 400
+    elif method_name == "SetMetrics":
+        # Switch the per-stage latency metrics on or off, the payload is true or false
+        try:
+            metrics.set_enabled(bool(json.loads(payload)))
+            device_method_return_value.response = "{ \"Response\": \"Executed direct method %s\" }" % method_name
+            device_method_return_value.status = 200
+        except ValueError:
+            device_method_return_value.response = "{ \"Response\": \"Invalid parameter\" }"
+            device_method_return_value.status = 400
     else:
         # Build and send an error response.
         device_method_return_value.response = "{ \"Response\": \"Direct method not defined: %s\" }" % method_name
@@ -102,6 +207,37 @@ print( "Parsing Args" )
 args = build_argparser().parse_args()
 print( "connectionstring" )
 print(args.connectionstring)
+metrics = StageMetrics(enabled=args.metrics)
+payload_codec = PayloadCodec(args.payload_codec, args.payload_codec_fallback)
+snapshot_encoder = SnapshotEncoder(args.snapshot_width, args.snapshot_quality, args.snapshot_budget_kb << 10)
+
+for input_stream in args.input:
+    assert input_stream == 'cam' or os.path.isfile(input_stream), "Specified input file doesn't exist"
+
+# The inference workers and the decode processes are forked here, before the IoT Hub client, the publisher threads or
+# a plugin exist: a process forked while another thread holds a lock deadlocks on it
+startup_time = timeit.default_timer()
+cpu_extension = args.cpu_extension if args.cpu_extension and 'CPU' in args.device else None
+num_requests = args.num_requests if args.async_mode else 1
+cache_size = args.network_cache_size_mb << 20 if args.network_cache_dir else 0
+# Every region of a frame takes a slot of its batch
+tiler = Tiler(parse_regions(args.rois)) if args.rois else None
+batch_size = args.batch_size * len(tiler) if tiler is not None else args.batch_size
+worker_pool = None
+if args.num_workers > 1:
+    # Fan inference out to worker processes pinned to NUMA nodes, each loading its own network
+    print("Loading IR in {} worker processes...".format(args.num_workers))
+    worker_pool = InferenceWorkerPool(args.num_workers, args.model, args.device, batch_size, cpu_extension,
+                                      args.plugin_dir, num_requests, args.network_cache_dir, cache_size)
+# One decode thread (or process) per input, all served by the same executable network.
+# Frames decoded into shared memory are held by the batches in flight and the one being filled until released.
+cap = MultiStreamCapture(args.input, args.capture_queue_size, schedule=args.stream_schedule,
+                         decode_processes=args.decode_processes,
+                         hold_frames=batch_size * (num_requests * args.num_workers + 1),
+                         decode=DecodeOptions(args.decode_backend, args.decode_width, args.decode_height,
+                                              args.decode_keyframes_only))
+# The decode processes start decoding once the inference loop starts the capture
+cap.fork_decoders()
 
 if enable_cloud_output:
     client = IoTHubClient(args.connectionstring, PROTOCOL)
@@ -112,107 +248,240 @@ if enable_local_jpeg_output:
     assert os.path.isdir(local_output_dir), "Specified output directory doesn't exist"
     print("writing output jpeg frames to "+local_output_dir)
 
-# Define the JSON message to send to IoT Hub.
+# Output sinks, each called with a Report from its own publisher thread
+def send_iothub_message(report):
+    # Define the message to send to IoT Hub, binary codecs as a bytearray body
+    body = payload_codec.encode(report.payload)
+    if payload_codec.binary:
+        message = IoTHubMessage(bytearray(body))
+        print( "Sending message: %d bytes of %s" % (len(body), payload_codec.codec) )
+    else:
+        message = IoTHubMessage(body)
+        print( "Sending message: %s" % message.get_string() )
+    client.send_event_async(message, send_confirmation_callback, None)
+
+# Snapshot output, called with the Report and its JPEG bytes encoded in memory
+def write_local_jpeg(report, jpeg):
+    date_prefix = str(report.timestamp).replace(" ","_")
+    with open(os.path.join(local_output_dir, date_prefix + ".jpeg"), "wb") as jpeg_file:
+        jpeg_file.write(jpeg)
+
+sinks = OrderedDict()
+if enable_cloud_output:
+    sinks["iothub"] = send_iothub_message
+if enable_local_jpeg_output:
+    sinks["snapshots"] = SnapshotSink(snapshot_encoder, OrderedDict([("local_jpeg", write_local_jpeg)]))
+publisher = Publisher(sinks, args.publish_queue_size, args.publish_overflow, metrics)
+
 def report_output(frame, res_json):
-    json_string = json.dumps(res_json)
-    print("Detections: " + json_string)
+    print("Detections: " + json.dumps(res_json))
+    # Hand the report over to the publisher threads so that JPEG writes do not stall inference
+    publisher.publish(res_json, frame)
+
+def send_metrics():
+    # Send the latency percentiles of every stage as a message of its own, apart from the results
+    res_json = {"metrics": metrics.snapshot(), "publisher": publisher.stats(),
+                "snapshots": snapshot_encoder.stats()}
+    print("Metrics: " + json.dumps(res_json))
     if enable_cloud_output:
-        message = IoTHubMessage(json_string)
-        print( "Sending message: %s" % message.get_string() )
-        client.send_event_async(message, send_confirmation_callback, None)
-    if enable_local_jpeg_output:
-        now = datetime.datetime.now()
-        date_prefix = str(now).replace(" ","_")
-        retval = cv2.imwrite(os.path.join(local_output_dir, date_prefix + ".jpeg"), frame)
+        client.send_event_async(IoTHubMessage(json.dumps(res_json)), send_confirmation_callback, None)
 
 
 def iothub_client_object_detection_run():
     try:
         
         model_xml = args.model
-        model_bin = os.path.splitext(model_xml)[0] + ".bin"
-        # Plugin initialization for specified device and load extensions library if specified
-        print("Initializing plugin for {} device...".format(args.device))
-        plugin = IEPlugin(device=args.device, plugin_dirs=args.plugin_dir)
-        if args.cpu_extension and 'CPU' in args.device:
-            plugin.add_cpu_extension(args.cpu_extension)
-        # Read IR
-        print("Reading IR...")
-        net = IENetwork.from_ir(model=model_xml, weights=model_bin)
-        assert len(net.inputs.keys()) == 1, "Sample supports only single input topologies"
-        assert len(net.outputs) == 1, "Sample supports only single output topologies"
-        input_blob = next(iter(net.inputs))
-        out_blob = next(iter(net.outputs))
-        print("Loading IR to the plugin...")
-        exec_net = plugin.load(network=net, num_requests=2)
-        # Read and pre-process input image
-        n, c, h, w = net.inputs[input_blob].shape
-        del net
-        if args.input == 'cam':
-            input_stream = 0
+        if worker_pool is not None:
+            # Wait for the workers forked at start-up to load their networks
+            infer_ring = worker_pool
+            startup = OrderedDict(infer_ring.wait_ready())
+            input_blob, out_blob, (n, c, h, w) = infer_ring.input_blob, infer_ring.out_blob, infer_ring.shape
         else:
-            input_stream = args.input
-            assert os.path.isfile(args.input), "Specified input file doesn't exist"
+            # Plugin initialization for specified device and load extensions library if specified
+            print("Initializing plugin for {} device...".format(args.device))
+            plugin = IEPlugin(device=args.device, plugin_dirs=args.plugin_dir)
+            if cpu_extension:
+                plugin.add_cpu_extension(cpu_extension)
+            startup = OrderedDict([("plugin", timeit.default_timer() - startup_time)])
+            # Read IR and load it to the plugin, or import the network compiled on a previous start
+            print("Loading IR to the plugin...")
+            cache = NetworkCache(args.network_cache_dir, cache_size) if cache_size else None
+            # One infer request more than kept in flight, the next batch is pre-processed into its input blob
+            exec_net, input_blob, out_blob, (n, c, h, w), load_timings = load_network(
+                plugin, model_xml, args.device, num_requests + 1, batch_size, cpu_extension, cache,
+                plugin_dir=args.plugin_dir)
+            startup.update(load_timings)
+            infer_ring = InferRequestRing(exec_net, num_requests)
 
         labeldata = None
         if args.labels:
             with open(args.labels, 'r') as labels_file:
                 labeldata = json.load(labels_file)
 
-        cap = cv2.VideoCapture(input_stream)
+        startup["decode_backends"] = [stream.decode_backend for stream in cap.streams]
 
-        cur_request_id = 0
-        next_request_id = 1
+        if args.num_workers > 1:
+            # The batches are copied into the shared memory slots of the workers
+            batcher = FrameBatcher(n, args.batch_max_wait, (c, h, w), num_requests)
+        else:
+            # Pre-process straight into the input blobs of the infer requests, which start without copying them
+            batcher = FrameBatcher(n, args.batch_max_wait, buffers=infer_ring.input_buffers(input_blob))
+        preprocessor = Preprocessor(w, h, c)
+        # Reporting state kept per stream
+        num_streams = len(cap.streams)
+        aggregators = [DetectionAggregator() if args.report_mode == REPORT_AGGREGATE else None for _ in range(num_streams)]
         last_report_time = timeit.default_timer()
-        inf_seconds = 0.0
-        frame_count = 0
+        last_report_times = [last_report_time] * num_streams
+        run_start_time = last_report_time
+        inf_seconds = [0.0] * num_streams
+        frame_counts = [0] * num_streams
+        gate = MotionGate(num_streams, args.motion_threshold, refresh=args.motion_refresh) if args.motion_threshold else None
+        skipper = AdaptiveFrameSkipper(num_streams, args.target_fps, args.target_latency, args.max_staleness, gate=gate,
+                                       detect_every=args.detect_every)
+        trackers = [IouTracker() for _ in range(num_streams)] if args.tracking else None
+        parse_detections = SsdParser(args.prob_threshold, args.nms_iou, args.nms_mode, args.max_detections,
+                                     args.nms_merge)
         render_time = 0
     
-        print("Starting inference in sync mode...")
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            initial_w = cap.get(3)
-            initial_h = cap.get(4)
-            in_frame = cv2.resize(frame, (w, h))
-            in_frame = in_frame.transpose((2, 0, 1))  # Change data layout from HWC to CHW
-            in_frame = in_frame.reshape((n, c, h, w))
-
-            inf_start_time = timeit.default_timer()
-            res = exec_net.infer(inputs={input_blob: in_frame})
-            inf_seconds += timeit.default_timer() - inf_start_time
-            frame_timestamp = datetime.datetime.now()
-            frame_count += 1
-            seconds_since_last_report = timeit.default_timer() - last_report_time
-
-            # report if elapsed time exceeds threshold
-            if seconds_since_last_report >= reporting_interval:
-                res_json = OrderedDict()
-                object_id = 0
-                for obj in res[out_blob][0][0]:
-                    # Draw only objects when probability more than specified threshold
-                    if obj[2] > args.prob_threshold:
-                        xmin = int(obj[3] * initial_w)
-                        ymin = int(obj[4] * initial_h)
-                        xmax = int(obj[5] * initial_w)
-                        ymax = int(obj[6] * initial_h)
-                        class_id = int(obj[1])
+        if args.async_mode:
+            print("Starting inference in async mode with {} infer requests...".format(num_requests))
+        else:
+            print("Starting inference in sync mode...")
+        input_exhausted = not cap.isOpened()
+        cap.start()
+        while not input_exhausted or infer_ring.pending() or batcher.pending():
+            span_start = timeit.default_timer()
+            results = []
+            # Waiting for a frame holds back neither the result of the oldest request nor a partial batch due after
+            # --batch_max_wait
+            timeout = next_frame_timeout(infer_ring, batcher)
+            ret, frame, frameid, stream_id = cap.read(timeout) if not input_exhausted else (False, None, None, None)
+            input_exhausted = ret is False
+            if ret:
+                metrics.add("capture", timeit.default_timer() - span_start)
+                span_start = timeit.default_timer()
+                initial_w = cap.streams[stream_id].width
+                initial_h = cap.streams[stream_id].height
+                # Infer the frame, post-process it with the last result of its stream, or drop it
+                decision = skipper.decide(stream_id, infer_ring.pending() * n + batcher.pending(), frame)
+                if decision == INFER:
+                    # Resize and change data layout from HWC to CHW straight into the input blob
+                    for crop in tiler.crops(frame) if tiler is not None else [frame]:
+                        batcher.add_frame(crop, preprocessor, (frame, initial_w, initial_h, stream_id))
+                elif decision in (REUSE, CACHED) and skipper.must_hold(stream_id):
+                    # Wait for the result of the frame inferred before, a shared frame would not outlive its slot
+                    skipper.hold(stream_id, ((frame.copy() if cap.shared_frames else frame, initial_w, initial_h,
+                                              stream_id), decision))
+                    cap.release(stream_id, frame)
+                elif decision in (REUSE, CACHED):
+                    results.append(((frame, initial_w, initial_h, stream_id), skipper.last_result(stream_id), 0.0, decision))
+                else:
+                    cap.release(stream_id, frame)
+                metrics.add("preprocess", timeit.default_timer() - span_start)
+            if batcher.ready() or (input_exhausted and batcher.pending()):
+                batch, batch_info = batcher.take()
+                infer_ring.submit({input_blob: batch}, batch_info)
+            # In sync mode the ring holds a single request, so this waits for the frame just submitted.
+            # In async mode it waits for the oldest request once all are in flight or no frame came in before it
+            # was due, while the newer ones keep running.
+            # Otherwise the result of the oldest request is taken as soon as it is in. A skipped frame never waits,
+            # it is held back until the results before it are in.
+            if (infer_ring.full() or (input_exhausted and infer_ring.pending()) or infer_ring.ready() or
+                    (ret is None and infer_ring.time_to_result() == 0)):
+                batch_info, res, latency = infer_ring.collect()
+                metrics.add("infer", latency)
+                skipper.update(latency)
+                if startup is not None:
+                    # Print how long the start took, broken down by phase, once the first result is in
+                    startup["first_infer"] = latency
+                    startup["total"] = timeit.default_timer() - startup_time
+                    print("Startup timings: {}".format(json.dumps(startup)))
+                    startup = None
+                # The frames of the batch, each followed by the skipped frames it held back, come before a reused
+                # frame decoded after them
+                batch_rows = split_ssd_output(res[out_blob], len(batch_info))
+                if tiler is not None:
+                    # Map the detections of the regions of every frame back to the frame and merge the duplicates
+                    batch_info, batch_rows = tiler.merge_batch(batch_info, batch_rows, args.prob_threshold)
+                batch_results = []
+                for info, rows in zip(batch_info, batch_rows):
+                    batch_results.append((info, rows, latency / len(batch_info), INFER))
+                    batch_results.extend((held_info, rows, 0.0, held_decision)
+                                         for held_info, held_decision in skipper.release(info[-1]))
+                results[:0] = batch_results
+            # Fan the detections out to the frames and streams they belong to
+            for info, rows, frame_latency, decision in results:
+                frame, initial_w, initial_h, stream_id = info
+                span_start = timeit.default_timer()
+                frame_timestamp = datetime.datetime.now()
+                if decision == INFER:
+                    frame_counts[stream_id] += 1
+                    inf_seconds[stream_id] += frame_latency
+                    if skipper.enabled:
+                        # The outputs belong to the infer request and are overwritten by its next inference
+                        skipper.set_result(stream_id, rows.copy())
+                aggregator = aggregators[stream_id]
+                detections = None
+                if trackers is not None:
+                    # Match the detections to the tracks of the stream, or move the tracks on where detection was skipped
+                    detections, track_ids = trackers[stream_id].step(
+                        parse_detections(rows) if decision == INFER else None)
+                elif aggregator is not None:
+                    detections = parse_detections(rows)
+                if aggregator is not None:
+                    # Account for every frame of the interval in the summary
+                    aggregator.add(detections)
+                seconds_since_last_report = timeit.default_timer() - last_report_times[stream_id]
+                metrics.add("postprocess", timeit.default_timer() - span_start)
+
+                # report if elapsed time exceeds threshold
+                if seconds_since_last_report >= reporting_interval:
+                    span_start = timeit.default_timer()
+                    if cap.shared_frames:
+                        # The reported frame outlives its shared memory slot
+                        frame = frame.copy()
+                    if detections is None:
+                        # Keep only objects with probability more than specified threshold
+                        detections = parse_detections(rows)
+                    boxes = detection_boxes(detections, initial_w, initial_h).tolist()
+                    for object_id, ((xmin, ymin, xmax, ymax), class_id, confidence) in enumerate(zip(boxes, detections["label"].tolist(), detections["confidence"].tolist())):
                         # Draw box and label\class_id
                         color = (min(class_id * 12.5, 255), min(class_id * 7, 255), min(class_id * 5, 255))
                         cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, 2)
                         det_label = labeldata[class_id] if labeldata else str(class_id)
-                        cv2.putText(frame, det_label + ' ' + str(round(obj[2] * 100, 1)) + ' %', (xmin, ymin - 7), cv2.FONT_HERSHEY_COMPLEX, 0.6, color, 1)
-                        obj_id = "Object" + str(object_id)
-                        res_json[obj_id] = {"label": int(obj[1]), "confidence": round(float(obj[2]), 2), "xmin": round(float(obj[3]), 2), "ymin": round(float(obj[4]), 2), "xmax": round(float(obj[5]), 2), "ymax": round(float(obj[6]), 2)}
-                        object_id += 1
-            
-                res_json["infer_fps"] = round((frame_count / inf_seconds),2)
-                res_json["frame_id"] = str(frame_count)
-                last_report_time = timeit.default_timer()
-                report_output(frame, res_json)
-        del exec_net
-        del plugin
+                        if trackers is not None:
+                            det_label += ' #' + str(track_ids[object_id])
+                        cv2.putText(frame, det_label + ' ' + str(round(confidence * 100, 1)) + ' %', (xmin, ymin - 7), cv2.FONT_HERSHEY_COMPLEX, 0.6, color, 1)
+                    if aggregator is None:
+                        res_json = detections_to_json(detections, track_ids=track_ids if trackers is not None else None)
+                    else:
+                        res_json = aggregator.summary()
+                        aggregator.reset()
+                
+                    res_json["infer_fps"] = round((frame_counts[stream_id] / inf_seconds[stream_id]),2) if inf_seconds[stream_id] else 0.0
+                    res_json["end_to_end_fps"] = round(frame_counts[stream_id] / (timeit.default_timer() - run_start_time), 2)
+                    res_json["frame_id"] = str(frame_counts[stream_id])
+                    res_json["stream_id"] = stream_id
+                    res_json["capture_queue_depth"] = cap.queue_depth(stream_id)
+                    res_json["dropped_frames"] = cap.dropped_frames(stream_id)
+                    res_json["dropped_reports"] = publisher.dropped()
+                    if skipper.enabled:
+                        # How this frame was handled, and how many frames of the interval were inferred, reused or dropped
+                        res_json["frame_skipping"] = skipper.take_counts(stream_id)
+                        res_json["frame_skipping"]["decision"] = decision
+                        res_json["frame_skipping"]["result_age"] = round(skipper.result_age(stream_id), 3)
+                        # Static scene, the result was carried forward from an earlier frame
+                        res_json["cached"] = decision == CACHED
+                    last_report_times[stream_id] = timeit.default_timer()
+                    metrics.add("annotate", last_report_times[stream_id] - span_start)
+                    report_output(frame, res_json)
+                # Done with the frame, hand its shared memory slot back to the decoder
+                cap.release(stream_id, info[0])
+            if metrics.due(args.metrics_interval):
+                send_metrics()
+        cap.stop()
+        publisher.close()
+        infer_ring.close()
 
     except IoTHubError as iothub_error:
         print ( "Unexpected error %s from IoTHub" % iothub_error )
@@ -0,0 +1,135 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import time
+import timeit
+from argparse import ArgumentParser
+import numpy as np
+
+from openvino.inference_engine import IENetwork, IEPlugin
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.batching import FrameBatcher
+from faas_common.inference import InferRequestRing
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Measure throughput and per-frame latency of an IR model across batch sizes.")
+    parser.add_argument("-m", "--model", help="Path to an .xml file with a trained model.", required=True, type=str)
+    parser.add_argument("-l", "--cpu_extension",
+                        help="MKLDNN (CPU)-targeted custom layers.Absolute path to a shared library with the kernels "
+                             "impl.", type=str, default=None)
+    parser.add_argument("-pp", "--plugin_dir", help="Path to a plugin folder", type=str, default=None)
+    parser.add_argument("-d", "--device", help="Target device to infer on", default="CPU", type=str)
+    parser.add_argument("-b", "--batch_sizes", help="Comma separated batch sizes to measure", default="1,2,4,8",
+                        type=str)
+    parser.add_argument("-nireq", "--num_requests", help="Number of infer requests kept in flight", default=2,
+                        type=int)
+    parser.add_argument("-n", "--num_frames", help="Number of frames to infer per batch size", default=256, type=int)
+    parser.add_argument("-fps", "--source_fps", help="Simulated camera frame rate, 0 to feed frames as fast as "
+                        "possible", default=0.0, type=float)
+    parser.add_argument("--batch_max_wait", help="Longest time in seconds a partial batch waits for more frames",
+                        default=0.1, type=float)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def run_batch_size(plugin, args, batch_size):
+    """Infer num_frames synthetic frames with the given batch size and return the measurements."""
+    model_bin = os.path.splitext(args.model)[0] + ".bin"
+    net = IENetwork.from_ir(model=args.model, weights=model_bin)
+    input_blob = next(iter(net.inputs))
+    net.batch_size = batch_size
+    n, c, h, w = net.inputs[input_blob].shape
+    exec_net = plugin.load(network=net, num_requests=args.num_requests)
+    del net
+    infer_ring = InferRequestRing(exec_net, args.num_requests)
+    batcher = FrameBatcher(n, args.batch_max_wait)
+    frame = np.random.randint(0, 255, (c, h, w)).astype(np.uint8)
+    frame_interval = 1.0 / args.source_fps if args.source_fps > 0 else 0.0
+    latencies = []
+    submitted = 0
+    start_time = timeit.default_timer()
+    while submitted < args.num_frames or infer_ring.pending() or batcher.pending():
+        if submitted < args.num_frames:
+            # Frame k of a simulated camera arrives at start_time + k * frame_interval,
+            # without a frame rate every frame is available as soon as the loop asks for it
+            if frame_interval > 0:
+                arrival_time = start_time + submitted * frame_interval
+                delay = arrival_time - timeit.default_timer()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                arrival_time = timeit.default_timer()
+            batcher.add(frame, arrival_time)
+            submitted += 1
+        input_exhausted = submitted >= args.num_frames
+        if infer_ring.full() or (input_exhausted and infer_ring.pending()):
+            arrival_times, res, latency = infer_ring.collect()
+            done_time = timeit.default_timer()
+            latencies.extend(done_time - arrival for arrival in arrival_times)
+        if batcher.ready() or (input_exhausted and batcher.pending()):
+            batch, arrival_times = batcher.take()
+            infer_ring.submit({input_blob: batch}, arrival_times)
+    elapsed = timeit.default_timer() - start_time
+    del exec_net
+    latencies_ms = np.array(latencies) * 1000.0
+    return {"batch_size": batch_size, "frames": len(latencies), "fps": len(latencies) / elapsed,
+            "latency_ms_p50": float(np.percentile(latencies_ms, 50)),
+            "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+            "latency_ms_max": float(latencies_ms.max())}
+
+
+def main():
+    args = build_argparser().parse_args()
+    plugin = IEPlugin(device=args.device, plugin_dirs=args.plugin_dir)
+    if args.cpu_extension and 'CPU' in args.device:
+        plugin.add_cpu_extension(args.cpu_extension)
+    results = []
+    print("{:>10} {:>10} {:>12} {:>12} {:>12}".format("batch", "fps", "p50 ms", "p95 ms", "max ms"))
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        result = run_batch_size(plugin, args, batch_size)
+        results.append(result)
+        print("{batch_size:>10} {fps:>10.1f} {latency_ms_p50:>12.1f} {latency_ms_p95:>12.1f} "
+              "{latency_ms_max:>12.1f}".format(**result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"model": args.model, "device": args.device, "num_requests": args.num_requests,
+                       "source_fps": args.source_fps, "results": results}, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,149 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import shutil
+import tempfile
+import timeit
+from argparse import ArgumentParser
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.decode import DecodeOptions, open_capture
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Measure decode CPU time per frame across decode backends and output sizes.")
+    parser.add_argument("-i", "--input", help="Comma-separated local test videos, a synthetic one is written if "
+                        "none is given", default=None, type=str)
+    parser.add_argument("--backends", help="Comma-separated decode backends to measure",
+                        default="default,ffmpeg,gstreamer", type=str)
+    parser.add_argument("--sizes", help="Comma-separated output sizes, WxH or full for the source size",
+                        default="full,1280x720,640x360,300x300", type=str)
+    parser.add_argument("--keyframes_only", help="Also measure decoding the keyframes alone", action="store_true")
+    parser.add_argument("-n", "--frames", help="Most frames decoded per run", default=300, type=int)
+    parser.add_argument("-fw", "--frame_width", help="Width of the synthetic video", default=1920, type=int)
+    parser.add_argument("-fh", "--frame_height", help="Height of the synthetic video", default=1080, type=int)
+    parser.add_argument("-fps", "--fps", help="Frame rate of the cameras the CPU share per stream is given for",
+                        default=30.0, type=float)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def write_test_video(path, frames, width, height):
+    """Write a synthetic video with moving content, so that the codec has real motion to decode."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (width, height))
+    background = np.random.RandomState(0).randint(0, 256, (height // 8, width // 8, 3)).astype(np.uint8)
+    background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+    for frame_no in range(frames):
+        frame = np.roll(background, frame_no * 4, axis=1)
+        size = height // 4
+        left = frame_no * 8 % (width - size)
+        cv2.rectangle(frame, (left, size), (left + size, 2 * size), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def cpu_seconds():
+    """Return the user and system CPU time of this process and its threads, where decoders run."""
+    times = os.times()
+    return times[0] + times[1]
+
+
+def measure(source, options, max_frames):
+    """Decode up to max_frames frames of source and return the measurements, or None if it cannot be opened."""
+    cap, backend = open_capture(source, options)
+    if not cap.isOpened():
+        return None
+    frame = None
+    frames = 0
+    shape = None
+    cpu_start = cpu_seconds()
+    wall_start = timeit.default_timer()
+    while frames < max_frames:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        shape = frame.shape
+        frames += 1
+    wall = timeit.default_timer() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    cap.release()
+    return {"backend": backend, "frames": frames, "output": "%dx%d" % (shape[1], shape[0]) if shape else None,
+            "cpu_ms_per_frame": round(cpu / max(frames, 1) * 1e3, 3), "decode_fps": round(frames / wall, 1)}
+
+
+def main():
+    args = build_argparser().parse_args()
+    temp_dir = None
+    if args.input:
+        sources = [source.strip() for source in args.input.split(",") if source.strip()]
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="decode_benchmark")
+        sources = [os.path.join(temp_dir, "synthetic.avi")]
+        write_test_video(sources[0], args.frames, args.frame_width, args.frame_height)
+    sizes = [(0, 0) if size == "full" else tuple(int(value) for value in size.split("x"))
+             for size in args.sizes.split(",")]
+    results = []
+    try:
+        for source in sources:
+            for backend in args.backends.split(","):
+                for width, height in sizes:
+                    for keyframes_only in ((False, True) if args.keyframes_only else (False,)):
+                        result = measure(source, DecodeOptions(backend, width, height, keyframes_only), args.frames)
+                        if result is None:
+                            print("Cannot open {}".format(source))
+                            continue
+                        result.update({"source": os.path.basename(source), "requested": backend,
+                                       "keyframes_only": keyframes_only})
+                        # Share of a core one camera stream takes to decode at its frame rate
+                        result["cpu_share_per_stream"] = round(result["cpu_ms_per_frame"] * args.fps / 1e3, 3)
+                        results.append(result)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+    print("source               requested  used       output     keyframes  frames  cpu ms/frame  decode fps  "
+          "cores/stream @ {} fps".format(args.fps))
+    for result in results:
+        print("{source:20s} {requested:10s} {backend:10s} {output:10s} {keyframes_only!s:10s} {frames:6d} "
+              "{cpu_ms_per_frame:13.2f} {decode_fps:11.1f} {cpu_share_per_stream:10.3f}".format(**result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,157 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import random
+import hashlib
+import time
+import timeit
+import datetime
+from argparse import ArgumentParser
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.publisher import Report
+from faas_common.kinesis import KinesisSink, PARTITION_FIXED, PARTITION_MODES
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Compare putting reports to Kinesis one PutRecord call each with "
+                                        "PutRecords batches, against a stubbed client with simulated latency, "
+                                        "shards and throttled entries.")
+    parser.add_argument("-b", "--batch_sizes", help="Comma-separated records per PutRecords request to measure",
+                        default="10,100,500", type=str)
+    parser.add_argument("-n", "--reports", help="Number of reports to put per configuration", default=1000,
+                        type=int)
+    parser.add_argument("--streams", help="Number of camera streams the reports come from", default=4, type=int)
+    parser.add_argument("--shards", help="Number of shards of the simulated Kinesis stream", default=4, type=int)
+    parser.add_argument("-rtt", "--round_trip", help="Milliseconds of latency of every request", default=10.0,
+                        type=float)
+    parser.add_argument("--failure_rate", help="Share of the entries that are throttled", default=0.05,
+                        type=float)
+    parser.add_argument("--seed", help="Seed of the simulated failures", default=0, type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+class StubKinesis(object):
+    """Kinesis client stand-in that hashes partition keys to shards like Kinesis, with latency and throttling."""
+
+    def __init__(self, round_trip, shards, failure_rate, seed):
+        self.round_trip = round_trip
+        self.shard_records = [0] * shards
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def _put(self, record):
+        if self.random.random() < self.failure_rate:
+            return {"ErrorCode": "ProvisionedThroughputExceededException"}
+        key_hash = int(hashlib.md5(record["PartitionKey"].encode("utf-8")).hexdigest(), 16)
+        self.shard_records[key_hash % len(self.shard_records)] += 1
+        return {"SequenceNumber": "0"}
+
+    def put_record(self, StreamName, Data, PartitionKey):
+        self.requests += 1
+        time.sleep(self.round_trip)
+        result = self._put({"Data": Data, "PartitionKey": PartitionKey})
+        if "ErrorCode" in result:
+            raise IOError(result["ErrorCode"])
+        return result
+
+    def put_records(self, StreamName, Records):
+        self.requests += 1
+        time.sleep(self.round_trip)
+        results = [self._put(record) for record in Records]
+        return {"FailedRecordCount": sum("ErrorCode" in result for result in results), "Records": results}
+
+
+def make_reports(count, streams):
+    start = datetime.datetime(2018, 1, 1)
+    return [Report({"Candidates": {"1": 0.9, "2": 0.05}, "stream_id": index % streams, "frame_id": index // streams,
+                    "inference_fps": 30.0}, None, start + datetime.timedelta(seconds=index))
+            for index in range(count)]
+
+
+def run(args, reports, batch_size, partition):
+    """Put the reports and return the results of one configuration; batch_size None calls put_record per report."""
+    client = StubKinesis(args.round_trip / 1000.0, args.shards, args.failure_rate, args.seed)
+    lost = 0
+    start_time = timeit.default_timer()
+    if batch_size is None:
+        # The former sink, one call per report with a fixed partition key and no retries
+        for report in reports:
+            try:
+                client.put_record(StreamName="bench", Data=json.dumps(report.payload), PartitionKey="bench")
+            except IOError:
+                lost += 1
+    else:
+        sink = KinesisSink(client, "bench", partition, "bench", batch_size, max_delay=60.0, backoff=0.0)
+        for report in reports:
+            try:
+                sink(report)
+            except IOError:
+                pass
+        sink.close()
+        lost = sink.dropped + len(sink.pending)
+    seconds = timeit.default_timer() - start_time
+    return {
+        "call": "put_record" if batch_size is None else "put_records",
+        "batch_size": batch_size or 1,
+        "partition": PARTITION_FIXED if batch_size is None else partition,
+        "records_per_second": len(reports) / seconds,
+        "requests": client.requests,
+        "lost": lost,
+        "busiest_shard_share": max(client.shard_records) / float(max(sum(client.shard_records), 1)),
+    }
+
+
+def main():
+    args = build_argparser().parse_args()
+    reports = make_reports(args.reports, args.streams)
+    results = [run(args, reports, None, None)]
+    for batch_size in (int(value) for value in args.batch_sizes.split(",")):
+        for partition in PARTITION_MODES:
+            results.append(run(args, reports, batch_size, partition))
+    print("call         batch  partition  records/s  requests  lost  busiest shard")
+    for result in results:
+        print("{call:12s} {batch_size:5d}  {partition:9s} {records_per_second:10.1f} {requests:9d} {lost:5d} "
+              "{busiest_shard_share:13.0%}".format(**result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,132 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import timeit
+from argparse import ArgumentParser
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.detections import non_max_suppression
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Compare a naive O(n^2) Python loop and the vectorized NumPy "
+                                        "non-maximum suppression.")
+    parser.add_argument("-n", "--boxes", help="Comma-separated numbers of boxes to suppress", default="20,100,400",
+                        type=str)
+    parser.add_argument("--duplicates", help="Mean number of boxes reported per object", default=4.0, type=float)
+    parser.add_argument("--labels", help="Number of distinct labels", default=5, type=int)
+    parser.add_argument("--iou", help="IoU above which a box is suppressed", default=0.5, type=float)
+    parser.add_argument("-i", "--iterations", help="Number of timed iterations", default=50, type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def make_boxes(count, duplicates, labels, seed=0):
+    """Return boxes (count, 4), scores and labels of objects each reported about `duplicates` times."""
+    rng = np.random.RandomState(seed)
+    objects = max(1, int(count / duplicates))
+    sizes = rng.uniform(0.05, 0.3, (objects, 2))
+    corners = rng.uniform(0.0, 1.0, (objects, 2)) * (1.0 - sizes)
+    owner = rng.randint(0, objects, count)
+    jitter = rng.normal(0.0, 0.01, (count, 4))
+    boxes = np.concatenate([corners[owner], corners[owner] + sizes[owner]], axis=1) + jitter
+    object_labels = rng.randint(1, labels + 1, objects)
+    # Now and then the same object comes with another label
+    box_labels = np.where(rng.uniform(0.0, 1.0, count) < 0.2, rng.randint(1, labels + 1, count), object_labels[owner])
+    return boxes.astype(np.float32), rng.uniform(0.3, 1.0, count).astype(np.float32), box_labels.astype(np.int32)
+
+
+def naive_iou(a, b):
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def naive_nms(boxes, scores, iou_threshold, labels=None):
+    """Greedy suppression comparing every pair of boxes in Python."""
+    boxes = boxes.tolist()
+    order = sorted(range(len(boxes)), key=lambda index: -scores[index])
+    suppressed = [False] * len(boxes)
+    keep = []
+    for position, index in enumerate(order):
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        for other in order[position + 1:]:
+            if (not suppressed[other] and (labels is None or labels[other] == labels[index]) and
+                    naive_iou(boxes[index], boxes[other]) > iou_threshold):
+                suppressed[other] = True
+    return keep
+
+
+def time_per_call(function, iterations):
+    """Return the mean time of one call in microseconds."""
+    return timeit.timeit(function, number=iterations) / iterations * 1e6
+
+
+def main():
+    args = build_argparser().parse_args()
+    results = []
+    for count in (int(value) for value in args.boxes.split(",")):
+        boxes, scores, labels = make_boxes(count, args.duplicates, args.labels)
+        for mode, mode_labels in (("class", labels), ("agnostic", None)):
+            kept = non_max_suppression(boxes, scores, args.iou, mode_labels)
+            assert kept.tolist() == naive_nms(boxes, scores, args.iou, mode_labels), \
+                "Vectorized suppression differs from the naive loop"
+            results.append({
+                "boxes": count,
+                "mode": mode,
+                "kept": len(kept),
+                "naive_us": time_per_call(lambda: naive_nms(boxes, scores, args.iou, mode_labels), args.iterations),
+                "vectorized_us": time_per_call(lambda: non_max_suppression(boxes, scores, args.iou, mode_labels),
+                                               args.iterations),
+            })
+    print(" boxes  mode      kept   naive us  vectorized us  speedup")
+    for result in results:
+        print("{boxes:6d}  {mode:8s} {kept:5d} {naive_us:10.1f} {vectorized_us:14.1f} {speedup:8.1f}x".format(
+            speedup=result["naive_us"] / result["vectorized_us"], **result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
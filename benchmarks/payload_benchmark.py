@@ -0,0 +1,133 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import timeit
+import datetime
+from collections import OrderedDict
+from argparse import ArgumentParser
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.detections import DETECTION_DTYPE, detections_to_json
+from faas_common.payloads import PayloadCodec, CODECS, decode_payload
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Compare the encode and decode time and the bytes per message of the "
+                                        "JSON, MessagePack and packed payload codecs on SSD and classification "
+                                        "reports.")
+    parser.add_argument("-n", "--objects", help="Comma-separated numbers of detected objects per SSD report",
+                        default="0,5,20", type=str)
+    parser.add_argument("--candidates", help="Number of candidates per classification report", default=10,
+                        type=int)
+    parser.add_argument("-i", "--iterations", help="Number of timed iterations", default=2000, type=int)
+    parser.add_argument("--rate", help="Messages per second per camera, to estimate the monthly volume",
+                        default=1.0, type=float)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def report_metadata(res_json):
+    """Add the entries the samples append to every report."""
+    res_json["timestamp"] = datetime.datetime(2018, 1, 1).isoformat()
+    res_json["stream_id"] = 0
+    res_json["frame_id"] = 1234
+    res_json["inference_fps"] = 29.97
+    res_json["end_to_end_fps"] = 29.5
+    res_json["capture_queue_depth"] = 1
+    res_json["dropped_frames"] = 0
+    res_json["dropped_reports"] = 0
+    return res_json
+
+
+def ssd_report(count):
+    rng = np.random.RandomState(count)
+    detections = np.zeros(count, DETECTION_DTYPE)
+    detections["label"] = rng.randint(1, 21, count)
+    detections["confidence"] = rng.uniform(0.5, 1.0, count)
+    corners = rng.uniform(0.0, 0.7, (count, 2))
+    detections["xmin"], detections["ymin"] = corners[:, 0], corners[:, 1]
+    detections["xmax"], detections["ymax"] = corners[:, 0] + 0.2, corners[:, 1] + 0.3
+    return report_metadata(detections_to_json(detections, lambda label: "class" + str(label),
+                                              np.arange(count)))
+
+
+def classification_report(count):
+    res_json = OrderedDict()
+    res_json["Candidates"] = OrderedDict(("class" + str(index), round(0.9 / (index + 1), 2))
+                                         for index in range(count))
+    return report_metadata(res_json)
+
+
+def time_per_call(function, iterations):
+    """Return the mean time of one call in microseconds."""
+    return timeit.timeit(function, number=iterations) / iterations * 1e6
+
+
+def main():
+    args = build_argparser().parse_args()
+    reports = [("ssd, {0} objects".format(count), ssd_report(count)) for count in
+               (int(value) for value in args.objects.split(","))]
+    reports.append(("classification", classification_report(args.candidates)))
+    results = []
+    for name, payload in reports:
+        for codec_name in CODECS:
+            try:
+                codec = PayloadCodec(codec_name)
+            except ImportError:
+                # MessagePack is only compared where the msgpack package is installed
+                continue
+            message = codec.encode(payload)
+            assert decode_payload(message) == payload, "{0} does not round-trip the payload".format(codec_name)
+            results.append({
+                "report": name,
+                "codec": codec_name,
+                "bytes": len(message),
+                "encode_us": time_per_call(lambda: codec.encode(payload), args.iterations),
+                "decode_us": time_per_call(lambda: decode_payload(message), args.iterations),
+                "mb_per_month": len(message) * args.rate * 86400 * 30 / 1e6,
+            })
+    print("report               codec     bytes  encode us  decode us  MB/month")
+    for result in results:
+        print("{report:20s} {codec:8s} {bytes:6d} {encode_us:10.1f} {decode_us:10.1f} {mb_per_month:9.1f}".format(
+            **result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,120 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import timeit
+import tracemalloc
+from argparse import ArgumentParser
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.batching import FrameBatcher
+from faas_common.preprocess import Preprocessor, preprocess
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Compare allocating and preallocated frame pre-processing.")
+    parser.add_argument("-fw", "--frame_width", help="Width of the decoded frames", default=1920, type=int)
+    parser.add_argument("-fh", "--frame_height", help="Height of the decoded frames", default=1080, type=int)
+    parser.add_argument("-iw", "--input_width", help="Width of the network input", default=300, type=int)
+    parser.add_argument("-ih", "--input_height", help="Height of the network input", default=300, type=int)
+    parser.add_argument("-b", "--batch_size", help="Number of frames per batch", default=1, type=int)
+    parser.add_argument("-n", "--iterations", help="Number of timed frames", default=500, type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def legacy_stage(args):
+    """Resize, transpose and copy into a batch as the samples did before preallocation."""
+    batcher = FrameBatcher(args.batch_size, 0)
+
+    def run(frame):
+        batcher.add(preprocess(frame, args.input_width, args.input_height))
+        if batcher.pending() == args.batch_size:
+            batcher.take()
+    return run
+
+
+def preallocated_stage(args):
+    """Resize into a reused buffer and write the CHW planes straight into a preallocated blob."""
+    batcher = FrameBatcher(args.batch_size, 0, (3, args.input_height, args.input_width), 2)
+    preprocessor = Preprocessor(args.input_width, args.input_height)
+
+    def run(frame):
+        batcher.add_frame(frame, preprocessor)
+        if batcher.pending() == args.batch_size:
+            batcher.take()
+    return run
+
+
+def allocated_bytes_per_frame(run, frame, iterations):
+    """Return the mean peak of memory allocated while pre-processing one frame."""
+    total = 0
+    for _ in range(iterations):
+        tracemalloc.start()
+        run(frame)
+        total += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return total / float(iterations)
+
+
+def main():
+    args = build_argparser().parse_args()
+    frame = np.random.RandomState(0).randint(0, 256, (args.frame_height, args.frame_width, 3)).astype(np.uint8)
+    results = {"frame": [args.frame_width, args.frame_height], "input": [args.input_width, args.input_height],
+               "batch_size": args.batch_size}
+    for name, stage in (("legacy", legacy_stage), ("preallocated", preallocated_stage)):
+        run = stage(args)
+        # Warm up so that lazily allocated buffers are not counted
+        for _ in range(args.batch_size * 2):
+            run(frame)
+        results[name + "_us"] = timeit.timeit(lambda: run(frame), number=args.iterations) / args.iterations * 1e6
+        results[name + "_bytes"] = allocated_bytes_per_frame(run, frame, min(args.iterations, 100))
+    legacy_in = preprocess(frame, args.input_width, args.input_height)
+    preallocated_in = Preprocessor(args.input_width, args.input_height)(frame, np.empty_like(legacy_in))
+    assert np.array_equal(legacy_in, preallocated_in), "Preallocated pre-processing differs from the allocating path"
+
+    print("Frame {0[0]}x{0[1]} -> input {1[0]}x{1[1]}, batch size {2}".format(results["frame"], results["input"],
+                                                                              args.batch_size))
+    print("Allocating resize + transpose: {legacy_us:10.1f} us, {legacy_bytes:12.0f} bytes/frame".format(**results))
+    print("Preallocated buffers:          {preallocated_us:10.1f} us, {preallocated_bytes:12.0f} bytes/frame"
+          .format(**results))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
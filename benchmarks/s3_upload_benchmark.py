@@ -0,0 +1,174 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import io
+import json
+import random
+import tempfile
+import time
+import timeit
+import datetime
+from argparse import ArgumentParser
+import numpy as np
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.publisher import Report
+from faas_common.uploads import S3Uploader
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Compare uploading JPEG snapshots to S3 through a temporary file with "
+                                        "in-memory uploads, one or several snapshots per request, against a "
+                                        "local S3 stand-in with simulated latency and failures.")
+    parser.add_argument("-b", "--batch_sizes", help="Comma-separated snapshots per request to measure",
+                        default="1,4,16", type=str)
+    parser.add_argument("-n", "--snapshots", help="Number of snapshots to upload per configuration", default=64,
+                        type=int)
+    parser.add_argument("--width", help="Width of the synthetic frames", default=1280, type=int)
+    parser.add_argument("--height", help="Height of the synthetic frames", default=720, type=int)
+    parser.add_argument("-rtt", "--round_trip", help="Milliseconds of latency of every S3 request", default=40.0,
+                        type=float)
+    parser.add_argument("--bandwidth", help="Upload bandwidth of the stand-in in megabits per second",
+                        default=100.0, type=float)
+    parser.add_argument("--failure_rate", help="Share of the requests that fail", default=0.1, type=float)
+    parser.add_argument("--seed", help="Seed of the simulated failures", default=0, type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+class LocalS3(object):
+    """S3 stand-in keeping objects in memory, with per-request latency, limited bandwidth and random failures."""
+
+    def __init__(self, round_trip, bandwidth, failure_rate, seed):
+        self.round_trip = round_trip
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.objects = {}
+        self.requests = 0
+
+    def _transfer(self, size):
+        self.requests += 1
+        time.sleep(self.round_trip + size * 8.0 / self.bandwidth)
+        if self.random.random() < self.failure_rate:
+            raise IOError("Simulated S3 failure")
+
+    def put_object(self, Body, Bucket, Key):
+        self._transfer(len(Body))
+        self.objects[(Bucket, Key)] = Body
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None):
+        body = Fileobj.read()
+        self._transfer(len(body))
+        self.objects[(Bucket, Key)] = body
+
+
+def make_frame(width, height):
+    """Return a frame with gradients and some noise, which compresses like a camera image."""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = np.random.RandomState(0).normal(0, 8, (height, width, 3)).astype(np.float32)
+    frame = np.dstack([x + 0 * y, y + 0 * x, (x + y) / 2]) + noise
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def temp_file_upload(client, frame, report, directory):
+    """The former path: write the frame with imwrite, read the file back and put it."""
+    temp_image = os.path.join(directory, "inference_result.jpeg")
+    cv2.imwrite(temp_image, frame)
+    with open(temp_image, "rb") as image_file:
+        client.put_object(Body=image_file.read(), Bucket="bench", Key=str(report.timestamp) + ".jpeg")
+
+
+def run(args, batch_size, frame, jpeg):
+    """Upload the snapshots and return the results of one configuration; batch_size None uses the temp file."""
+    client = LocalS3(args.round_trip / 1000.0, args.bandwidth * 1e6, args.failure_rate, args.seed)
+    start = datetime.datetime(2018, 1, 1)
+    reports = [Report({}, frame, start + datetime.timedelta(seconds=index)) for index in range(args.snapshots)]
+    failures = 0
+    start_time = timeit.default_timer()
+    if batch_size is None:
+        directory = tempfile.mkdtemp()
+        for report in reports:
+            try:
+                temp_file_upload(client, frame, report, directory)
+            except IOError:
+                failures += 1
+        os.remove(os.path.join(directory, "inference_result.jpeg"))
+        os.rmdir(directory)
+        stats = {"uploaded": args.snapshots - failures, "requests": client.requests, "retries": 0,
+                 "dropped": failures}
+    else:
+        uploader = S3Uploader(client, "bench", batch_size, attempts=3, backoff=0.01)
+        for report in reports:
+            try:
+                # Encoded in memory once per snapshot, as by the SnapshotSink
+                uploader(report, cv2.imencode(".jpg", frame)[1].tobytes())
+            except IOError:
+                failures += 1
+        uploader.close()
+        stats = uploader.stats()
+    seconds = timeit.default_timer() - start_time
+    return {
+        "path": "temp_file" if batch_size is None else "memory",
+        "batch_size": batch_size or 1,
+        "snapshots_per_second": args.snapshots / seconds,
+        "requests": client.requests,
+        "uploaded": stats["uploaded"],
+        "retries": stats["retries"],
+        "lost": stats["dropped"],
+        "jpeg_kb": len(jpeg) / 1024.0,
+    }
+
+
+def main():
+    args = build_argparser().parse_args()
+    frame = make_frame(args.width, args.height)
+    jpeg = cv2.imencode(".jpg", frame)[1].tobytes()
+    results = [run(args, None, frame, jpeg)]
+    for batch_size in (int(value) for value in args.batch_sizes.split(",")):
+        results.append(run(args, batch_size, frame, jpeg))
+    print("path       batch  snapshots/s  requests  uploaded  retries  lost")
+    for result in results:
+        print("{path:10s} {batch_size:5d} {snapshots_per_second:12.1f} {requests:9d} {uploaded:9d} {retries:8d} "
+              "{lost:5d}".format(**result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,257 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCH_DIR, os.pardir)
+RUN_SAMPLE = os.path.join(BENCH_DIR, "stubs", "run_sample.py")
+
+# Sample name: (script, model kind of the fake network, Greengrass lambda or Azure module)
+SAMPLES = OrderedDict([
+    ("gg_ssd", ("AWS Greengrass/greengrass_object_detection_sample_ssd.py", "ssd", "greengrass")),
+    ("gg_classification", ("AWS Greengrass/greengrass_classification_sample.py", "classification", "greengrass")),
+    ("azure_ssd", ("Azure-IoT-Edge/azure-iot-object-detection-ssd-sample.py", "ssd", "azure")),
+    ("azure_classification", ("Azure-IoT-Edge/azure-iot-classification-sample.py", "classification", "azure")),
+])
+
+# Results compared against a baseline: higher is better for the first, lower for the others
+HIGHER_IS_BETTER = ("fps",)
+LOWER_IS_BETTER = ("latency_p95_ms", "peak_rss_mb")
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Run the loops of the FaaS samples against a fake inference engine, a "
+                                        "synthetic video source and stub cloud clients, and measure throughput, "
+                                        "latency and peak memory.")
+    parser.add_argument("-s", "--samples", help="Comma separated samples to run, out of " + ",".join(SAMPLES),
+                        default=",".join(SAMPLES), type=str)
+    parser.add_argument("-n", "--frames", help="Number of frames per input stream", default=300, type=int)
+    parser.add_argument("--streams", help="Number of input streams", default=1, type=int)
+    parser.add_argument("-fw", "--frame_width", help="Width of the synthetic frames", default=1280, type=int)
+    parser.add_argument("-fh", "--frame_height", help="Height of the synthetic frames", default=720, type=int)
+    parser.add_argument("-fps", "--fps", help="Frame rate of each stream, 0 decodes as fast as from a file",
+                        default=0, type=float)
+    parser.add_argument("--active", help="Share of frames in which something moves in the otherwise static scene",
+                        default=0.0, type=float)
+    parser.add_argument("--latency", help="Fixed seconds per infer request of the fake network", default=0.005,
+                        type=float)
+    parser.add_argument("--latency_per_frame", help="Additional seconds per frame of the batch", default=0.015,
+                        type=float)
+    parser.add_argument("--device_streams", help="Infer requests the fake device runs at the same time", default=1,
+                        type=int)
+    parser.add_argument("-b", "--batch_size", help="Number of frames per infer request", default=1, type=int)
+    parser.add_argument("-nireq", "--num_requests", help="Number of infer requests kept in flight", default=2,
+                        type=int)
+    parser.add_argument("--gg_env", help="Additional PARAM_*=value setting of the Greengrass lambdas",
+                        action="append", default=[])
+    parser.add_argument("--azure_args", help="Additional command line options of the Azure modules", default="",
+                        type=str)
+    parser.add_argument("--timeout", help="Seconds after which a sample is stopped", default=600, type=float)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against", default=None,
+                        type=str)
+    parser.add_argument("--tolerance", help="Relative change against the baseline reported as a regression",
+                        default=0.1, type=float)
+    return parser
+
+
+def percentiles(values):
+    """Return mean, p50, p95, p99 and max of values in seconds, in milliseconds."""
+    if not values:
+        return OrderedDict()
+    values = np.array(values) * 1000.0
+    summary = OrderedDict([("mean", round(float(values.mean()), 3))])
+    for percent in (50, 95, 99):
+        summary["p%d" % percent] = round(float(np.percentile(values, percent)), 3)
+    summary["max"] = round(float(values.max()), 3)
+    return summary
+
+
+def sample_command(name, args, work_dir):
+    """Return the command line and environment that run a sample on the stand-ins in work_dir."""
+    script, model_kind, platform = SAMPLES[name]
+    model_xml = os.path.join(work_dir, "model.xml")
+    sources = [os.path.join(work_dir, "stream%d.mp4" % i) for i in range(args.streams)]
+    env = dict(os.environ, BENCH_MODEL_KIND=model_kind, BENCH_FRAMES=str(args.frames),
+               BENCH_WIDTH=str(args.frame_width), BENCH_HEIGHT=str(args.frame_height), BENCH_FPS=str(args.fps),
+               BENCH_ACTIVE=str(args.active), BENCH_INFER_LATENCY=str(args.latency),
+               BENCH_INFER_LATENCY_PER_IMAGE=str(args.latency_per_frame), BENCH_DEVICE_STREAMS=str(args.device_streams),
+               BENCH_TRACE=os.path.join(work_dir, "trace.jsonl"))
+    command = [sys.executable, RUN_SAMPLE, os.path.join(REPO_DIR, script)]
+    if platform == "greengrass":
+        env.update(PARAM_MODEL_XML=model_xml, PARAM_INPUT_SOURCE=",".join(sources), PARAM_DEVICE="CPU",
+                   PARAM_OUTPUT_DIRECTORY=work_dir, PARAM_CPU_EXTENSION_PATH="",
+                   PARAM_BATCH_SIZE=str(args.batch_size), PARAM_NUM_REQUESTS=str(args.num_requests))
+        env.update(setting.split("=", 1) for setting in args.gg_env)
+    else:
+        env.update(OUTPUT_DIR=work_dir)
+        command += ["-m", model_xml, "-d", "CPU", "-b", str(args.batch_size), "-i"] + sources
+        if args.num_requests > 1:
+            command += ["--async", "-nireq", str(args.num_requests)]
+        command += shlex.split(args.azure_args)
+    return command, env, sources + [model_xml, os.path.splitext(model_xml)[0] + ".bin"]
+
+
+def run_sample(name, args):
+    """Run a sample to the end of its synthetic input and return its results."""
+    work_dir = tempfile.mkdtemp(prefix="faas_bench_")
+    try:
+        command, env, placeholders = sample_command(name, args, work_dir)
+        for path in placeholders:
+            # The samples check that the model and input files exist, the stand-ins never read them
+            open(path, "w").close()
+        start_time = time.time()
+        with open(os.path.join(work_dir, "sample.log"), "w") as log_file:
+            process = subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+            deadline = start_time + args.timeout
+            while True:
+                # wait4 returns the resource usage of this sample alone, including its reaped worker processes
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid or time.time() > deadline:
+                    break
+                time.sleep(0.05)
+            if not pid:
+                process.kill()
+                pid, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        wall_seconds = time.time() - start_time
+        if process.returncode:
+            with open(os.path.join(work_dir, "sample.log")) as log_file:
+                print(log_file.read()[-2000:])
+        return summarize(name, os.path.join(work_dir, "trace.jsonl"), wall_seconds, process.returncode,
+                         usage.ru_maxrss)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def summarize(name, trace_path, wall_seconds, status, max_rss_kb):
+    """Turn the events the stand-ins traced into throughput, latency and publishing results."""
+    read_times = {}
+    result_times = {}
+    infer_starts = []
+    publish_count = 0
+    publish_bytes = 0
+    if os.path.exists(trace_path):
+        with open(trace_path) as trace_file:
+            for line in trace_file:
+                event = json.loads(line)
+                if event["event"] == "read":
+                    read_times[event["frame"]] = event["time"]
+                elif event["event"] == "result":
+                    for frame in event["frames"]:
+                        # Slots past the end of a partial batch hold stale frames, keep the first result only
+                        result_times.setdefault(frame, event["time"])
+                elif event["event"] == "publish":
+                    publish_count += 1
+                    publish_bytes += event["bytes"]
+    latencies = [result_times[frame] - read_times[frame] for frame in result_times if frame in read_times]
+    duration = max(result_times.values()) - min(read_times.values()) if result_times and read_times else 0.0
+    results = OrderedDict([
+        ("sample", name),
+        ("exit_status", status),
+        ("frames_read", len(read_times)),
+        ("frames_inferred", len(result_times)),
+        ("fps", round(len(result_times) / duration, 2) if duration else 0.0),
+        ("latency_ms", percentiles(latencies)),
+        ("messages", publish_count),
+        ("message_bytes", publish_bytes),
+        ("peak_rss_mb", round(max_rss_kb / 1024.0, 1)),
+        ("wall_seconds", round(wall_seconds, 2)),
+    ])
+    results["latency_p95_ms"] = results["latency_ms"].get("p95", 0.0)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a message for every result that got worse than the baseline by more than tolerance."""
+    regressions = []
+    baseline = dict((result["sample"], result) for result in baseline["results"])
+    for result in results:
+        previous = baseline.get(result["sample"])
+        if previous is None:
+            continue
+        for key in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            if not previous.get(key):
+                continue
+            change = (result[key] - previous[key]) / float(previous[key])
+            if (key in HIGHER_IS_BETTER and change < -tolerance) or (key in LOWER_IS_BETTER and change > tolerance):
+                regressions.append("{}: {} {} -> {} ({:+.0%})".format(result["sample"], key, previous[key],
+                                                                      result[key], change))
+    return regressions
+
+
+def main():
+    args = build_argparser().parse_args()
+    assert args.frames < 0xffff, "The synthetic frames can stamp up to 65534 frame numbers"
+    results = []
+    for name in args.samples.split(","):
+        print("Running {}...".format(name))
+        results.append(run_sample(name, args))
+
+    print("{:>22} {:>8} {:>8} {:>9} {:>9} {:>9} {:>9} {:>8}".format(
+        "sample", "frames", "fps", "p50 ms", "p95 ms", "p99 ms", "messages", "rss MB"))
+    for result in results:
+        latency = result["latency_ms"]
+        print("{:>22} {:>8} {:>8.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9} {:>8.1f}".format(
+            result["sample"], result["frames_inferred"], result["fps"], latency.get("p50", 0.0),
+            latency.get("p95", 0.0), latency.get("p99", 0.0), result["messages"], result["peak_rss_mb"]))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"config": vars(args), "python": sys.version.split()[0], "results": results}, output_file,
+                      indent=2)
+
+    failed = [result["sample"] for result in results if result["exit_status"]]
+    if failed:
+        print("Samples failed: {}".format(", ".join(failed)))
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print("Regression: " + regression)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,128 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import timeit
+from argparse import ArgumentParser
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.detections import parse_ssd_detections, detection_boxes, detections_to_json
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Compare per-row Python and vectorized NumPy SSD post-processing.")
+    parser.add_argument("-r", "--rows", help="Candidate rows per DetectionOutput blob", default=200, type=int)
+    parser.add_argument("-k", "--objects", help="Rows above the probability threshold", default=10, type=int)
+    parser.add_argument("-pt", "--prob_threshold", help="Probability threshold for detections filtering",
+                        default=0.5, type=float)
+    parser.add_argument("-n", "--iterations", help="Number of timed iterations", default=2000, type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def make_ssd_output(rows, objects, prob_threshold, seed=0):
+    """Return a (1, 1, rows, 7) float32 DetectionOutput blob with `objects` confident rows."""
+    rng = np.random.RandomState(seed)
+    output = np.zeros((1, 1, rows, 7), dtype=np.float32)
+    candidates = output[0][0]
+    candidates[:, 1] = rng.randint(1, 21, rows)
+    candidates[:, 2] = rng.uniform(0.0, prob_threshold, rows)
+    candidates[rng.choice(rows, objects, replace=False), 2] = rng.uniform(prob_threshold + 0.01, 1.0, objects)
+    corners = np.sort(rng.uniform(0.0, 1.0, (rows, 2, 2)), axis=1)
+    candidates[:, 3:5] = corners[:, 0]
+    candidates[:, 5:7] = corners[:, 1]
+    return output
+
+
+def legacy_parse(output, width, height, prob_threshold):
+    """Per-row post-processing as the samples did it before vectorization."""
+    res_json = {}
+    boxes = []
+    object_id = 0
+    for obj in output[0][0]:
+        if obj[2] > prob_threshold:
+            xmin = int(obj[3] * width)
+            ymin = int(obj[4] * height)
+            xmax = int(obj[5] * width)
+            ymax = int(obj[6] * height)
+            boxes.append((xmin, ymin, xmax, ymax))
+            res_json["Object" + str(object_id)] = {"label": int(obj[1]), "confidence": round(float(obj[2]), 2),
+                                                   "xmin": round(float(obj[3]), 2), "ymin": round(float(obj[4]), 2),
+                                                   "xmax": round(float(obj[5]), 2), "ymax": round(float(obj[6]), 2)}
+            object_id += 1
+    return res_json, boxes
+
+
+def vectorized_parse(output, width, height, prob_threshold):
+    detections = parse_ssd_detections(output[0][0], prob_threshold)
+    boxes = detection_boxes(detections, width, height)
+    return detections, boxes
+
+
+def time_per_call(function, iterations):
+    """Return the mean time of one call in microseconds."""
+    return timeit.timeit(function, number=iterations) / iterations * 1e6
+
+
+def main():
+    args = build_argparser().parse_args()
+    output = make_ssd_output(args.rows, args.objects, args.prob_threshold)
+    width, height = 1920.0, 1080.0
+    legacy_json, legacy_boxes = legacy_parse(output, width, height, args.prob_threshold)
+    detections, boxes = vectorized_parse(output, width, height, args.prob_threshold)
+    assert legacy_json == detections_to_json(detections), "Vectorized output differs from the per-row loop"
+    assert legacy_boxes == [tuple(box) for box in boxes.tolist()], "Vectorized boxes differ from the per-row loop"
+
+    results = {
+        "rows": args.rows,
+        "objects": args.objects,
+        "legacy_parse_and_json_us": time_per_call(lambda: legacy_parse(output, width, height, args.prob_threshold),
+                                                  args.iterations),
+        "vectorized_parse_us": time_per_call(lambda: vectorized_parse(output, width, height, args.prob_threshold),
+                                             args.iterations),
+        "vectorized_json_us": time_per_call(lambda: detections_to_json(detections), args.iterations),
+    }
+    print("Rows: {rows}, objects above threshold: {objects}".format(**results))
+    print("Per-row loop, parse and JSON (every frame): {legacy_parse_and_json_us:10.1f} us".format(**results))
+    print("Vectorized parse (every frame):             {vectorized_parse_us:10.1f} us".format(**results))
+    print("Vectorized JSON (reported frames only):     {vectorized_json_us:10.1f} us".format(**results))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,79 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import io
+import os
+import random
+import bench_trace
+
+# Share of the calls that fail, to exercise the retries of the sinks
+FAILURE_RATE = float(os.environ.get("BENCH_CLOUD_FAILURE_RATE", "0"))
+
+
+class Client(object):
+    """Fake boto3 client that records every call with the size of its payload and reports success.
+
+    Bodies streamed from a file object, as by upload_fileobj, are read to
+    count their size. With BENCH_CLOUD_FAILURE_RATE, that share of the calls
+    raise an error instead, except for put_records, which fails that share of
+    its entries the way a throttled Kinesis stream does. Tests set calls to a
+    list to keep the (operation, keyword arguments) of every call, with the
+    body read into a fresh file object.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.calls = None
+
+    def __getattr__(self, operation):
+        def call(**kwargs):
+            records = kwargs.get("Records", [])
+            size = sum(len(record["Data"]) for record in records) + len(kwargs.get("Data", kwargs.get("Body", "")))
+            if "Fileobj" in kwargs:
+                body = kwargs["Fileobj"].read()
+                size += len(body)
+                if self.calls is not None:
+                    kwargs["Fileobj"] = io.BytesIO(body)
+            if self.calls is not None:
+                self.calls.append((operation, kwargs))
+            if not records and random.random() < FAILURE_RATE:
+                bench_trace.record("publish_failed", service=self.service, operation=operation, bytes=size)
+                raise IOError("Simulated {0} {1} failure".format(self.service, operation))
+            results = [{"ErrorCode": "ProvisionedThroughputExceededException"} if random.random() < FAILURE_RATE
+                       else {"SequenceNumber": "0"} for _ in records]
+            failed = sum("ErrorCode" in result for result in results)
+            bench_trace.record("publish", service=self.service, operation=operation, bytes=size, failed=failed)
+            return {"FailedRecordCount": failed, "Records": results}
+        return call
+
+
+def client(service, *args, **kwargs):
+    return Client(service)
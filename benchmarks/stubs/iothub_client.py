@@ -0,0 +1,82 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import bench_trace
+
+
+class IoTHubTransportProvider(object):
+    MQTT = 1
+    AMQP = 2
+    HTTP = 3
+
+
+class IoTHubClientResult(object):
+    OK = 0
+
+
+class IoTHubMessageDispositionResult(object):
+    ACCEPTED = 0
+
+
+class IoTHubClientError(Exception):
+    pass
+
+
+class IoTHubError(Exception):
+    pass
+
+
+class DeviceMethodReturnValue(object):
+    def __init__(self):
+        self.response = None
+        self.status = None
+
+
+class IoTHubMessage(object):
+    def __init__(self, message):
+        self.message = message
+
+    def get_string(self):
+        return self.message
+
+
+class IoTHubClient(object):
+    """Fake IoT Hub device client that records the size of every sent message and confirms it at once."""
+
+    def __init__(self, connection_string, protocol):
+        self.method_callback = None
+
+    def set_device_method_callback(self, callback, user_context):
+        self.method_callback = callback
+
+    def send_event_async(self, message, callback, user_context):
+        bench_trace.record("publish", bytes=len(message.message))
+        callback(message, IoTHubClientResult.OK, user_context)
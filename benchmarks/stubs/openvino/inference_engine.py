@@ -0,0 +1,213 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import os
+import json
+import threading
+import time
+import numpy as np
+
+import bench_trace
+from synthetic_video import decode_stamp
+
+# Topology the fake network mimics: "ssd" (300x300 input, DetectionOutput) or "classification" (224x224, softmax)
+MODEL_KIND = os.environ.get("BENCH_MODEL_KIND", "ssd")
+# Seconds an infer request takes: a fixed part plus a part per image of the batch
+LATENCY = float(os.environ.get("BENCH_INFER_LATENCY", "0.005"))
+LATENCY_PER_IMAGE = float(os.environ.get("BENCH_INFER_LATENCY_PER_IMAGE", "0.015"))
+# Infer requests the device runs at the same time, the others queue up behind them
+DEVICE_STREAMS = int(os.environ.get("BENCH_DEVICE_STREAMS", "1"))
+# Seconds compiling a network takes, an imported network skips them
+COMPILE_LATENCY = float(os.environ.get("BENCH_COMPILE_LATENCY", "0"))
+# Whether the fake device can export compiled networks, like MYRIAD, or cannot, like CPU before 2021.x
+EXPORT_SUPPORTED = os.environ.get("BENCH_EXPORT_SUPPORTED", "true").lower() == "true"
+
+SSD_ROWS_PER_IMAGE = 200
+# Status InferRequest.wait(0) returns while the request is still running
+RESULT_NOT_READY = -9
+NUM_CLASSES = 1000
+
+
+def fake_output(batch_size):
+    """Return an output blob of the shape and value range the real topology produces for a batch."""
+    rng = np.random.RandomState(batch_size)
+    if MODEL_KIND == "ssd":
+        # Rows sorted by image, few of them confident, boxes with normalized corners in order
+        rows = np.zeros((batch_size * SSD_ROWS_PER_IMAGE, 7), np.float32)
+        rows[:, 0] = np.repeat(np.arange(batch_size), SSD_ROWS_PER_IMAGE)
+        rows[:, 1] = rng.randint(1, 21, len(rows))
+        rows[:, 2] = rng.beta(0.5, 5.0, len(rows))
+        corners = rng.rand(len(rows), 2, 2)
+        rows[:, 3:5] = corners.min(axis=1)
+        rows[:, 5:7] = corners.max(axis=1)
+        return rows.reshape(1, 1, -1, 7)
+    logits = rng.randn(batch_size, NUM_CLASSES).astype(np.float32) * 3
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+class _InputInfo(object):
+    def __init__(self, shape):
+        self.shape = shape
+        self.precision = "FP32"
+        self.layout = "NCHW"
+
+
+class IENetwork(object):
+    """Fake network with the input and output of the topology selected by BENCH_MODEL_KIND."""
+
+    def __init__(self, model=None, weights=None):
+        size = 300 if MODEL_KIND == "ssd" else 224
+        self.inputs = {"data": _InputInfo([1, 3, size, size])}
+        self.outputs = {"detection_out" if MODEL_KIND == "ssd" else "prob": None}
+
+    @classmethod
+    def from_ir(cls, model, weights):
+        return cls(model, weights)
+
+    @property
+    def batch_size(self):
+        return self.inputs["data"].shape[0]
+
+    @batch_size.setter
+    def batch_size(self, batch_size):
+        self.inputs["data"].shape = [batch_size] + self.inputs["data"].shape[1:]
+
+    def reshape(self, input_shapes):
+        for name, shape in input_shapes.items():
+            self.inputs[name].shape = list(shape)
+
+
+class InferRequest(object):
+    """Fake infer request that completes LATENCY (+ LATENCY_PER_IMAGE per image) after the device is free."""
+
+    def __init__(self, exec_net, input_shapes):
+        self.exec_net = exec_net
+        # Input blobs of the request, FP32 like the inputs of an IR that does not set their precision
+        self.inputs = dict((name, np.zeros(shape, np.float32)) for name, shape in input_shapes.items())
+        self.outputs = {}
+        self.ready_time = None
+        self.frames = []
+
+    def async_infer(self, inputs=None):
+        for name, array in (inputs or {}).items():
+            np.copyto(self.inputs[name], array)
+        batch = next(iter(self.inputs.values()))
+        stamps = [decode_stamp(batch[i, :, 0, 0]) for i in range(batch.shape[0])]
+        self.frames = ["%d:%d" % stamp for stamp in stamps if stamp is not None]
+        self.ready_time = self.exec_net.schedule(LATENCY + LATENCY_PER_IMAGE * batch.shape[0])
+        self.outputs = {self.exec_net.out_blob: self.exec_net.output}
+
+    def wait(self, timeout=-1):
+        if self.ready_time is not None:
+            delay = self.ready_time - time.time()
+            if delay > 0:
+                if timeout == 0:
+                    return RESULT_NOT_READY
+                time.sleep(delay)
+            bench_trace.record("result", frames=self.frames)
+            self.ready_time = None
+        return 0
+
+    def infer(self, inputs=None):
+        self.async_infer(inputs)
+        self.wait()
+
+
+class ExecutableNetwork(object):
+    def __init__(self, network, num_requests):
+        self.out_blob = next(iter(network.outputs))
+        self.batch_size = network.batch_size
+        self.output = fake_output(network.batch_size)
+        self.input_shapes = dict((name, tuple(info.shape)) for name, info in network.inputs.items())
+        self.requests = [InferRequest(self, self.input_shapes) for _ in range(num_requests)]
+        self.stream_free_times = [0.0] * DEVICE_STREAMS
+        self.lock = threading.Lock()
+
+    def schedule(self, latency):
+        """Queue a request of the given latency on the first free device stream and return its completion time."""
+        with self.lock:
+            stream = self.stream_free_times.index(min(self.stream_free_times))
+            ready_time = max(time.time(), self.stream_free_times[stream]) + latency
+            self.stream_free_times[stream] = ready_time
+        return ready_time
+
+    def start_async(self, request_id, inputs):
+        self.requests[request_id].async_infer(inputs)
+
+    def infer(self, inputs):
+        request = InferRequest(self, self.input_shapes)
+        request.infer(inputs)
+        return request.outputs
+
+    def export(self, model_file):
+        if not EXPORT_SUPPORTED:
+            raise RuntimeError("Export is not supported by the device plugin")
+        with open(model_file, "w") as blob:
+            json.dump({"kind": MODEL_KIND, "batch_size": self.batch_size}, blob)
+
+
+class IEPlugin(object):
+    def __init__(self, device, plugin_dirs=None):
+        self.device = device
+
+    def add_cpu_extension(self, extension_path):
+        pass
+
+    def set_config(self, config):
+        pass
+
+    def load(self, network, num_requests=1):
+        time.sleep(COMPILE_LATENCY)
+        return ExecutableNetwork(network, num_requests)
+
+
+class IECore(object):
+    """Fake core that loads networks like IEPlugin and imports the blobs written by ExecutableNetwork.export()."""
+
+    def add_extension(self, extension_path, device_name):
+        pass
+
+    def set_config(self, config, device_name):
+        pass
+
+    def load_network(self, network, device_name, config=None, num_requests=1):
+        time.sleep(COMPILE_LATENCY)
+        return ExecutableNetwork(network, num_requests)
+
+    def import_network(self, model_file, device_name, config=None, num_requests=1):
+        with open(model_file) as blob:
+            meta = json.load(blob)
+        if meta["kind"] != MODEL_KIND:
+            raise RuntimeError("Imported network does not match the device")
+        network = IENetwork()
+        network.batch_size = meta["batch_size"]
+        return ExecutableNetwork(network, num_requests)
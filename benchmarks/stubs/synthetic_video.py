@@ -0,0 +1,120 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import os
+import time
+import zlib
+import cv2
+import numpy as np
+
+import bench_trace
+
+
+def frame_tag(source):
+    """Return the value stamped in the third channel to tell the frames of a source from the others."""
+    return zlib.crc32(source.encode("utf-8") if not isinstance(source, bytes) else source) & 0xff
+
+
+def decode_stamp(pixel):
+    """Return (source tag, frame number) stamped in a BGR pixel, or None for an empty batch slot."""
+    frame_no = int(round(pixel[0])) + 256 * int(round(pixel[1])) - 1
+    if frame_no < 0:
+        return None
+    return int(round(pixel[2])), frame_no
+
+
+class SyntheticVideoCapture(object):
+    """Stand-in for cv2.VideoCapture that produces BENCH_FRAMES noise frames of BENCH_WIDTH x BENCH_HEIGHT.
+
+    With BENCH_FPS the frames are paced like a camera, otherwise they come as
+    fast as from a file. A box moves across the otherwise static scene in the
+    first BENCH_ACTIVE share of every 100 frames. Each frame carries its number in a top-left block that
+    survives the resize, so the fake inference engine can tell which frames a
+    batch holds and the end-to-end latency of every frame can be measured.
+    There is no GStreamer behind it, so GStreamer pipelines fail to open.
+    """
+
+    def __init__(self, source, api_preference=None, params=None):
+        self.source = str(source)
+        self.num_frames = int(os.environ.get("BENCH_FRAMES", "300"))
+        self.width = int(os.environ.get("BENCH_WIDTH", "1280"))
+        self.height = int(os.environ.get("BENCH_HEIGHT", "720"))
+        self.fps = float(os.environ.get("BENCH_FPS", "0"))
+        self.active = float(os.environ.get("BENCH_ACTIVE", "0"))
+        self.tag = frame_tag(self.source)
+        self.stamp_size = max(self.width, self.height) // 64 + 4
+        self.base = np.random.RandomState(self.tag).randint(0, 256, (self.height, self.width, 3)).astype(np.uint8)
+        self.position = 0
+        self.start_time = None
+        self.opened = api_preference != cv2.CAP_GSTREAMER
+
+    def isOpened(self):
+        return self.opened
+
+    def _advance(self):
+        if self.position >= self.num_frames:
+            return False
+        if self.fps:
+            if self.start_time is None:
+                self.start_time = time.time()
+            delay = self.start_time + self.position / self.fps - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        self.position += 1
+        return True
+
+    def grab(self):
+        return self._advance()
+
+    def read(self, image=None):
+        if not self._advance():
+            return False, None
+        frame = image if image is not None else np.empty_like(self.base)
+        np.copyto(frame, self.base)
+        if self.position % 100 < self.active * 100:
+            size = self.height // 4
+            left = self.position * 8 % (self.width - size)
+            cv2.rectangle(frame, (left, size), (left + size, 2 * size), (255, 255, 255), -1)
+        frame[:self.stamp_size, :self.stamp_size] = (self.position & 0xff, self.position >> 8 & 0xff, self.tag)
+        bench_trace.record("read", frame="%d:%d" % (self.tag, self.position - 1))
+        return True, frame
+
+    def get(self, prop):
+        values = {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+                  cv2.CAP_PROP_FPS: self.fps or 30.0, cv2.CAP_PROP_POS_FRAMES: self.position,
+                  cv2.CAP_PROP_FRAME_COUNT: self.num_frames}
+        return float(values.get(prop, 0))
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
@@ -0,0 +1,167 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import timeit
+from argparse import ArgumentParser
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.detections import DETECTION_DTYPE, box_iou, detection_corners
+from faas_common.tracking import IouTracker
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Measure throughput and accuracy of detecting every K frames and tracking "
+                                        "in between, on synthetic moving objects.")
+    parser.add_argument("-k", "--detect_every", help="Comma-separated values of K to measure", default="1,2,3,5,10",
+                        type=str)
+    parser.add_argument("-n", "--frames", help="Number of frames of the synthetic scene", default=900, type=int)
+    parser.add_argument("--objects", help="Number of objects moving across the scene", default=8, type=int)
+    parser.add_argument("--speed", help="Largest object speed, in image widths per frame", default=0.006, type=float)
+    parser.add_argument("--noise", help="Standard deviation of the detected box corners, in image widths",
+                        default=0.004, type=float)
+    parser.add_argument("--miss", help="Probability that the detector misses an object", default=0.05, type=float)
+    parser.add_argument("-dl", "--detector_latency", help="Milliseconds one detection takes, to model throughput",
+                        default=30.0, type=float)
+    parser.add_argument("--seed", help="Seed of the synthetic scene", default=0, type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def make_scene(frames, objects, speed, seed=0):
+    """Return labels (O,) and ground truth boxes (frames, O, 4) of objects bouncing around a normalized scene."""
+    rng = np.random.RandomState(seed)
+    labels = rng.randint(1, 6, objects).astype(np.int32)
+    sizes = rng.uniform(0.05, 0.2, (objects, 2))
+    positions = rng.uniform(0.0, 1.0, (objects, 2)) * (1.0 - sizes)
+    velocities = rng.uniform(-speed, speed, (objects, 2))
+    boxes = np.empty((frames, objects, 4), dtype=np.float32)
+    for frame in range(frames):
+        boxes[frame, :, :2] = positions
+        boxes[frame, :, 2:] = positions + sizes
+        positions = positions + velocities
+        bounced = (positions < 0) | (positions > 1.0 - sizes)
+        velocities[bounced] = -velocities[bounced]
+        positions = np.clip(positions, 0.0, 1.0 - sizes)
+    return labels, boxes
+
+
+def detect(labels, boxes, noise, miss, rng):
+    """Return the noisy DETECTION_DTYPE array a detector would produce for the ground truth boxes of a frame."""
+    found = rng.uniform(0.0, 1.0, len(labels)) >= miss
+    noisy = boxes[found] + rng.normal(0.0, noise, (int(found.sum()), 4))
+    detections = np.empty(len(noisy), dtype=DETECTION_DTYPE)
+    detections["label"] = labels[found]
+    detections["confidence"] = rng.uniform(0.6, 1.0, len(noisy))
+    for column, field in enumerate(("xmin", "ymin", "xmax", "ymax")):
+        detections[field] = noisy[:, column]
+    return detections
+
+
+class AccuracyCounter(object):
+    """Accumulate how well reported boxes cover the ground truth, and how often an object changes its track id."""
+
+    def __init__(self, objects):
+        self.ious = []
+        self.last_ids = [None] * objects
+        self.id_switches = 0
+
+    def add(self, labels, truth, detections, track_ids=None):
+        iou = box_iou(truth, detection_corners(detections)) if len(detections) else np.zeros((len(truth), 0))
+        iou[labels[:, None] != detections["label"][None, :]] = 0.0
+        best = iou.argmax(axis=1) if iou.shape[1] else np.zeros(len(truth), dtype=np.int64)
+        best_iou = iou.max(axis=1) if iou.shape[1] else np.zeros(len(truth))
+        self.ious.extend(best_iou.tolist())
+        if track_ids is not None:
+            for obj, (match, overlap) in enumerate(zip(best.tolist(), best_iou.tolist())):
+                if overlap >= 0.5:
+                    if self.last_ids[obj] is not None and self.last_ids[obj] != track_ids[match]:
+                        self.id_switches += 1
+                    self.last_ids[obj] = track_ids[match]
+
+    def summary(self):
+        ious = np.array(self.ious)
+        return {"mean_iou": round(float(ious.mean()), 3), "recall_at_0_5": round(float((ious >= 0.5).mean()), 3)}
+
+
+def run(labels, boxes, detect_every, args):
+    """Detect every detect_every frames, tracking or reusing the last detections in between."""
+    rng = np.random.RandomState(args.seed + 1)
+    tracker = IouTracker()
+    tracked = AccuracyCounter(len(labels))
+    reused = AccuracyCounter(len(labels))
+    tracker_seconds = 0.0
+    detections = None
+    detector_calls = 0
+    for frame, truth in enumerate(boxes):
+        if frame % detect_every == 0:
+            detections = detect(labels, truth, args.noise, args.miss, rng)
+            detector_calls += 1
+            start = timeit.default_timer()
+            tracks, track_ids = tracker.step(detections)
+        else:
+            start = timeit.default_timer()
+            tracks, track_ids = tracker.step()
+        tracker_seconds += timeit.default_timer() - start
+        tracked.add(labels, truth, tracks, track_ids)
+        reused.add(labels, truth, detections)
+    frame_seconds = (detector_calls * args.detector_latency / 1000.0 + tracker_seconds) / len(boxes)
+    result = {"detect_every": detect_every, "detector_calls": detector_calls,
+              "tracker_us_per_frame": round(tracker_seconds / len(boxes) * 1e6, 1),
+              "modeled_fps": round(1.0 / frame_seconds, 1), "track_ids": tracker.next_id - 1,
+              "id_switches": tracked.id_switches}
+    result.update(("tracked_" + key, value) for key, value in tracked.summary().items())
+    result.update(("reused_" + key, value) for key, value in reused.summary().items())
+    return result
+
+
+def main():
+    args = build_argparser().parse_args()
+    labels, boxes = make_scene(args.frames, args.objects, args.speed, args.seed)
+    results = [run(labels, boxes, int(k), args) for k in args.detect_every.split(",")]
+    print("Frames: {}, objects: {}, detector latency: {} ms".format(args.frames, args.objects, args.detector_latency))
+    print("   K   fps  tracker us  tracked IoU  recall  reused IoU  recall  track ids  id switches")
+    for result in results:
+        print("{detect_every:4d} {modeled_fps:5.0f} {tracker_us_per_frame:11.1f} {tracked_mean_iou:12.3f} "
+              "{tracked_recall_at_0_5:7.3f} {reused_mean_iou:11.3f} {reused_recall_at_0_5:7.3f} {track_ids:10d} "
+              "{id_switches:12d}".format(**result))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
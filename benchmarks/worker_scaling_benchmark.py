@@ -0,0 +1,126 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import sys
+import os
+import json
+import timeit
+from argparse import ArgumentParser
+import numpy as np
+
+from openvino.inference_engine import IEPlugin
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from faas_common.inference import InferRequestRing
+from faas_common.network_cache import load_network
+from faas_common.worker_pool import InferenceWorkerPool, numa_cpu_sets
+
+
+def build_argparser():
+    parser = ArgumentParser(description="Measure throughput of an IR model against the number of worker processes.")
+    parser.add_argument("-m", "--model", help="Path to an .xml file with a trained model.", required=True, type=str)
+    parser.add_argument("-l", "--cpu_extension",
+                        help="MKLDNN (CPU)-targeted custom layers.Absolute path to a shared library with the kernels "
+                             "impl.", type=str, default=None)
+    parser.add_argument("-pp", "--plugin_dir", help="Path to a plugin folder", type=str, default=None)
+    parser.add_argument("-d", "--device", help="Target device to infer on", default="CPU", type=str)
+    parser.add_argument("-w", "--workers", help="Comma separated worker counts to measure", default="1,2,4",
+                        type=str)
+    parser.add_argument("-b", "--batch_size", help="Number of frames per infer request", default=1, type=int)
+    parser.add_argument("-nireq", "--num_requests", help="Number of infer requests (or shared slots per worker) "
+                        "kept in flight", default=2, type=int)
+    parser.add_argument("-n", "--num_batches", help="Number of batches to infer per configuration", default=200,
+                        type=int)
+    parser.add_argument("-o", "--output", help="Optional path of a JSON file to store the results", default=None,
+                        type=str)
+    return parser
+
+
+def run(infer_ring, input_blob, shape, num_batches):
+    """Keep infer_ring busy with num_batches synthetic batches and return the frames per second."""
+    batch = np.random.randint(0, 255, shape).astype(np.uint8)
+    submitted = 0
+    collected = 0
+    start_time = timeit.default_timer()
+    while collected < num_batches:
+        if submitted < num_batches and not infer_ring.full():
+            infer_ring.submit({input_blob: batch}, submitted)
+            submitted += 1
+            continue
+        seq, _, _ = infer_ring.collect()
+        assert seq == collected, "Results must come back in submission order"
+        collected += 1
+    return num_batches * shape[0] / (timeit.default_timer() - start_time)
+
+
+def main():
+    args = build_argparser().parse_args()
+    cpu_extension = args.cpu_extension if args.cpu_extension and 'CPU' in args.device else None
+    pool_results = []
+
+    # The pools come first, their workers are forked before this process loads a plugin
+    for num_workers in [int(w) for w in args.workers.split(",")]:
+        pool = InferenceWorkerPool(num_workers, args.model, args.device, args.batch_size, cpu_extension,
+                                   args.plugin_dir, args.num_requests)
+        try:
+            pool.wait_ready()
+            pool_results.append({"workers": num_workers,
+                                 "fps": run(pool, pool.input_blob, pool.shape, args.num_batches)})
+        finally:
+            pool.close()
+
+    # Baseline: a single process driving one executable network, as the samples do by default
+    plugin = IEPlugin(device=args.device, plugin_dirs=args.plugin_dir)
+    if cpu_extension:
+        plugin.add_cpu_extension(cpu_extension)
+    exec_net, input_blob, _, shape, _ = load_network(plugin, args.model, args.device, args.num_requests,
+                                                     args.batch_size, cpu_extension)
+    infer_ring = InferRequestRing(exec_net, args.num_requests)
+    results = [{"workers": 0, "fps": run(infer_ring, input_blob, shape, args.num_batches)}] + pool_results
+    infer_ring.close()
+    del exec_net
+    del plugin
+
+    print("NUMA nodes: {}".format(len(numa_cpu_sets())))
+    print("{:>10} {:>10} {:>10}".format("workers", "fps", "speedup"))
+    for result in results:
+        result["speedup"] = result["fps"] / results[0]["fps"]
+        print("{:>10} {:>10.1f} {:>10.2f}".format(result["workers"] or "in-proc", result["fps"], result["speedup"]))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"model": args.model, "device": args.device, "batch_size": args.batch_size,
+                       "num_requests": args.num_requests, "numa_nodes": len(numa_cpu_sets()),
+                       "results": results}, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,125 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+from faas_common.classification import top_k
+
+# Report modes: the results of the last frame of the interval, or a summary of all its frames
+REPORT_LAST = "last"
+REPORT_AGGREGATE = "aggregate"
+REPORT_MODES = (REPORT_LAST, REPORT_AGGREGATE)
+
+
+class DetectionAggregator(object):
+    """Summarize the SSD detections of every frame in a reporting interval.
+
+    Keeps the number of detections and the highest confidence per label, so a
+    report can describe the whole interval instead of only its last frame.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.max_confidence = np.zeros(0, dtype=np.float32)
+
+    def add(self, detections):
+        """Account for the DETECTION_DTYPE array of one frame."""
+        self.frames += 1
+        if not len(detections):
+            return
+        labels = detections["label"]
+        size = int(labels.max()) + 1
+        if size > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(size - len(self.counts), dtype=np.int64)])
+            self.max_confidence = np.concatenate([self.max_confidence,
+                                                  np.zeros(size - len(self.max_confidence), dtype=np.float32)])
+        self.counts += np.bincount(labels, minlength=len(self.counts))
+        np.maximum.at(self.max_confidence, labels, detections["confidence"])
+
+    def summary(self, class_name=None):
+        """Return the JSON summary of the interval, keyed by label."""
+        res_json = OrderedDict()
+        res_json["frames"] = self.frames
+        res_json["detections"] = int(self.counts.sum())
+        res_json["classes"] = OrderedDict()
+        for label in np.nonzero(self.counts)[0].tolist():
+            entry = {"count": int(self.counts[label]),
+                     "max_confidence": round(float(self.max_confidence[label]), 2)}
+            if class_name is not None:
+                entry["class"] = class_name(label)
+            res_json["classes"][str(label)] = entry
+        return res_json
+
+
+class ClassificationAggregator(object):
+    """Summarize the classification outputs of every frame in a reporting interval.
+
+    Keeps the highest probability seen per class and how often each class was
+    the top-1 result.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.max_probs = None
+        self.top1_counts = None
+
+    def add(self, probs):
+        """Account for the probability vector of one frame."""
+        self.frames += 1
+        if self.max_probs is None:
+            self.max_probs = np.array(probs, dtype=np.float32)
+            self.top1_counts = np.zeros(len(probs), dtype=np.int64)
+        else:
+            np.maximum(self.max_probs, probs, out=self.max_probs)
+        self.top1_counts[int(np.argmax(probs))] += 1
+
+    def summary(self, k, min_confidence=None, class_name=str):
+        """Return the JSON summary: top-k classes by highest probability and top-1 counts."""
+        res_json = OrderedDict()
+        res_json["frames"] = self.frames
+        res_json["Candidates"] = OrderedDict()
+        res_json["top1_counts"] = OrderedDict()
+        if self.max_probs is None:
+            return res_json
+        top_ind, top_scores = top_k(self.max_probs, k, min_confidence)
+        for i, score in zip(top_ind.tolist(), np.round(top_scores.astype(np.float64), 2).tolist()):
+            res_json["Candidates"][class_name(i)] = score
+        for i in np.nonzero(self.top1_counts)[0].tolist():
+            res_json["top1_counts"][class_name(i)] = int(self.top1_counts[i])
+        return res_json
@@ -0,0 +1,140 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import timeit
+import numpy as np
+
+
+class FrameBatcher(object):
+    """Accumulate pre-processed CHW frames into an NCHW batch.
+
+    A batch is ready once it holds batch_size frames or the first queued frame
+    has waited max_wait seconds. Frames may come from one or several sources;
+    the userdata attached to each frame is handed back with the batch so that
+    the per-image outputs can be fanned out to the right consumer.
+
+    If the CHW frame shape is known up front, num_buffers contiguous NCHW blobs
+    are allocated once and used in turn, one per infer request in flight, and
+    add_frame() pre-processes raw frames straight into them. buffers gives the
+    NCHW blobs to use in turn instead, e.g. the input blobs of the infer
+    requests from InferRequestRing.input_buffers().
+    """
+
+    def __init__(self, batch_size, max_wait=0.1, shape=None, num_buffers=1, dtype=np.uint8, buffers=None):
+        assert batch_size > 0, "Batch size must be positive"
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.buffers = []
+        self.batch = None
+        if buffers:
+            assert all(len(buffer) == batch_size for buffer in buffers), "Buffers must hold batch_size frames"
+            self.buffers = list(buffers)
+            self.batch = self.buffers[0]
+        elif shape is not None:
+            self.buffers = [np.zeros((batch_size,) + tuple(shape), dtype=dtype) for _ in range(num_buffers)]
+            self.batch = self.buffers[0]
+        self.userdata = []
+        self.first_frame_time = None
+
+    def pending(self):
+        """Return the number of frames accumulated for the next batch."""
+        return len(self.userdata)
+
+    def add(self, in_frame, userdata=None):
+        """Copy a CHW frame into the next free slot of the batch."""
+        assert self.pending() < self.batch_size, "Batch is full, take() it first"
+        if self.batch is None:
+            self.batch = np.zeros((self.batch_size,) + in_frame.shape, dtype=in_frame.dtype)
+        if not self.userdata:
+            self.first_frame_time = timeit.default_timer()
+        self.batch[len(self.userdata)] = in_frame
+        self.userdata.append(userdata)
+
+    def add_frame(self, frame, preprocess, userdata=None):
+        """Pre-process a raw frame into the next free slot of the batch.
+
+        preprocess(frame, out) writes the frame into the CHW slot out, see
+        faas_common.preprocess.Preprocessor. Needs the shape given up front.
+        """
+        assert self.pending() < self.batch_size, "Batch is full, take() it first"
+        assert self.batch is not None, "Frame shape must be given to add raw frames"
+        if not self.userdata:
+            self.first_frame_time = timeit.default_timer()
+        preprocess(frame, self.batch[len(self.userdata)])
+        self.userdata.append(userdata)
+
+    def ready(self):
+        """Return True if the batch is full or its oldest frame has waited long enough."""
+        if not self.userdata:
+            return False
+        if len(self.userdata) >= self.batch_size:
+            return True
+        return timeit.default_timer() - self.first_frame_time >= self.max_wait
+
+    def time_to_ready(self):
+        """Return the seconds until the batch is ready, 0 if it is, None while it holds no frame."""
+        if not self.userdata:
+            return None
+        if len(self.userdata) >= self.batch_size:
+            return 0.0
+        return max(0.0, self.first_frame_time + self.max_wait - timeit.default_timer())
+
+    def take(self):
+        """Return (batch, userdata list) and start a new batch.
+
+        The batch buffer is reused once all buffers have been taken, so it
+        must be consumed (e.g. by the infer request it was submitted to) by
+        then. Slots past len(userdata) hold stale frames whose outputs should
+        be ignored.
+        """
+        batch = self.batch
+        userdata = self.userdata
+        self.userdata = []
+        if len(self.buffers) > 1:
+            self.buffers.append(self.buffers.pop(0))
+            self.batch = self.buffers[0]
+        return batch, userdata
+
+
+def split_ssd_output(output, count):
+    """Split an SSD DetectionOutput blob of shape (1, 1, R, 7) into per-image rows.
+
+    Each row is [image_id, label, confidence, xmin, ymin, xmax, ymax]; rows are
+    grouped by image_id, which also drops the -1 terminator and padding rows.
+    """
+    rows = output[0][0]
+    image_ids = rows[:, 0]
+    return [rows[image_ids == i] for i in range(count)]
+
+
+def split_classification_output(output, count):
+    """Split a classification blob of shape (N, classes, ...) into per-image probability vectors."""
+    return list(output.reshape(output.shape[0], -1)[:count])
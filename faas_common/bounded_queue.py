@@ -0,0 +1,111 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import threading
+import timeit
+from collections import deque
+
+# Overflow policies applied when an item is put into a full queue
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class BoundedQueue(object):
+    """Thread-safe bounded FIFO with a configurable overflow policy.
+
+    DROP_OLDEST evicts the oldest queued item to make room, DROP_NEWEST discards
+    the item being put and BLOCK waits until a consumer frees a slot. Dropped
+    items are counted in `dropped`. After close(), get() drains the remaining
+    items and then returns None.
+    """
+
+    def __init__(self, maxsize, overflow=BLOCK):
+        assert maxsize > 0, "Queue size must be positive"
+        assert overflow in OVERFLOW_POLICIES, "Unknown overflow policy: %s" % overflow
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.items = deque()
+        self.closed = False
+        self.dropped = 0
+        self.put_count = 0
+        self.high_watermark = 0
+        self.cond = threading.Condition()
+
+    def depth(self):
+        """Return the number of queued items."""
+        with self.cond:
+            return len(self.items)
+
+    def put(self, item):
+        """Queue an item. Return False if it was discarded or the queue is closed."""
+        with self.cond:
+            if self.closed:
+                return False
+            if len(self.items) >= self.maxsize:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                elif self.overflow == DROP_OLDEST:
+                    self.items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self.items) >= self.maxsize and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        return False
+            self.items.append(item)
+            self.put_count += 1
+            self.high_watermark = max(self.high_watermark, len(self.items))
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Return the next item, or None once the queue is closed and empty (or on timeout)."""
+        deadline = None if timeout is None else timeit.default_timer() + timeout
+        with self.cond:
+            while not self.items and not self.closed:
+                remaining = None if deadline is None else deadline - timeit.default_timer()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        """Stop accepting items and wake up all waiting producers and consumers."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
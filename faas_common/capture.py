@@ -0,0 +1,283 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import threading
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+import cv2
+import numpy as np
+
+from faas_common.bounded_queue import BoundedQueue, DROP_OLDEST, DROP_NEWEST, BLOCK
+from faas_common.decode import open_capture
+from faas_common.frame_ring import SharedFrameRing, FORK_CONTEXT
+
+
+def is_live_source(source):
+    """Return True for cameras and network streams, False for file replay."""
+    if isinstance(source, int) or source == "cam":
+        return True
+    return source.startswith("/dev/video") or "://" in source
+
+
+class ThreadedCapture(object):
+    """Decode frames from a cv2.VideoCapture source in a background thread.
+
+    Decoded frames are handed to the inference loop through a BoundedQueue. Live
+    sources default to DROP_OLDEST with a single slot so that the loop always gets
+    the latest frame; file sources default to BLOCK so that no frame is skipped.
+    If given, on_frame() is called from the decode thread after each frame is
+    queued and once more when the source ends. decode holds the DecodeOptions
+    of the source, see faas_common.decode; decode_backend tells the backend
+    actually used.
+    """
+
+    def __init__(self, source, queue_size=None, overflow=None, on_frame=None, decode=None):
+        live = is_live_source(source)
+        if queue_size is None:
+            queue_size = 1 if live else 4
+        if overflow is None:
+            overflow = DROP_OLDEST if live else BLOCK
+        self.cap, self.decode_backend = open_capture(source, decode)
+        self.width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.frames = BoundedQueue(queue_size, overflow)
+        self.decoded_frames = 0
+        self.on_frame = on_frame
+        self.thread = threading.Thread(target=self._decode_loop)
+        self.thread.daemon = True
+        self.stopped = False
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        """Start the decode thread."""
+        self.thread.start()
+        return self
+
+    def _decode_loop(self):
+        while not self.stopped and self.cap.isOpened():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.decoded_frames += 1
+            self.frames.put((frame, self.cap.get(cv2.CAP_PROP_POS_FRAMES)))
+            if self.on_frame is not None:
+                self.on_frame()
+        self.frames.close()
+        if self.on_frame is not None:
+            self.on_frame()
+
+    def read(self):
+        """Return (ret, frame, frame_id) for the next decoded frame."""
+        item = self.frames.get()
+        if item is None:
+            return False, None, None
+        return self._frame(item)
+
+    def poll(self):
+        """Return (ret, frame, frame_id) without waiting, ret is None if no frame is decoded yet."""
+        item = self.frames.get(timeout=0)
+        if item is None:
+            # An empty closed queue means the source has ended
+            return (False if self.frames.closed and not self.frames.depth() else None), None, None
+        return self._frame(item)
+
+    def _frame(self, item):
+        return True, item[0], item[1]
+
+    def release(self, frame):
+        """Tell the capture that a frame read before is no longer used; decoded frames are owned by the caller."""
+        pass
+
+    def queue_depth(self):
+        """Return the number of decoded frames waiting for the inference loop."""
+        return self.frames.depth()
+
+    def dropped_frames(self):
+        """Return the number of decoded frames discarded by the overflow policy."""
+        return self.frames.dropped
+
+    def stop(self):
+        """Stop the decode thread and release the source."""
+        self.stopped = True
+        self.frames.close()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.cap.release()
+
+
+def _decode_process(source, ring, start_event, stop_event, decode):
+    """Decode a source straight into the slots of a SharedFrameRing until it ends or stop_event is set."""
+    # Forked ahead of time, the source is opened once the capture is started
+    start_event.wait()
+    if stop_event.is_set():
+        return
+    cap, _ = open_capture(source, decode)
+    height, width = ring.shape[:2]
+    while not stop_event.is_set() and cap.isOpened():
+        index = ring.acquire(timeout=0.1)
+        if index is None:
+            if ring.overflow == BLOCK:
+                continue
+            # No free slot: grab the frame without decoding it so that a live source does not fall behind
+            if not cap.grab():
+                break
+            ring.drop()
+            continue
+        slot = ring.frame(index)
+        ret, frame = cap.read(slot)
+        if not ret:
+            ring.release(index)
+            break
+        # VideoCapture reallocates if the frame does not match the slot, e.g. when the size was misreported
+        if frame.shape != slot.shape:
+            cv2.resize(frame, (width, height), dst=slot)
+        elif frame.ctypes.data != slot.ctypes.data:
+            np.copyto(slot, frame)
+        ring.publish(index, cap.get(cv2.CAP_PROP_POS_FRAMES))
+    cap.release()
+    ring.close()
+
+
+class ProcessCapture(ThreadedCapture):
+    """Decode frames in a separate process into a SharedFrameRing.
+
+    Same interface as ThreadedCapture, but decoding runs outside the inference
+    process and read() returns views of shared memory slots instead of copies.
+    Every frame read must be release()d exactly once when the caller is done
+    with it, which hands its slot back to the decoder; a frame that has to
+    live longer is copied first. The ring has hold_frames slots besides the
+    queue for the frames the caller holds at a time, e.g. those of the
+    batches in flight. Live sources skip frames when all slots are in use
+    (DROP_NEWEST), since a slot handed to the inference loop cannot be taken
+    back.
+
+    The decode process is forked by fork() or at the latest by start(). Call
+    fork() before the process starts any thread or loads an Inference Engine
+    plugin, a child forked while another thread holds a lock deadlocks on it;
+    the child then waits for start() before it opens the source.
+    """
+
+    def __init__(self, source, queue_size=None, overflow=None, on_frame=None, hold_frames=1, decode=None):
+        live = is_live_source(source)
+        if queue_size is None:
+            queue_size = 1 if live else 4
+        if overflow is None or overflow == DROP_OLDEST:
+            overflow = DROP_NEWEST if live or overflow == DROP_OLDEST else BLOCK
+        # Read the frame size here, the decode process opens the source on its own
+        probe, self.decode_backend = open_capture(source, decode)
+        self.opened = probe.isOpened()
+        self.width = probe.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = probe.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        probe.release()
+        self.ring = SharedFrameRing(queue_size + hold_frames, int(self.height), int(self.width), 3, overflow)
+        self.frames = BoundedQueue(self.ring.num_slots, BLOCK)
+        self.decoded_frames = 0
+        self.on_frame = on_frame
+        # Slots handed to the caller and not released yet
+        self.in_use = set()
+        self.start_event = FORK_CONTEXT.Event()
+        self.stop_event = FORK_CONTEXT.Event()
+        # Forked so that the decode process shares the ring
+        self.process = FORK_CONTEXT.Process(target=_decode_process,
+                                            args=(source, self.ring, self.start_event, self.stop_event, decode))
+        self.process.daemon = True
+        self.forked = False
+        self.thread = threading.Thread(target=self._decode_loop)
+        self.thread.daemon = True
+        self.stopped = False
+
+    def isOpened(self):
+        return self.opened
+
+    def fork(self):
+        """Fork the decode process, which waits for start() before it decodes anything."""
+        if not self.forked:
+            self.process.start()
+            self.forked = True
+        return self
+
+    def start(self):
+        """Start the decode process, forking it unless fork() did, and the thread relaying its frames."""
+        self.fork()
+        self.start_event.set()
+        self.thread.start()
+        return self
+
+    def _decode_loop(self):
+        while not self.stopped:
+            try:
+                index = self.ring.get(timeout=0.1)
+            except Empty:
+                continue
+            if index is None:
+                break
+            self.decoded_frames += 1
+            _, _, pos_frames = self.ring.metadata(index)
+            self.frames.put((self.ring.frame(index), pos_frames, index))
+            if self.on_frame is not None:
+                self.on_frame()
+        self.frames.close()
+        if self.on_frame is not None:
+            self.on_frame()
+
+    def _frame(self, item):
+        frame, pos_frames, index = item
+        self.in_use.add(index)
+        return True, frame, pos_frames
+
+    def release(self, frame):
+        """Hand the slot of a frame read before back to the decoder, copies of frames are ignored."""
+        index = self.ring.slot_of(frame)
+        if index in self.in_use:
+            self.in_use.remove(index)
+            self.ring.release(index)
+
+    def dropped_frames(self):
+        """Return the number of frames the decode process skipped for lack of a free slot."""
+        return self.ring.dropped.value
+
+    def stop(self):
+        """Stop the decode process and the relay thread."""
+        self.stopped = True
+        self.stop_event.set()
+        # Wakes up a decode process forked but never started
+        self.start_event.set()
+        self.frames.close()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.process.is_alive():
+            self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
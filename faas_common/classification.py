@@ -0,0 +1,61 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+
+def top_k(probs, k, min_confidence=None):
+    """Return the k highest scoring classes, best first.
+
+    For a 1-D probability vector this returns (indices, scores). For a 2-D
+    (batch, classes) array it returns one (indices, scores) pair per row. Only
+    the k winners are sorted: np.argpartition selects them in linear time.
+    Classes scoring below min_confidence are left out, so fewer than k may be
+    returned.
+    """
+    batch = np.atleast_2d(probs)
+    num_classes = batch.shape[1]
+    k = min(k, num_classes)
+    if k < num_classes:
+        indices = np.argpartition(batch, num_classes - k, axis=1)[:, num_classes - k:]
+    else:
+        indices = np.tile(np.arange(num_classes), (batch.shape[0], 1))
+    rows = np.arange(batch.shape[0])[:, None]
+    order = np.argsort(-batch[rows, indices], axis=1)
+    indices = indices[rows, order]
+    scores = batch[rows, indices]
+    results = []
+    for row_indices, row_scores in zip(indices, scores):
+        if min_confidence is not None:
+            keep = row_scores >= min_confidence
+            row_indices, row_scores = row_indices[keep], row_scores[keep]
+        results.append((row_indices, row_scores))
+    return results[0] if np.ndim(probs) == 1 else results
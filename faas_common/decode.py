@@ -0,0 +1,137 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import namedtuple
+import cv2
+
+# How frames are decoded: the plain cv2.VideoCapture path, a GStreamer pipeline built from the options (which lets
+# decodebin pick a hardware decoder and scales before the colour conversion), or FFmpeg with hardware acceleration
+BACKEND_DEFAULT = "default"
+BACKEND_GSTREAMER = "gstreamer"
+BACKEND_FFMPEG = "ffmpeg"
+DECODE_BACKENDS = (BACKEND_DEFAULT, BACKEND_GSTREAMER, BACKEND_FFMPEG)
+
+# Decode at width x height (0 keeps the source size), and with keyframes_only decode the keyframes alone
+DecodeOptions = namedtuple("DecodeOptions", ["backend", "width", "height", "keyframes_only"])
+DEFAULT_DECODE = DecodeOptions(BACKEND_DEFAULT, 0, 0, False)
+
+
+def gstreamer_pipeline(source, width=0, height=0, keyframes_only=False):
+    """Return the GStreamer pipeline string decoding source into BGR frames for an appsink.
+
+    Files and network streams are parsed first, so that with keyframes_only
+    the delta frames are dropped before they reach the decoder. decodebin
+    picks the highest ranked decoder, a VA-API or Media SDK one where it is
+    installed, and frames are scaled while still in YUV.
+    """
+    if source == "cam" or source.startswith("/dev/video"):
+        elements = ["v4l2src device=%s" % ("/dev/video0" if source == "cam" else source)]
+    else:
+        elements = ['urisourcebin uri="%s"' % source if "://" in source else 'filesrc location="%s"' % source,
+                    "parsebin"]
+        if keyframes_only:
+            elements.append("identity drop-buffer-flags=delta-unit")
+    elements.append("decodebin")
+    if width and height:
+        elements += ["videoscale", "video/x-raw,width=%d,height=%d" % (width, height)]
+    elements += ["videoconvert", "video/x-raw,format=BGR", "appsink drop=false sync=false"]
+    return " ! ".join(elements)
+
+
+class ResizingCapture(object):
+    """Wrap a cv2.VideoCapture so that it returns frames of a fixed size.
+
+    Stands in for decoding at reduced resolution where the backend cannot do
+    it: the frames are shrunk in the decode thread or process, so that only
+    small frames are queued, copied and held in shared memory.
+    """
+
+    def __init__(self, cap, width, height):
+        self.cap = cap
+        self.size = (width, height)
+        self.decoded = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def read(self, image=None):
+        ret, self.decoded = self.cap.read(self.decoded)
+        if not ret:
+            return False, None
+        return True, cv2.resize(self.decoded, self.size, dst=image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.size[0])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.size[1])
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+def _open_default(source, options):
+    cap = cv2.VideoCapture(0 if source == "cam" else source)
+    if options.width and options.height and cap.isOpened():
+        cap = ResizingCapture(cap, options.width, options.height)
+    return cap
+
+
+def open_capture(source, options=None):
+    """Return (capture, backend used) for source, decoded as the DecodeOptions ask where the backend allows it.
+
+    The GStreamer backend needs an OpenCV built with GStreamer, and FFmpeg
+    hardware acceleration an OpenCV of 4.5.2 or later. Whenever the requested
+    backend cannot open the source, the plain cv2.VideoCapture path is used,
+    which decodes every frame in software and resizes it afterwards;
+    keyframes_only is only honoured by GStreamer.
+    """
+    options = options or DEFAULT_DECODE
+    assert options.backend in DECODE_BACKENDS, "Unknown decode backend: %s" % options.backend
+    if options.backend == BACKEND_GSTREAMER:
+        cap = cv2.VideoCapture(gstreamer_pipeline(source, options.width, options.height, options.keyframes_only),
+                               cv2.CAP_GSTREAMER)
+        if cap.isOpened():
+            return cap, BACKEND_GSTREAMER
+        cap.release()
+    elif options.backend == BACKEND_FFMPEG and source != "cam" and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            if options.width and options.height:
+                cap = ResizingCapture(cap, options.width, options.height)
+            return cap, BACKEND_FFMPEG
+        cap.release()
+    return _open_default(source, options), BACKEND_DEFAULT
@@ -0,0 +1,223 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+# Compact per-frame detection record; box corners are normalized to [0, 1]
+DETECTION_DTYPE = np.dtype([("label", np.int32), ("confidence", np.float32),
+                            ("xmin", np.float32), ("ymin", np.float32),
+                            ("xmax", np.float32), ("ymax", np.float32)])
+
+# Which boxes suppress each other: only those of the same label, or all of them
+NMS_PER_CLASS = "class"
+NMS_AGNOSTIC = "agnostic"
+NMS_MODES = (NMS_PER_CLASS, NMS_AGNOSTIC)
+
+
+def parse_ssd_detections(rows, prob_threshold):
+    """Return the SSD rows above prob_threshold as a DETECTION_DTYPE array.
+
+    rows is the (R, 7) DetectionOutput of one image, each row being
+    [image_id, label, confidence, xmin, ymin, xmax, ymax].
+    """
+    rows = rows[rows[:, 2] > prob_threshold]
+    detections = np.empty(len(rows), dtype=DETECTION_DTYPE)
+    detections["label"] = rows[:, 1]
+    detections["confidence"] = rows[:, 2]
+    detections["xmin"] = rows[:, 3]
+    detections["ymin"] = rows[:, 4]
+    detections["xmax"] = rows[:, 5]
+    detections["ymax"] = rows[:, 6]
+    return detections
+
+
+def detection_boxes(detections, width, height):
+    """Return the (K, 4) integer pixel boxes [xmin, ymin, xmax, ymax] of the detections."""
+    boxes = np.empty((len(detections), 4), dtype=np.float32)
+    boxes[:, 0] = detections["xmin"] * width
+    boxes[:, 1] = detections["ymin"] * height
+    boxes[:, 2] = detections["xmax"] * width
+    boxes[:, 3] = detections["ymax"] * height
+    return boxes.astype(np.int32)
+
+
+def detection_corners(detections):
+    """Return the (K, 4) normalized corners [xmin, ymin, xmax, ymax] of a DETECTION_DTYPE array."""
+    corners = np.empty((len(detections), 4), dtype=np.float32)
+    for column, field in enumerate(("xmin", "ymin", "xmax", "ymax")):
+        corners[:, column] = detections[field]
+    return corners
+
+
+def box_iou(boxes_a, boxes_b):
+    """Return the (A, B) intersection over union of two arrays of [xmin, ymin, xmax, ymax] boxes."""
+    # Contiguous coordinate rows broadcast much faster than strided columns
+    xmin_a, ymin_a, xmax_a, ymax_a = (row[:, None] for row in np.ascontiguousarray(boxes_a.T))
+    xmin_b, ymin_b, xmax_b, ymax_b = np.ascontiguousarray(boxes_b.T)
+    widths = np.minimum(xmax_a, xmax_b)
+    widths -= np.maximum(xmin_a, xmin_b)
+    np.maximum(widths, 0.0, out=widths)
+    heights = np.minimum(ymax_a, ymax_b)
+    heights -= np.maximum(ymin_a, ymin_b)
+    np.maximum(heights, 0.0, out=heights)
+    intersection = widths * heights
+    area_a = np.maximum(xmax_a - xmin_a, 0.0) * np.maximum(ymax_a - ymin_a, 0.0)
+    area_b = np.maximum(xmax_b - xmin_b, 0.0) * np.maximum(ymax_b - ymin_b, 0.0)
+    # Boxes without area have no intersection either, so the floor only avoids dividing by zero
+    union = area_a + area_b - intersection
+    np.maximum(union, 1e-12, out=union)
+    return intersection / union
+
+
+def suppression_groups(boxes, scores, iou_threshold, labels=None, max_detections=0):
+    """Run greedy non-maximum suppression and return (kept indices best score first, owner of every box).
+
+    boxes are [xmin, ymin, xmax, ymax]. With labels, only boxes of the same
+    label suppress each other (per class), otherwise all do (class agnostic).
+    owner[i] is the index of the kept box that suppressed box i, or i itself
+    if it was kept; boxes left after max_detections kept ones get -1. Which
+    box suppresses which is computed for all pairs at once, so the greedy pass
+    only tests a flag per box and masks a row per kept box.
+    """
+    order = np.argsort(-scores, kind="stable")
+    sorted_boxes = boxes[order]
+    if labels is not None and len(order):
+        # Shift every label to a region of its own, so that boxes of different labels never overlap
+        span = float(sorted_boxes.max() - sorted_boxes.min()) + 1.0
+        sorted_boxes = sorted_boxes + (labels[order] * span).astype(sorted_boxes.dtype)[:, None]
+    overlaps = box_iou(sorted_boxes, sorted_boxes) > iou_threshold
+    # A box without area still suppresses itself
+    np.fill_diagonal(overlaps, True)
+    kept_rows = ~overlaps
+    alive = np.ones(len(order), dtype=bool)
+    keep = []
+    for index in range(len(order)):
+        if alive[index]:
+            keep.append(index)
+            if len(keep) == max_detections:
+                break
+            alive &= kept_rows[index]
+    keep = np.array(keep, dtype=np.int64)
+    # Every box belongs to the first kept box, best score first, that overlaps it
+    covered = overlaps[keep]
+    owner = np.full(len(order), -1, dtype=np.int64)
+    if len(keep):
+        covered_boxes = covered.any(axis=0)
+        owner[order[covered_boxes]] = order[keep[covered.argmax(axis=0)[covered_boxes]]]
+    return order[keep], owner
+
+
+def non_max_suppression(boxes, scores, iou_threshold, labels=None, max_detections=0):
+    """Return the indices of the boxes kept by greedy non-maximum suppression, best score first.
+
+    See suppression_groups() for the arguments.
+    """
+    return suppression_groups(boxes, scores, iou_threshold, labels, max_detections)[0]
+
+
+def suppress_detections(detections, iou_threshold, mode=NMS_PER_CLASS, max_detections=0, merge=False):
+    """Return the detections kept by non-maximum suppression, best confidence first.
+
+    mode is NMS_PER_CLASS or NMS_AGNOSTIC, the latter also removing the same
+    object reported under two labels. With merge, every kept box becomes the
+    confidence-weighted mean of the boxes it suppressed, which steadies boxes
+    reported several times, e.g. by overlapping tiles.
+    """
+    if len(detections) < 2:
+        return detections[:max_detections] if max_detections else detections
+    corners = detection_corners(detections)
+    labels = detections["label"] if mode == NMS_PER_CLASS else None
+    keep, owner = suppression_groups(corners, detections["confidence"], iou_threshold, labels, max_detections)
+    kept = detections[keep]
+    if merge:
+        weights = detections["confidence"].astype(np.float32)
+        owned = owner >= 0
+        # Position of the owner of every grouped box among the kept ones
+        slot_of = np.zeros(len(detections), dtype=np.int64)
+        slot_of[keep] = np.arange(len(keep))
+        slots = slot_of[owner[owned]]
+        sums = np.zeros((len(keep), 4), dtype=np.float32)
+        np.add.at(sums, slots, corners[owned] * weights[owned, None])
+        totals = np.zeros(len(keep), dtype=np.float32)
+        np.add.at(totals, slots, weights[owned])
+        merged = sums / totals[:, None]
+        for column, field in enumerate(("xmin", "ymin", "xmax", "ymax")):
+            kept[field] = merged[:, column]
+    return kept
+
+
+class SsdParser(object):
+    """Parse the SSD rows of one image into detections, optionally suppressing overlapping boxes.
+
+    SSD topologies suppress duplicates per class inside DetectionOutput, but
+    not the same object reported under two labels, nor duplicates of boxes
+    merged from several tiles. With an nms_iou, suppress_detections() removes
+    those; max_detections caps the detections of a frame, best first.
+    """
+
+    def __init__(self, prob_threshold, nms_iou=0.0, nms_mode=NMS_PER_CLASS, max_detections=0, merge=False):
+        if nms_mode not in NMS_MODES:
+            raise ValueError("Unknown NMS mode: %s" % nms_mode)
+        self.prob_threshold = prob_threshold
+        self.nms_iou = nms_iou
+        self.nms_mode = nms_mode
+        self.max_detections = max_detections
+        self.merge = merge
+
+    def __call__(self, rows):
+        detections = parse_ssd_detections(rows, self.prob_threshold)
+        if self.nms_iou:
+            return suppress_detections(detections, self.nms_iou, self.nms_mode, self.max_detections, self.merge)
+        if self.max_detections and len(detections) > self.max_detections:
+            return detections[np.argsort(-detections["confidence"], kind="stable")[:self.max_detections]]
+        return detections
+
+
+def detections_to_json(detections, class_name=None, track_ids=None):
+    """Build the "Object<i>" entries of a report from a DETECTION_DTYPE array.
+
+    Values are rounded to 2 decimals in bulk and converted to Python types. If
+    class_name is given, it maps a label to the "class" entry of each object,
+    and track_ids, if given, become the "track_id" entries.
+    """
+    res_json = OrderedDict()
+    labels = detections["label"].tolist()
+    values = [np.round(detections[field].astype(np.float64), 2).tolist()
+              for field in ("confidence", "xmin", "ymin", "xmax", "ymax")]
+    for object_id, (label, confidence, xmin, ymin, xmax, ymax) in enumerate(zip(labels, *values)):
+        obj = {"label": label, "confidence": confidence, "xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax}
+        if class_name is not None:
+            obj["class"] = class_name(label)
+        if track_ids is not None:
+            obj["track_id"] = int(track_ids[object_id])
+        res_json["Object" + str(object_id)] = obj
+    return res_json
@@ -0,0 +1,148 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import mmap
+import timeit
+import multiprocessing
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+import numpy as np
+
+from faas_common.bounded_queue import DROP_NEWEST, BLOCK
+
+# The ring is shared with the producer by fork, whatever the default start method: under spawn or forkserver the
+# child would get a private copy of the anonymous mmap, and would import the sample it was started from once more.
+# Forking is only safe before the parent starts threads, so the samples fork their child processes at start-up.
+try:
+    FORK_CONTEXT = multiprocessing.get_context("fork")
+except AttributeError:
+    # Python 2 always forks
+    FORK_CONTEXT = multiprocessing
+
+# Per-slot metadata written by the producer when it publishes a frame
+SLOT_DTYPE = np.dtype([("seq", np.int64), ("timestamp", np.float64), ("pos_frames", np.float64)])
+
+
+class SharedFrameRing(object):
+    """Ring of fixed-size frame slots in shared memory, exchanged between processes by index.
+
+    The slots live in an anonymous mmap created before the producer process is
+    forked, so both sides see the same pages and frames never go through
+    pickling. The producer must be started from FORK_CONTEXT, which forks
+    also where the default start method is spawn (macOS) or forkserver
+    (Linux from Python 3.14); fork it before the process starts any thread
+    or loads a plugin, since a child forked while another thread holds a
+    lock deadlocks on it. The producer acquire()s a free slot, decodes into frame(index)
+    and publish()es it with its sequence number, timestamp and
+    CAP_PROP_POS_FRAMES; the consumer get()s the index, uses the frame in place
+    and release()s the slot. Only slot indices travel through the queues.
+
+    With BLOCK the producer waits for a free slot; with DROP_NEWEST acquire()
+    returns None right away and the producer is expected to skip the frame,
+    which is counted in dropped.
+    """
+
+    def __init__(self, num_slots, height, width, channels=3, overflow=BLOCK):
+        assert num_slots > 0, "Ring size must be positive"
+        assert overflow in (DROP_NEWEST, BLOCK), "Unsupported overflow policy: %s" % overflow
+        self.num_slots = num_slots
+        self.shape = (height, width, channels)
+        self.overflow = overflow
+        meta_bytes = num_slots * SLOT_DTYPE.itemsize
+        frame_bytes = height * width * channels
+        self.buffer = mmap.mmap(-1, meta_bytes + num_slots * frame_bytes)
+        self.meta = np.frombuffer(self.buffer, dtype=SLOT_DTYPE, count=num_slots)
+        self.frames = np.frombuffer(self.buffer, dtype=np.uint8, count=num_slots * frame_bytes,
+                                    offset=meta_bytes).reshape((num_slots,) + self.shape)
+        self.free_slots = FORK_CONTEXT.Queue()
+        for index in range(num_slots):
+            self.free_slots.put(index)
+        self.ready_slots = FORK_CONTEXT.Queue()
+        self.dropped = FORK_CONTEXT.Value("l", 0)
+        self.next_seq = 0
+
+    def frame(self, index):
+        """Return the (H, W, C) array backed by a slot."""
+        return self.frames[index]
+
+    def slot_of(self, frame):
+        """Return the index of the slot backing frame, None for an array outside the ring such as a copy."""
+        offset = frame.__array_interface__["data"][0] - self.frames.__array_interface__["data"][0]
+        frame_bytes = self.frames[0].nbytes
+        if frame.shape != self.shape or offset < 0 or offset % frame_bytes or offset // frame_bytes >= self.num_slots:
+            return None
+        return offset // frame_bytes
+
+    def metadata(self, index):
+        """Return (seq, timestamp, pos_frames) of the frame in a slot."""
+        meta = self.meta[index]
+        return int(meta["seq"]), float(meta["timestamp"]), float(meta["pos_frames"])
+
+    # Producer side
+
+    def acquire(self, timeout=None):
+        """Return the index of a free slot, or None if there is none (DROP_NEWEST) or on timeout."""
+        try:
+            if self.overflow == DROP_NEWEST:
+                return self.free_slots.get(block=False)
+            return self.free_slots.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def drop(self):
+        """Count a frame skipped for lack of a free slot."""
+        with self.dropped.get_lock():
+            self.dropped.value += 1
+
+    def publish(self, index, pos_frames, timestamp=None):
+        """Hand a filled slot over to the consumer."""
+        self.meta[index] = (self.next_seq, timeit.default_timer() if timestamp is None else timestamp, pos_frames)
+        self.next_seq += 1
+        self.ready_slots.put(index)
+
+    def close(self):
+        """Tell the consumer that no more frames will be published."""
+        self.ready_slots.put(None)
+
+    # Consumer side
+
+    def get(self, timeout=None):
+        """Return the index of the next published slot, None once the producer has closed the ring.
+
+        Raises queue.Empty on timeout.
+        """
+        return self.ready_slots.get(timeout=timeout)
+
+    def release(self, index):
+        """Return a slot to the producer once its frame is no longer used."""
+        self.free_slots.put(index)
@@ -0,0 +1,161 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import timeit
+from collections import OrderedDict, deque
+
+# What happens to a frame: inferred, post-processed with the last result of its stream because inference is behind
+# or because the scene did not change, or dropped
+INFER = "infer"
+REUSE = "reuse"
+CACHED = "cached"
+DROP = "drop"
+
+
+class AdaptiveFrameSkipper(object):
+    """Decide for every decoded frame whether to infer it, reuse the last result of its stream or drop it.
+
+    A frame is inferred when its stream is due under target_fps and, with a
+    target_latency, the EWMA of the measured infer latency is within it or
+    nothing is queued for inference. The latency check drains the queue
+    whenever the model falls behind, so results never lag the camera more than
+    about one request. Skipped frames reuse the last result of their stream if
+    it came in at most max_staleness seconds ago, and are dropped otherwise.
+    With a MotionGate, a frame about to be inferred whose scene has not changed
+    since the last inferred frame of its stream is CACHED instead: it carries
+    the last result forward however old, the gate renews it now and then.
+    With detect_every K, only every Kth frame of a stream is considered for
+    inference at all, e.g. for a tracker to move boxes on in between. With
+    neither target, gate nor K every frame is inferred.
+
+    Skipped frames decoded while earlier frames of their stream are still
+    being inferred are never dropped: the caller holds them back and gets them
+    from release() once the result just before them is in, so that every
+    stream is post-processed in decode order.
+    """
+
+    def __init__(self, num_streams, target_fps=0.0, target_latency=0.0, max_staleness=1.0, alpha=0.2, gate=None,
+                 detect_every=1):
+        self.target_fps = target_fps
+        self.target_latency = target_latency
+        self.max_staleness = max_staleness
+        self.alpha = alpha
+        self.gate = gate
+        self.detect_every = max(1, detect_every)
+        self.enabled = bool(target_fps or target_latency or gate or self.detect_every > 1)
+        self.latency = None
+        self.next_due_times = [None] * num_streams
+        self.decoded = [0] * num_streams
+        self.results = [None] * num_streams
+        self.result_times = [0.0] * num_streams
+        self.inferred = [0] * num_streams
+        self.completed = [0] * num_streams
+        self.held = [deque() for _ in range(num_streams)]
+        self.counts = [self._zero_counts() for _ in range(num_streams)]
+
+    @staticmethod
+    def _zero_counts():
+        return OrderedDict([(INFER, 0), (REUSE, 0), (CACHED, 0), (DROP, 0)])
+
+    def update(self, latency):
+        """Account for the latency in seconds of a completed infer request."""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+
+    def decide(self, stream_id, queued_frames, frame=None):
+        """Return INFER, REUSE, CACHED or DROP for a frame of stream_id, given the frames queued for inference."""
+        decision = INFER
+        if self.enabled:
+            now = timeit.default_timer()
+            self.decoded[stream_id] += 1
+            due_time = self.next_due_times[stream_id]
+            if (self.decoded[stream_id] - 1) % self.detect_every:
+                decision = REUSE
+            elif self.target_fps and due_time is not None and now < due_time:
+                decision = REUSE
+            elif (self.target_latency and queued_frames and self.latency is not None and
+                  self.latency > self.target_latency):
+                decision = REUSE
+            if decision == INFER and self.gate is not None and frame is not None:
+                if not self.gate.changed(stream_id, frame) and self.results[stream_id] is not None:
+                    decision = CACHED
+                else:
+                    self.gate.commit(stream_id)
+            if decision == INFER and self.target_fps:
+                # Keep to the schedule of the stream without catching up on more than one missed frame
+                interval = 1.0 / self.target_fps
+                self.next_due_times[stream_id] = (now if due_time is None else max(due_time, now - interval)) + interval
+            if decision == REUSE and not self.must_hold(stream_id) and (
+                    self.results[stream_id] is None or now - self.result_times[stream_id] > self.max_staleness):
+                decision = DROP
+        if decision == INFER:
+            self.inferred[stream_id] += 1
+        self.counts[stream_id][decision] += 1
+        return decision
+
+    def must_hold(self, stream_id):
+        """Return whether a skipped frame of stream_id has to wait for frames of its stream still being inferred."""
+        return self.completed[stream_id] < self.inferred[stream_id]
+
+    def hold(self, stream_id, item):
+        """Hold a skipped frame of stream_id back until the results of the frames inferred before it are in."""
+        self.held[stream_id].append((self.inferred[stream_id], item))
+
+    def release(self, stream_id):
+        """Account for a completed inferred frame of stream_id and return the held frames now due, in order."""
+        self.completed[stream_id] += 1
+        held = self.held[stream_id]
+        released = []
+        while held and held[0][0] <= self.completed[stream_id]:
+            released.append(held.popleft()[1])
+        return released
+
+    def set_result(self, stream_id, result):
+        """Keep the result of the latest inferred frame of stream_id for reuse."""
+        self.results[stream_id] = result
+        self.result_times[stream_id] = timeit.default_timer()
+
+    def last_result(self, stream_id):
+        return self.results[stream_id]
+
+    def result_age(self, stream_id):
+        """Return the seconds since the last result of stream_id came in."""
+        return timeit.default_timer() - self.result_times[stream_id]
+
+    def take_counts(self, stream_id):
+        """Return the number of frames of stream_id per decision and the share not inferred since the last call."""
+        counts = self.counts[stream_id]
+        self.counts[stream_id] = self._zero_counts()
+        total = sum(counts.values())
+        counts["skip_rate"] = round(1.0 - counts[INFER] / float(total), 3) if total else 0.0
+        return counts
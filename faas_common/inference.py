@@ -0,0 +1,144 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import timeit
+from collections import deque
+
+
+def _same_buffer(a, b):
+    """Return whether two arrays are views of the same memory with the same shape."""
+    return a.shape == b.shape and a.__array_interface__["data"][0] == b.__array_interface__["data"][0]
+
+
+def next_frame_timeout(infer_ring, batcher):
+    """Return how long a sample loop may wait for the next frame, None for as long as it takes.
+
+    That is until the oldest request of infer_ring (an InferRequestRing or an
+    InferenceWorkerPool) is about done, or the partial batch of batcher is
+    due, so that neither result nor batch waits for a slow or stalled input.
+    """
+    if infer_ring.ready():
+        return 0.0
+    timeouts = [timeout for timeout in (infer_ring.time_to_result(), batcher.time_to_ready()) if timeout is not None]
+    return min(timeouts) if timeouts else None
+
+
+class InferRequestRing(object):
+    """Round-robin ring of asynchronous infer requests on an executable network.
+
+    Requests are started with start_async() and completed in submission order,
+    so the caller can decode and pre-process frame k+1 while frame k is in flight.
+    The outputs returned by collect() are the request's own blobs; they are only
+    valid until the same request is submitted again.
+
+    At most num_requests requests are in flight, taken in turn from all the
+    requests of exec_net. If exec_net holds one more, the next request is never
+    in flight, so its input blob can be filled in place (see input_buffers()).
+    """
+
+    def __init__(self, exec_net, num_requests, alpha=0.2):
+        self.exec_net = exec_net
+        self.num_requests = num_requests
+        self.num_ids = max(num_requests, len(exec_net.requests))
+        self.next_request_id = 0
+        self.in_flight = deque()
+        self.alpha = alpha
+        self.latency = None
+
+    def full(self):
+        """Return True if every request of the ring is in flight."""
+        return len(self.in_flight) >= self.num_requests
+
+    def pending(self):
+        """Return the number of requests currently in flight."""
+        return len(self.in_flight)
+
+    def ready(self):
+        """Return True if the oldest request in flight has completed, without waiting for it."""
+        if not self.in_flight:
+            return False
+        # A zero timeout only queries the status, which is RESULT_NOT_READY until the request is done
+        return self.exec_net.requests[self.in_flight[0][0]].wait(0) == 0
+
+    def time_to_result(self):
+        """Return the seconds left before the oldest request should be collected, None if none is in flight.
+
+        That is half its expected latency, the EWMA of the latencies collected
+        so far, after its start (0 until the first result). Waking up half way
+        and then waiting on the request collects its result as soon as it is
+        in, and brings an overestimated latency down by the next results.
+        """
+        if not self.in_flight:
+            return None
+        if self.latency is None:
+            return 0.0
+        return max(0.0, self.in_flight[0][1] + self.latency / 2 - timeit.default_timer())
+
+    def input_buffers(self, input_blob):
+        """Return the input blob of every request, in the order submit() uses the requests.
+
+        A batch written into the blob of the request submit() uses next is
+        started without copying it. This needs exec_net to be loaded with
+        num_requests + 1 requests, so that the one being filled is not in flight.
+        """
+        assert self.num_ids > self.num_requests, "Load the network with one infer request more than kept in flight"
+        return [request.inputs[input_blob] for request in self.exec_net.requests]
+
+    def submit(self, inputs, userdata=None):
+        """Start an asynchronous inference on the next free request."""
+        assert not self.full(), "No free infer request, collect() a result first"
+        request_id = self.next_request_id
+        self.next_request_id = (self.next_request_id + 1) % self.num_ids
+        request = self.exec_net.requests[request_id]
+        blobs = request.inputs
+        start_time = timeit.default_timer()
+        if all(_same_buffer(array, blobs[name]) for name, array in inputs.items()):
+            # Filled in place, start the request on its own input blobs
+            request.async_infer()
+        else:
+            self.exec_net.start_async(request_id=request_id, inputs=inputs)
+        self.in_flight.append((request_id, start_time, userdata))
+        return request_id
+
+    def collect(self):
+        """Wait for the oldest request and return (userdata, outputs, latency in seconds)."""
+        request_id, start_time, userdata = self.in_flight.popleft()
+        request = self.exec_net.requests[request_id]
+        status = request.wait(-1)
+        if status != 0:
+            raise RuntimeError("Infer request %d failed with status %d" % (request_id, status))
+        latency = timeit.default_timer() - start_time
+        self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        return userdata, request.outputs, latency
+
+    def close(self):
+        """Release the executable network once all results have been collected."""
+        self.exec_net = None
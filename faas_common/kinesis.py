@@ -0,0 +1,185 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import json
+import time
+import timeit
+from collections import OrderedDict, deque
+
+# Limits of one PutRecords request, and of one record including its partition key
+MAX_RECORDS = 500
+MAX_REQUEST_BYTES = 5 << 20
+MAX_RECORD_BYTES = 1 << 20
+
+# Partition keys: the source stream of a report, its frame, or one fixed key
+PARTITION_STREAM = "stream"
+PARTITION_FRAME = "frame"
+PARTITION_FIXED = "fixed"
+PARTITION_MODES = (PARTITION_STREAM, PARTITION_FRAME, PARTITION_FIXED)
+
+
+class KinesisSink(object):
+    """Publisher sink that puts reports to a Kinesis stream in PutRecords batches.
+
+    The JSON payloads are buffered and sent once max_records of them, or
+    max_bytes, are pending, or the oldest waited max_delay seconds, within the
+    500 record and 5 MB limits of a request. Partition keys come from the
+    stream_id or frame_id of the payload, spreading the records over shards
+    while keeping the order per stream or not at all, or are the fixed
+    partition_key. Only the entries a response reports as failed are sent
+    again, up to attempts times with exponential backoff, and then kept for
+    the next flush, but never more than max_pending records: the oldest are
+    dropped first. encode turns a payload into the Data of its record, e.g.
+    the encode method of a PayloadCodec. As the buffer is only checked when a report arrives, call
+    flush() or close() once the input ends.
+    """
+
+    def __init__(self, client, stream_name, partition=PARTITION_STREAM, partition_key="", max_records=MAX_RECORDS,
+                 max_bytes=MAX_REQUEST_BYTES, max_delay=1.0, attempts=3, backoff=0.1, max_pending=10000,
+                 encode=json.dumps):
+        assert partition in PARTITION_MODES, "Unknown partition mode {0}".format(partition)
+        assert partition != PARTITION_FIXED or partition_key, "A fixed partition needs a partition key"
+        self.client = client
+        self.stream_name = stream_name
+        self.partition = partition
+        self.partition_key = partition_key
+        self.max_records = min(max_records, MAX_RECORDS)
+        self.max_bytes = min(max_bytes, MAX_REQUEST_BYTES)
+        self.max_delay = max_delay
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_pending = max_pending
+        self.encode = encode
+        # Records waiting to be sent as (size, entry), oldest first
+        self.pending = deque()
+        self.pending_bytes = 0
+        self.oldest = None
+        self.records = 0
+        self.bytes = 0
+        self.requests = 0
+        self.retried = 0
+        self.dropped = 0
+        self.start_time = timeit.default_timer()
+
+    def _partition_key(self, payload):
+        if self.partition == PARTITION_STREAM:
+            return str(payload.get("stream_id", 0))
+        if self.partition == PARTITION_FRAME:
+            return str(payload.get("frame_id", 0))
+        return self.partition_key
+
+    def __call__(self, report):
+        data = self.encode(report.payload)
+        key = self._partition_key(report.payload)
+        size = len(data) + len(key)
+        if size > MAX_RECORD_BYTES:
+            self.dropped += 1
+            raise ValueError("Record of {0} bytes exceeds the Kinesis limit".format(size))
+        if not self.pending:
+            self.oldest = timeit.default_timer()
+        self.pending.append((size, {"Data": data, "PartitionKey": key}))
+        self.pending_bytes += size
+        if (len(self.pending) >= self.max_records or self.pending_bytes >= self.max_bytes or
+                timeit.default_timer() - self.oldest >= self.max_delay):
+            self.flush()
+
+    def _take_request(self):
+        """Remove and return the oldest pending records that fit one request."""
+        batch = []
+        batch_bytes = 0
+        while (self.pending and len(batch) < self.max_records and
+               (not batch or batch_bytes + self.pending[0][0] <= self.max_bytes)):
+            size, entry = self.pending.popleft()
+            self.pending_bytes -= size
+            batch_bytes += size
+            batch.append((size, entry))
+        return batch
+
+    def _put(self, batch):
+        """Send a batch, retrying only its failed entries, and return the entries that still failed."""
+        for attempt in range(self.attempts):
+            if attempt:
+                self.retried += len(batch)
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            self.requests += 1
+            try:
+                response = self.client.put_records(StreamName=self.stream_name,
+                                                   Records=[entry for _, entry in batch])
+            except Exception:
+                # The whole request failed, so all of its entries are sent again
+                continue
+            failed = []
+            for record, result in zip(batch, response["Records"]):
+                if "ErrorCode" in result:
+                    failed.append(record)
+                else:
+                    self.records += 1
+                    self.bytes += record[0]
+            batch = failed
+            if not batch:
+                break
+        return batch
+
+    def flush(self):
+        """Send the pending records and raise an error if some of them could not be put."""
+        failed = []
+        while self.pending:
+            failed.extend(self._put(self._take_request()))
+            if failed:
+                # Stop sending while the stream throttles or fails, keeping the rest for the next flush
+                break
+        for size, entry in reversed(failed):
+            self.pending.appendleft((size, entry))
+            self.pending_bytes += size
+        while len(self.pending) > self.max_pending:
+            self.pending_bytes -= self.pending.popleft()[0]
+            self.dropped += 1
+        if self.pending:
+            self.oldest = timeit.default_timer()
+        if failed:
+            raise IOError("{0} Kinesis records failed, {1} pending".format(len(failed), len(self.pending)))
+
+    def close(self):
+        """Send the pending records before exiting, reporting instead of raising errors."""
+        try:
+            self.flush()
+        except Exception as error:
+            print("[ERROR]: Kinesis put failed, {0} records lost: {1}".format(len(self.pending), error))
+
+    def stats(self):
+        """Return the records and bytes put, their rate, the requests, retried and dropped records and the backlog."""
+        elapsed = max(timeit.default_timer() - self.start_time, 1e-9)
+        return OrderedDict([("records", self.records), ("bytes", self.bytes),
+                            ("records_per_second", round(self.records / elapsed, 3)),
+                            ("bytes_per_second", round(self.bytes / elapsed, 3)),
+                            ("requests", self.requests), ("retried", self.retried), ("dropped", self.dropped),
+                            ("pending", len(self.pending))])
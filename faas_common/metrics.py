@@ -0,0 +1,134 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import math
+import threading
+import timeit
+from collections import OrderedDict
+
+# Stages of the sample pipelines: waiting for a decoded frame, resize and layout change, inference of a batch,
+# per-frame handling of the outputs, building the report of a reported frame (drawing, JSON) and sink delivery
+STAGES = ("capture", "preprocess", "infer", "postprocess", "annotate", "publish")
+
+
+class LatencyHistogram(object):
+    """Fixed-bucket, log-scale latency histogram in the spirit of HdrHistogram.
+
+    Bucket bounds grow by a factor 2 ** (1 / sub_buckets) from min_seconds to
+    max_seconds, so percentiles are exact to within that relative error and a
+    sample costs one log and one increment however many are recorded.
+    """
+
+    def __init__(self, min_seconds=1e-6, max_seconds=100.0, sub_buckets=16):
+        self.min_seconds = min_seconds
+        self.scale = sub_buckets / math.log(2.0)
+        self.counts = [0] * (int(math.log(max_seconds / min_seconds) * self.scale) + 2)
+        self.reset()
+
+    def reset(self):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Record one sample."""
+        index = int(math.log(seconds / self.min_seconds) * self.scale) + 1 if seconds > self.min_seconds else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Return the upper bound of the bucket holding the given percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        target = max(1, int(math.ceil(percent / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.min_seconds * math.exp(index / self.scale), self.max)
+        return self.max
+
+    def summary(self):
+        """Return count, mean, p50, p95, p99 and max, in milliseconds."""
+        summary = OrderedDict([("count", self.count),
+                               ("mean_ms", round(self.total / self.count * 1000.0, 3) if self.count else 0.0)])
+        for percent in (50, 95, 99):
+            summary["p%d_ms" % percent] = round(self.percentile(percent) * 1000.0, 3)
+        summary["max_ms"] = round(self.max * 1000.0, 3)
+        return summary
+
+
+class StageMetrics(object):
+    """Latency histograms per pipeline stage, switchable at runtime.
+
+    Stages record the seconds they took with add(); while disabled that is a
+    single attribute check. snapshot() returns the summaries of the current
+    window and starts a new one. Safe to use from the publisher threads.
+    """
+
+    def __init__(self, stages=STAGES, enabled=True):
+        self.histograms = OrderedDict((stage, LatencyHistogram()) for stage in stages)
+        self.lock = threading.Lock()
+        self.enabled = enabled
+        self.window_start = timeit.default_timer()
+
+    def set_enabled(self, enabled):
+        """Switch recording on or off, a new window starts when it is switched on."""
+        if enabled and not self.enabled:
+            self.snapshot()
+        self.enabled = enabled
+
+    def add(self, stage, seconds):
+        """Record the duration of one span of a stage."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.histograms[stage].add(seconds)
+
+    def due(self, interval):
+        """Return True if recording is on and the current window is at least interval seconds old."""
+        return self.enabled and timeit.default_timer() - self.window_start >= interval
+
+    def snapshot(self):
+        """Return the per-stage summaries of the current window and start a new one."""
+        with self.lock:
+            now = timeit.default_timer()
+            snapshot = OrderedDict([("window_seconds", round(now - self.window_start, 3)), ("stages", OrderedDict())])
+            for stage, histogram in self.histograms.items():
+                snapshot["stages"][stage] = histogram.summary()
+                histogram.reset()
+            self.window_start = now
+        return snapshot
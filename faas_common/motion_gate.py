@@ -0,0 +1,78 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import timeit
+import cv2
+import numpy as np
+
+
+class MotionGate(object):
+    """Tell frames that changed since the last inferred frame of their stream from static ones.
+
+    Frames are shrunk to a grayscale thumbnail of the given size by sampling
+    every few rows and columns and averaging by area, which also smooths sensor
+    noise, and compared with the thumbnail of the last inferred frame. A frame
+    has changed when more than threshold of the thumbnail pixels differ by more
+    than pixel_threshold gray levels, so a small object entering the scene
+    counts while lighting flicker does not. Every refresh seconds a frame
+    counts as changed regardless, so results of a static scene are still
+    renewed now and then.
+    """
+
+    def __init__(self, num_streams, threshold=0.01, pixel_threshold=25, refresh=60.0, size=(64, 48)):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.refresh = refresh
+        self.size = size
+        self.references = [None] * num_streams
+        self.reference_times = [0.0] * num_streams
+        self.thumbnails = [None] * num_streams
+        self.changes = [0.0] * num_streams
+
+    def changed(self, stream_id, frame):
+        """Return True if frame differs from the reference of its stream, or the reference is missing or old."""
+        # Sample about twice the thumbnail resolution before averaging, which costs a fraction of a full-frame resize
+        step = max(1, min(frame.shape[0] // (2 * self.size[1]), frame.shape[1] // (2 * self.size[0])))
+        thumbnail = cv2.resize(frame[::step, ::step], self.size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        self.thumbnails[stream_id] = thumbnail
+        reference = self.references[stream_id]
+        if reference is None or timeit.default_timer() - self.reference_times[stream_id] >= self.refresh:
+            return True
+        changed_pixels = np.count_nonzero(cv2.absdiff(thumbnail, reference) > self.pixel_threshold)
+        self.changes[stream_id] = changed_pixels / float(thumbnail.size)
+        return self.changes[stream_id] > self.threshold
+
+    def commit(self, stream_id):
+        """Make the frame last passed to changed() the reference of its stream, once it is inferred."""
+        self.references[stream_id] = self.thumbnails[stream_id]
+        self.reference_times[stream_id] = timeit.default_timer()
@@ -0,0 +1,209 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import os
+import json
+import hashlib
+import timeit
+from collections import OrderedDict
+
+from openvino.inference_engine import IENetwork
+try:
+    from openvino.inference_engine import IECore
+except ImportError:
+    # Inference Engine releases before 2019 R2 only provide IEPlugin, which cannot import or export networks
+    IECore = None
+
+
+def network_cache_key(model_xml, model_bin, device, cpu_extension=None, batch_size=1):
+    """Return a hex digest identifying a compiled network.
+
+    Covers the contents of the IR files, the device string, the CPU extension
+    path and the batch size the network is reshaped to.
+    """
+    digest = hashlib.sha1()
+    for path in (model_xml, model_bin):
+        with open(path, "rb") as model_file:
+            for chunk in iter(lambda: model_file.read(1 << 20), b""):
+                digest.update(chunk)
+    for value in (device, cpu_extension or "", str(batch_size)):
+        digest.update(b"\0" + value.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class NetworkCache(object):
+    """Size-bounded on-disk cache of exported executable networks.
+
+    Each entry is a <key>.blob file written by ExecutableNetwork.export() and a
+    <key>.json file with the input/output names and shape. Entries are evicted
+    least recently used first (by modification time, refreshed on every hit)
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".blob", base + ".json"
+
+    def get(self, key):
+        """Return (blob path, metadata) of a cached network, or None."""
+        blob_path, meta_path = self._paths(key)
+        if not (os.path.isfile(blob_path) and os.path.isfile(meta_path)):
+            return None
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+        for path in (blob_path, meta_path):
+            os.utime(path, None)
+        return blob_path, meta
+
+    def put(self, key, export, meta):
+        """Store a network written by export(path) with its metadata, then evict old entries."""
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        blob_path, meta_path = self._paths(key)
+        # Write to temporary names first so that a crash never leaves a partial entry behind,
+        # the process id keeps concurrent writers of the same entry apart
+        suffix = ".%d.tmp" % os.getpid()
+        try:
+            export(blob_path + suffix)
+            with open(meta_path + suffix, "w") as meta_file:
+                json.dump(meta, meta_file)
+            os.rename(blob_path + suffix, blob_path)
+            os.rename(meta_path + suffix, meta_path)
+        except Exception:
+            for path in (blob_path + suffix, meta_path + suffix):
+                if os.path.isfile(path):
+                    os.remove(path)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(name)
+            if ext not in (".blob", ".json"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            size, mtime = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+        total = sum(size for size, _ in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key):
+                if os.path.isfile(path):
+                    os.remove(path)
+            total -= entries[key][0]
+
+
+def load_network(plugin, model_xml, device, num_requests, batch_size=1, cpu_extension=None, cache=None,
+                 config=None, plugin_dir=None):
+    """Return (exec_net, input_blob, out_blob, input shape, startup timings).
+
+    Without a cache the IR is loaded through plugin. With a cache the network
+    goes through IECore instead, which can import the network exported on a
+    previous start rather than parsing the IR and compiling it again; config
+    and cpu_extension are then applied to the IECore, as they were to plugin.
+    IECore only finds the plugins installed with the Inference Engine, so with
+    a plugin_dir the network is always loaded through plugin and the cache is
+    not used. A cache that cannot be read or written is reported and skipped,
+    it never fails the load.
+    Timings hold the seconds spent parsing, loading (or importing) and
+    exporting, and the cache outcome: "hit", "miss", "disabled", "error" where
+    the cache could not be written, or "unsupported" where IECore is missing,
+    a plugin_dir is given or the device cannot export.
+    """
+    timings = OrderedDict()
+    model_bin = os.path.splitext(model_xml)[0] + ".bin"
+    core = None
+    key = None
+    if cache is not None and IECore is not None and not plugin_dir:
+        core = IECore()
+        if cpu_extension and "CPU" in device:
+            core.add_extension(cpu_extension, "CPU")
+        key = network_cache_key(model_xml, model_bin, device, cpu_extension, batch_size)
+        try:
+            entry = cache.get(key)
+        except (EnvironmentError, ValueError) as error:
+            print("[WARNING]: Cannot read the network cache, compiling the network: {0}".format(error))
+            entry = None
+        if entry is not None:
+            blob_path, meta = entry
+            start_time = timeit.default_timer()
+            try:
+                exec_net = core.import_network(blob_path, device, config or {}, num_requests)
+            except (RuntimeError, EnvironmentError):
+                # Exported by another Inference Engine release, compile the IR again and replace it
+                exec_net = None
+            if exec_net is not None:
+                timings["parse"] = 0.0
+                timings["load"] = timeit.default_timer() - start_time
+                timings["cache"] = "hit"
+                return exec_net, meta["input_blob"], meta["out_blob"], tuple(meta["shape"]), timings
+
+    start_time = timeit.default_timer()
+    net = IENetwork.from_ir(model=model_xml, weights=model_bin)
+    assert len(net.inputs.keys()) == 1, "Sample supports only single input topologies"
+    assert len(net.outputs) == 1, "Sample supports only single output topologies"
+    input_blob = next(iter(net.inputs))
+    out_blob = next(iter(net.outputs))
+    net.batch_size = batch_size
+    shape = tuple(net.inputs[input_blob].shape)
+    timings["parse"] = timeit.default_timer() - start_time
+    start_time = timeit.default_timer()
+    if core is not None:
+        exec_net = core.load_network(net, device, config or {}, num_requests)
+    else:
+        exec_net = plugin.load(network=net, num_requests=num_requests)
+    timings["load"] = timeit.default_timer() - start_time
+    del net
+    timings["cache"] = "disabled" if cache is None else "unsupported"
+    if core is not None:
+        start_time = timeit.default_timer()
+        try:
+            cache.put(key, exec_net.export, {"input_blob": input_blob, "out_blob": out_blob, "shape": list(shape)})
+            timings["cache"] = "miss"
+        except RuntimeError:
+            # Not every device plugin can export a compiled network, the IR is then loaded on every start
+            pass
+        except EnvironmentError as error:
+            # A read-only or full disk must not stop the sample, the IR is loaded on every start instead
+            print("[WARNING]: Cannot write the network cache: {0}".format(error))
+            timings["cache"] = "error"
+        timings["export"] = timeit.default_timer() - start_time
+    return exec_net, input_blob, out_blob, shape, timings
@@ -0,0 +1,161 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import json
+import struct
+from collections import OrderedDict
+import numpy as np
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Codecs of the published result payloads
+CODEC_JSON = "json"
+CODEC_MSGPACK = "msgpack"
+CODEC_PACKED = "packed"
+CODECS = (CODEC_JSON, CODEC_MSGPACK, CODEC_PACKED)
+
+# The first byte of a message identifies its codec; JSON messages start with "{" as they always did
+TAG_JSON = b"{"
+TAG_MSGPACK = b"M"
+TAG_PACKED = b"P"
+
+# Packed messages: tag, flags, number of objects and length of the metadata, followed by the metadata as compact
+# JSON and one fixed-size record per "Object<i>" entry
+PACKED_HEADER = struct.Struct("<cBHI")
+PACKED_TRACK_IDS = 1
+PACKED_OBJECT_DTYPE = np.dtype([("label", "<u2"), ("track_id", "<i4"), ("confidence", "<f2"),
+                                ("xmin", "<f2"), ("ymin", "<f2"), ("xmax", "<f2"), ("ymax", "<f2")])
+# Classes of the packed objects are kept once per label in this metadata entry
+PACKED_CLASSES = "object_classes"
+_BOX_FIELDS = ("confidence", "xmin", "ymin", "xmax", "ymax")
+_OBJECT_KEYS = frozenset(("label", "class", "track_id") + _BOX_FIELDS)
+
+
+def _is_object(key, value):
+    return key.startswith("Object") and isinstance(value, dict)
+
+
+def pack_payload(payload):
+    """Return payload in the packed layout, with its "Object<i>" entries as PACKED_OBJECT_DTYPE records.
+
+    Confidences and box corners are stored as half floats, enough for the
+    2 decimals of the reports. The other entries, and all objects if one of
+    them has fields the records cannot hold, are kept as compact JSON.
+    """
+    objects = [value for key, value in payload.items() if _is_object(key, value)]
+    if not all(_OBJECT_KEYS.issuperset(obj) for obj in objects):
+        objects = []
+    metadata = OrderedDict((key, value) for key, value in payload.items() if not objects or not _is_object(key, value))
+    flags = 0
+    records = b""
+    if objects:
+        if "track_id" in objects[0]:
+            flags |= PACKED_TRACK_IDS
+        records = np.array([(obj["label"], obj.get("track_id", -1), obj["confidence"], obj["xmin"], obj["ymin"],
+                             obj["xmax"], obj["ymax"]) for obj in objects], PACKED_OBJECT_DTYPE).tobytes()
+        classes = dict((str(obj["label"]), obj["class"]) for obj in objects if "class" in obj)
+        if classes:
+            metadata[PACKED_CLASSES] = classes
+    metadata = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    return PACKED_HEADER.pack(TAG_PACKED, flags, len(objects), len(metadata)) + metadata + records
+
+
+def unpack_payload(message):
+    """Return the payload of a packed message, with the objects rounded to 2 decimals as in the JSON reports."""
+    _, flags, count, metadata_size = PACKED_HEADER.unpack_from(message)
+    start = PACKED_HEADER.size
+    metadata = json.loads(message[start:start + metadata_size].decode("utf-8"), object_pairs_hook=OrderedDict)
+    classes = metadata.pop(PACKED_CLASSES, {})
+    payload = OrderedDict()
+    if not count:
+        payload.update(metadata)
+        return payload
+    records = np.frombuffer(message, PACKED_OBJECT_DTYPE, count, start + metadata_size)
+    values = [np.round(records[field].astype(np.float64), 2).tolist() for field in _BOX_FIELDS]
+    for object_id, (label, track_id, box) in enumerate(zip(records["label"].tolist(), records["track_id"].tolist(),
+                                                           zip(*values))):
+        obj = {"label": label}
+        obj.update(zip(_BOX_FIELDS, box))
+        if str(label) in classes:
+            obj["class"] = classes[str(label)]
+        if flags & PACKED_TRACK_IDS:
+            obj["track_id"] = track_id
+        payload["Object" + str(object_id)] = obj
+    payload.update(metadata)
+    return payload
+
+
+class PayloadCodec(object):
+    """Encode result payloads for publishing as JSON, MessagePack or the packed layout.
+
+    JSON messages are the json.dumps text the samples always sent. The
+    binary codecs prefix their bytes with a tag, so that decode_payload()
+    can tell the codecs apart. The MessagePack codec raises ImportError
+    without the msgpack package, unless a fallback codec is given to use
+    instead; codec holds the one actually used.
+    """
+
+    def __init__(self, codec=CODEC_JSON, fallback=None):
+        assert codec in CODECS, "Unknown payload codec {0}".format(codec)
+        assert fallback in (None, CODEC_JSON, CODEC_PACKED), "Unknown fallback payload codec {0}".format(fallback)
+        if codec == CODEC_MSGPACK and msgpack is None:
+            if fallback is None:
+                raise ImportError("The msgpack payload codec needs the msgpack package, install it or choose "
+                                  "a fallback codec")
+            print("[WARNING]: The msgpack package is not installed, publishing {0} payloads".format(fallback))
+            codec = fallback
+        self.codec = codec
+        self.binary = codec != CODEC_JSON
+
+    def encode(self, payload):
+        """Return the message of a payload: text for JSON and bytes for the binary codecs."""
+        if self.codec == CODEC_MSGPACK:
+            return TAG_MSGPACK + msgpack.packb(payload, use_bin_type=True)
+        if self.codec == CODEC_PACKED:
+            return pack_payload(payload)
+        return json.dumps(payload)
+
+
+def decode_payload(message):
+    """Return the payload of a message of any codec, identified by its first byte."""
+    if not isinstance(message, bytes):
+        message = message.encode("utf-8")
+    tag = message[:1]
+    if tag == TAG_MSGPACK:
+        assert msgpack is not None, "Decoding MessagePack payloads needs the msgpack package"
+        return msgpack.unpackb(message[1:], raw=False, object_pairs_hook=OrderedDict)
+    if tag == TAG_PACKED:
+        return unpack_payload(message)
+    assert tag == TAG_JSON, "Unknown payload tag {0!r}".format(tag)
+    return json.loads(message.decode("utf-8"), object_pairs_hook=OrderedDict)
@@ -0,0 +1,58 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import cv2
+import numpy as np
+
+
+class Preprocessor(object):
+    """Resize BGR frames to the network input and write them as CHW planes.
+
+    The resized image goes to a reused HWC buffer (cv2.resize dst=) and is then
+    copied plane by plane into a caller-provided CHW array, typically a slot of
+    a preallocated input blob, so no array is allocated per frame.
+    """
+
+    def __init__(self, width, height, channels=3):
+        self.size = (width, height)
+        self.resized = np.empty((height, width, channels), dtype=np.uint8)
+
+    def __call__(self, frame, out):
+        """Write frame into the (C, H, W) array out and return out."""
+        cv2.resize(frame, self.size, dst=self.resized)
+        # Change data layout from HWC to CHW while copying into the blob
+        np.copyto(out, self.resized.transpose((2, 0, 1)))
+        return out
+
+
+def preprocess(frame, width, height):
+    """Return frame resized to the network input as a new CHW array."""
+    return cv2.resize(frame, (width, height)).transpose((2, 0, 1))
@@ -0,0 +1,136 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import datetime
+import threading
+import time
+import timeit
+from collections import namedtuple, OrderedDict
+
+from faas_common.bounded_queue import BoundedQueue, DROP_OLDEST
+
+# A report handed to the sinks: the result payload, the annotated frame and the time it was queued
+Report = namedtuple("Report", ["payload", "frame", "timestamp"])
+
+
+class Publisher(object):
+    """Deliver reports to output sinks from background worker threads.
+
+    Every sink is a callable taking a Report and gets its own BoundedQueue and
+    worker thread, so a slow S3 upload does not hold back IoT messages and none
+    of them block the inference loop. When a sink falls behind, the queue's
+    overflow policy decides whether reports are dropped or publish() waits.
+    Delivery times are recorded as the "publish" stage of metrics, if given.
+    """
+
+    def __init__(self, sinks, queue_size=8, overflow=DROP_OLDEST, metrics=None):
+        self.sinks = OrderedDict(sinks)
+        self.metrics = metrics
+        self.queues = OrderedDict()
+        self.sent = dict.fromkeys(self.sinks, 0)
+        self.failed = dict.fromkeys(self.sinks, 0)
+        self.workers = []
+        for name in self.sinks:
+            self.queues[name] = BoundedQueue(queue_size, overflow)
+            worker = threading.Thread(target=self._worker_loop, args=(name,))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def _worker_loop(self, name):
+        sink = self.sinks[name]
+        queue = self.queues[name]
+        while True:
+            report = queue.get()
+            if report is None:
+                break
+            try:
+                start_time = timeit.default_timer()
+                sink(report)
+                if self.metrics is not None:
+                    self.metrics.add("publish", timeit.default_timer() - start_time)
+                self.sent[name] += 1
+            except Exception as error:
+                self.failed[name] += 1
+                print("[ERROR]: Sink {0} failed: {1}".format(name, error))
+
+    def publish(self, payload, frame=None):
+        """Queue a report for every sink."""
+        report = Report(payload, frame, datetime.datetime.now())
+        for queue in self.queues.values():
+            queue.put(report)
+
+    def dropped(self):
+        """Return the total number of reports dropped by the overflow policy."""
+        return sum(queue.dropped for queue in self.queues.values())
+
+    def stats(self):
+        """Return per-sink queue depth, high watermark, sent, failed and dropped counters."""
+        stats = OrderedDict()
+        for name, queue in self.queues.items():
+            stats[name] = {"depth": queue.depth(), "high_watermark": queue.high_watermark,
+                           "sent": self.sent[name], "failed": self.failed[name], "dropped": queue.dropped}
+        return stats
+
+    def close(self, timeout=None):
+        """Deliver the queued reports and stop the worker threads."""
+        for queue in self.queues.values():
+            queue.close()
+        for worker in self.workers:
+            worker.join(timeout)
+
+
+class FakeSink(object):
+    """Sink that keeps delivered reports in memory, for offline tests.
+
+    Delivery can be slowed down by a simulated delay, or held until the `gate`
+    event is set so that the reports after it queue up. `started` is set once
+    the first report reaches the sink.
+    """
+
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.started = threading.Event()
+        self.reports = []
+
+    def payloads(self):
+        """Return the payloads of the delivered reports, in delivery order."""
+        return [report.payload for report in self.reports]
+
+    def __call__(self, report):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait()
+        if self.delay:
+            time.sleep(self.delay)
+        self.reports.append(report)
@@ -0,0 +1,151 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import threading
+import timeit
+from collections import OrderedDict, deque
+import cv2
+
+# Seconds over which the byte budget is enforced
+BUDGET_WINDOW = 60.0
+
+
+class SnapshotEncoder(object):
+    """Encode frames to JPEG in memory, optionally downscaled, within a per-minute byte budget.
+
+    Frames wider than width are downscaled first, keeping the aspect ratio.
+    With budget_bytes, the JPEG quality adapts between min_quality and
+    max_quality so that the snapshots of the last minute, at the rate they
+    are requested, add up to the budget: every snapshot is aimed at the
+    budget divided by the snapshots expected per minute, and the quality is
+    stepped down, by more the larger the overshoot, when one comes out larger
+    and up when it comes out well below. Once the budget of the last minute
+    is spent, frames are skipped and encode() returns None.
+    """
+
+    def __init__(self, width=0, quality=95, budget_bytes=0, min_quality=30, max_quality=None, quality_step=5):
+        self.width = width
+        self.quality = quality
+        self.budget_bytes = budget_bytes
+        self.min_quality = min_quality
+        self.max_quality = max_quality or quality
+        self.quality_step = quality_step
+        self.requests = deque()
+        self.sizes = deque()
+        self.spent = 0
+        self.encoded = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        while self.requests and now - self.requests[0] > BUDGET_WINDOW:
+            self.requests.popleft()
+        while self.sizes and now - self.sizes[0][0] > BUDGET_WINDOW:
+            self.spent -= self.sizes.popleft()[1]
+
+    def _target_size(self, now):
+        """Return the bytes a snapshot may take so that the expected snapshots of a minute fit the budget."""
+        elapsed = max(now - self.requests[0], 1.0)
+        if elapsed >= BUDGET_WINDOW:
+            per_window = len(self.requests)
+        else:
+            per_window = (len(self.requests) - 1) * BUDGET_WINDOW / elapsed
+        return self.budget_bytes / max(per_window, 1.0)
+
+    def encode(self, frame):
+        """Return the JPEG bytes of frame, or None if the byte budget of the last minute is spent."""
+        with self.lock:
+            now = timeit.default_timer()
+            self.requests.append(now)
+            self._expire(now)
+            if self.budget_bytes and self.spent >= self.budget_bytes:
+                self.skipped += 1
+                return None
+            quality = self.quality
+        height, width = frame.shape[:2]
+        if self.width and width > self.width:
+            # Area interpolation keeps downscaled snapshots free of aliasing
+            frame = cv2.resize(frame, (self.width, int(round(height * self.width / float(width)))),
+                               interpolation=cv2.INTER_AREA)
+        ret, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ret:
+            raise RuntimeError("JPEG encoding failed")
+        jpeg = jpeg.tobytes()
+        with self.lock:
+            self.sizes.append((now, len(jpeg)))
+            self.spent += len(jpeg)
+            self.encoded += 1
+            if self.budget_bytes:
+                target = self._target_size(now)
+                if len(jpeg) > target:
+                    # Step down further the more the snapshot overshot
+                    step = int(round(self.quality_step * min(len(jpeg) / target, 4.0)))
+                    self.quality = max(self.min_quality, self.quality - step)
+                elif len(jpeg) < 0.85 * target:
+                    self.quality = min(self.max_quality, self.quality + self.quality_step)
+        return jpeg
+
+    def stats(self):
+        """Return the current quality, the bytes of the last minute and the encoded and skipped counters."""
+        with self.lock:
+            self._expire(timeit.default_timer())
+            return OrderedDict([("quality", self.quality), ("bytes_last_minute", self.spent),
+                                ("encoded", self.encoded), ("skipped", self.skipped)])
+
+
+class SnapshotSink(object):
+    """Publisher sink that encodes the frame of a report once and hands the JPEG to several outputs.
+
+    outputs maps names to callables taking the Report and the JPEG bytes,
+    e.g. a local file write and an S3 upload. Running as one sink of a
+    Publisher, encoding and writing happen on its worker thread, off the
+    inference loop. An output that fails does not keep the others from
+    getting the snapshot; the first error is raised once all were called.
+    """
+
+    def __init__(self, encoder, outputs):
+        self.encoder = encoder
+        self.outputs = OrderedDict(outputs)
+
+    def __call__(self, report):
+        if report.frame is None:
+            return
+        jpeg = self.encoder.encode(report.frame)
+        if jpeg is None:
+            return
+        error = None
+        for output in self.outputs.values():
+            try:
+                output(report, jpeg)
+            except Exception as output_error:
+                error = error or output_error
+        if error is not None:
+            raise error
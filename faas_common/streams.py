@@ -0,0 +1,151 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import threading
+import timeit
+
+from faas_common.capture import ThreadedCapture, ProcessCapture
+
+# Order in which streams with decoded frames are served: in turn, or the least served first
+SCHEDULE_ROUND_ROBIN = "round_robin"
+SCHEDULE_FAIR = "fair"
+SCHEDULES = (SCHEDULE_ROUND_ROBIN, SCHEDULE_FAIR)
+
+
+def split_sources(value):
+    """Return the list of sources in a comma-separated PARAM_INPUT_SOURCE value."""
+    return [source.strip() for source in value.split(",") if source.strip()]
+
+
+class MultiStreamCapture(object):
+    """Decode several sources, one ThreadedCapture each, for a single inference loop.
+
+    read() hands out the decoded frames of all streams tagged with the index of
+    their source, so that one loaded network and its pool of infer requests
+    can serve every camera. SCHEDULE_ROUND_ROBIN serves the streams that have a
+    frame ready in turn; SCHEDULE_FAIR serves the stream that got the fewest
+    frames so far first, so that a fast source cannot crowd out a slow one.
+
+    With decode_processes, every source is decoded in its own process into
+    shared memory (ProcessCapture) and shared_frames is True: every frame read
+    stays valid until it is release()d, and up to hold_frames frames per
+    stream can be held at a time. fork_decoders() forks the decode processes
+    ahead of start(), which must happen before the process starts any thread
+    or loads a plugin. decode holds the DecodeOptions of all sources, see
+    faas_common.decode.
+    """
+
+    def __init__(self, sources, queue_size=None, overflow=None, schedule=SCHEDULE_ROUND_ROBIN,
+                 decode_processes=False, hold_frames=1, decode=None):
+        assert sources, "At least one input source is needed"
+        assert schedule in SCHEDULES, "Unknown stream schedule: %s" % schedule
+        self.schedule = schedule
+        self.frame_ready = threading.Event()
+        self.shared_frames = decode_processes
+        if decode_processes:
+            self.streams = [ProcessCapture(source, queue_size, overflow, self.frame_ready.set, hold_frames, decode)
+                            for source in sources]
+        else:
+            self.streams = [ThreadedCapture(source, queue_size, overflow, self.frame_ready.set, decode)
+                            for source in sources]
+        self.served = [0] * len(self.streams)
+        self.ended = [not stream.isOpened() for stream in self.streams]
+        self.next_stream = 0
+
+    def isOpened(self):
+        return not all(self.ended)
+
+    def fork_decoders(self):
+        """Fork the decode processes of all opened streams, if any; they decode once the capture is started."""
+        if self.shared_frames:
+            for stream_id, stream in enumerate(self.streams):
+                if not self.ended[stream_id]:
+                    stream.fork()
+        return self
+
+    def start(self):
+        """Start the decode threads (and processes) of all opened streams."""
+        # Every decode process is forked before the first relay thread starts
+        self.fork_decoders()
+        for stream_id, stream in enumerate(self.streams):
+            if not self.ended[stream_id]:
+                stream.start()
+        return self
+
+    def _order(self):
+        count = len(self.streams)
+        if self.schedule == SCHEDULE_FAIR:
+            return sorted(range(count), key=lambda i: (self.served[i], (i - self.next_stream) % count))
+        return [(self.next_stream + i) % count for i in range(count)]
+
+    def read(self, timeout=None):
+        """Return (ret, frame, frame_id, stream_id) for the next frame.
+
+        ret is False once all streams have ended, and None if no stream
+        decoded a frame within timeout seconds.
+        """
+        deadline = None if timeout is None else timeit.default_timer() + timeout
+        while not all(self.ended):
+            # Clear first so that a frame queued during the scan wakes up the wait below
+            self.frame_ready.clear()
+            for stream_id in self._order():
+                if self.ended[stream_id]:
+                    continue
+                ret, frame, frame_id = self.streams[stream_id].poll()
+                if ret:
+                    self.served[stream_id] += 1
+                    self.next_stream = (stream_id + 1) % len(self.streams)
+                    return True, frame, frame_id, stream_id
+                if ret is False:
+                    self.ended[stream_id] = True
+            if not all(self.ended):
+                remaining = None if deadline is None else deadline - timeit.default_timer()
+                if remaining is not None and remaining <= 0:
+                    return None, None, None, None
+                self.frame_ready.wait(remaining)
+        return False, None, None, None
+
+    def release(self, stream_id, frame):
+        """Hand a frame read before back to its stream once it is no longer used."""
+        self.streams[stream_id].release(frame)
+
+    def queue_depth(self, stream_id):
+        """Return the number of decoded frames of a stream waiting for the inference loop."""
+        return self.streams[stream_id].queue_depth()
+
+    def dropped_frames(self, stream_id):
+        """Return the number of decoded frames of a stream discarded by its overflow policy."""
+        return self.streams[stream_id].dropped_frames()
+
+    def stop(self):
+        """Stop all decode threads and release the sources."""
+        for stream in self.streams:
+            stream.stop()
@@ -0,0 +1,129 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+from faas_common.detections import non_max_suppression
+
+# Prefix of an automatic grid of tiles in a region spec, e.g. "grid:3x2:0.1"
+GRID_PREFIX = "grid:"
+
+
+def grid_regions(columns, rows, overlap=0.1):
+    """Return columns x rows tiles covering the frame, neighbours overlapping by a share of a tile."""
+    tile_width = 1.0 / (columns - (columns - 1) * overlap)
+    tile_height = 1.0 / (rows - (rows - 1) * overlap)
+    return [(column * tile_width * (1 - overlap), row * tile_height * (1 - overlap), tile_width, tile_height)
+            for row in range(rows) for column in range(columns)]
+
+
+def parse_regions(spec):
+    """Parse semicolon-separated regions into (x, y, width, height) fractions of the frame.
+
+    Each part is either a rectangle "x,y,width,height" given as fractions of
+    the frame, or an automatic grid "grid:<columns>x<rows>[:<overlap>]".
+    E.g. "0,0,1,1;grid:2x2:0.1" infers the whole frame and four overlapping
+    quarters, so that large objects and small ones are both found.
+    """
+    regions = []
+    for part in spec.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        if part.startswith(GRID_PREFIX):
+            fields = part[len(GRID_PREFIX):].split(":")
+            columns, rows = (int(value) for value in fields[0].lower().split("x"))
+            overlap = float(fields[1]) if len(fields) > 1 else 0.1
+            if columns < 1 or rows < 1 or not 0 <= overlap < 1:
+                raise ValueError("Invalid tile grid: %s" % part)
+            regions.extend(grid_regions(columns, rows, overlap))
+        else:
+            x, y, width, height = (float(value) for value in part.split(","))
+            if width <= 0 or height <= 0 or x < 0 or y < 0 or x + width > 1.0001 or y + height > 1.0001:
+                raise ValueError("Region must lie within the frame: %s" % part)
+            regions.append((x, y, width, height))
+    if not regions:
+        raise ValueError("No region in: %s" % spec)
+    return regions
+
+
+class Tiler(object):
+    """Crop regions of interest out of frames and merge the SSD outputs of the crops back.
+
+    Regions are (x, y, width, height) fractions of the frame, so one layout
+    serves sources of any resolution. Each region is resized to the network
+    input on its own: on high-resolution sources small objects stay large
+    enough to be detected, and the parts of the frame outside every region
+    cost nothing. Every region takes a slot of the batch of its frame, so the
+    network is loaded with the batch size times the number of regions.
+
+    merge() maps the rows of every crop to frame coordinates and suppresses
+    the duplicates of objects seen by overlapping crops, per label.
+    """
+
+    def __init__(self, regions, iou_threshold=0.5):
+        self.regions = list(regions)
+        self.iou_threshold = iou_threshold
+        self.offsets = np.array([(x, y, x, y) for x, y, _, _ in self.regions], dtype=np.float32)
+        self.scales = np.array([(width, height, width, height) for _, _, width, height in self.regions],
+                               dtype=np.float32)
+
+    def __len__(self):
+        return len(self.regions)
+
+    def crops(self, frame):
+        """Return the regions of frame as views, without copying pixels."""
+        frame_height, frame_width = frame.shape[:2]
+        views = []
+        for x, y, width, height in self.regions:
+            left, top = int(round(x * frame_width)), int(round(y * frame_height))
+            right = max(left + 1, int(round((x + width) * frame_width)))
+            bottom = max(top + 1, int(round((y + height) * frame_height)))
+            views.append(frame[top:bottom, left:right])
+        return views
+
+    def merge(self, tile_rows, prob_threshold):
+        """Return the SSD rows above prob_threshold of all crops of a frame in frame coordinates, without duplicates."""
+        tile_rows = [rows[rows[:, 2] > prob_threshold] for rows in tile_rows]
+        tiles = np.repeat(np.arange(len(tile_rows)), [len(rows) for rows in tile_rows])
+        rows = np.concatenate(tile_rows)
+        rows[:, 0] = 0
+        rows[:, 3:7] = rows[:, 3:7] * self.scales[tiles] + self.offsets[tiles]
+        if len(self.regions) > 1 and len(rows) > 1:
+            rows = rows[non_max_suppression(rows[:, 3:7], rows[:, 2], self.iou_threshold, rows[:, 1])]
+        return rows
+
+    def merge_batch(self, batch_info, batch_rows, prob_threshold):
+        """Merge the per-crop userdata and rows of a batch, whose frames hold consecutive slots, into per-frame ones."""
+        count = len(self.regions)
+        frame_rows = [self.merge(batch_rows[start:start + count], prob_threshold)
+                      for start in range(0, len(batch_rows), count)]
+        return batch_info[::count], frame_rows
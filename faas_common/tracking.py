@@ -0,0 +1,135 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+from faas_common.detections import DETECTION_DTYPE, box_iou, detection_corners
+
+
+class IouTracker(object):
+    """Give the SSD detections of one stream stable track ids and move them on between detections.
+
+    step() is called once for every frame of the stream, in decode order. The
+    tracks are first moved on by their constant per-frame velocity; given the
+    detections of an inferred frame, they are then matched greedily to them by
+    IoU, falling back to the nearest centroid within max_distance for objects
+    that moved too far for their boxes to overlap. Unmatched detections start
+    new tracks, and tracks unmatched for more than max_missed inferred frames
+    are dropped. Passing None for a frame where detection was skipped reports
+    the moved tracks instead.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_distance=0.1, max_missed=2, alpha=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.alpha = alpha
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.labels = np.zeros(0, dtype=np.int32)
+        self.confidences = np.zeros(0, dtype=np.float32)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.observed = np.zeros((0, 4), dtype=np.float32)
+        self.velocities = np.zeros((0, 4), dtype=np.float32)
+        self.frames_since_update = np.zeros(0, dtype=np.int32)
+        self.missed = np.zeros(0, dtype=np.int32)
+
+    def step(self, detections=None):
+        """Advance the tracks by one frame and return their (DETECTION_DTYPE array, track ids).
+
+        Only the tracks matched at the last inferred frame are reported, so that
+        objects which left the scene are not drawn while they coast.
+        """
+        self.boxes += self.velocities
+        self.frames_since_update += 1
+        if detections is not None:
+            self._update(detections)
+        live = self.missed == 0
+        tracked = np.empty(int(live.sum()), dtype=DETECTION_DTYPE)
+        tracked["label"] = self.labels[live]
+        tracked["confidence"] = self.confidences[live]
+        boxes = np.clip(self.boxes[live], 0.0, 1.0)
+        for column, field in enumerate(("xmin", "ymin", "xmax", "ymax")):
+            tracked[field] = boxes[:, column]
+        return tracked, self.ids[live]
+
+    def _match(self, boxes, labels):
+        """Return the greedy (track, detection) index pairs, best IoU first, then nearest centroid."""
+        same_label = self.labels[:, None] == labels[None, :]
+        iou = box_iou(self.boxes, boxes)
+        track_centers = (self.boxes[:, :2] + self.boxes[:, 2:]) / 2
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        distance = np.sqrt(((track_centers[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2))
+        # Overlapping pairs rank above every centroid-only pair
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                         np.where(distance <= self.max_distance, 1.0 - distance / (2 * self.max_distance), 0.0))
+        score[~same_label] = 0.0
+        candidates = np.argwhere(score > 0)
+        candidates = candidates[np.argsort(-score[candidates[:, 0], candidates[:, 1]], kind="stable")]
+        matched_tracks = set()
+        matched_detections = set()
+        pairs = []
+        for track, detection in candidates.tolist():
+            if track not in matched_tracks and detection not in matched_detections:
+                matched_tracks.add(track)
+                matched_detections.add(detection)
+                pairs.append((track, detection))
+        return pairs
+
+    def _update(self, detections):
+        boxes = detection_corners(detections)
+        labels = detections["label"].astype(np.int32)
+        pairs = self._match(boxes, labels) if len(self.ids) and len(detections) else []
+        self.missed += 1
+        if pairs:
+            tracks, matched = np.array(pairs).T
+            steps = self.frames_since_update[tracks][:, None].astype(np.float32)
+            velocities = (boxes[matched] - self.observed[tracks]) / steps
+            self.velocities[tracks] = self.alpha * velocities + (1 - self.alpha) * self.velocities[tracks]
+            self.boxes[tracks] = boxes[matched]
+            self.observed[tracks] = boxes[matched]
+            self.confidences[tracks] = detections["confidence"][matched]
+            self.frames_since_update[tracks] = 0
+            self.missed[tracks] = 0
+        keep = self.missed <= self.max_missed
+        new = np.ones(len(detections), dtype=bool)
+        if pairs:
+            new[matched] = False
+        count = int(new.sum())
+        self.ids = np.concatenate([self.ids[keep], np.arange(self.next_id, self.next_id + count)])
+        self.next_id += count
+        self.labels = np.concatenate([self.labels[keep], labels[new]])
+        self.confidences = np.concatenate([self.confidences[keep], detections["confidence"][new]])
+        self.boxes = np.concatenate([self.boxes[keep], boxes[new]])
+        self.observed = np.concatenate([self.observed[keep], boxes[new]])
+        self.velocities = np.concatenate([self.velocities[keep], np.zeros((count, 4), dtype=np.float32)])
+        self.frames_since_update = np.concatenate([self.frames_since_update[keep], np.zeros(count, dtype=np.int32)])
+        self.missed = np.concatenate([self.missed[keep], np.zeros(count, dtype=np.int32)])
@@ -0,0 +1,156 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from __future__ import print_function
+import io
+import tarfile
+import time
+import timeit
+from collections import OrderedDict, deque
+
+
+class S3Uploader(object):
+    """Upload JPEG snapshots to S3 straight from memory, several per request, with bounded retries.
+
+    Called with a Report and its JPEG bytes, e.g. as an output of a
+    SnapshotSink. A single snapshot is uploaded as <timestamp>.jpeg; with
+    batch_size above 1 the snapshots are collected and uploaded as one
+    <first timestamp>_<count>.tar object once batch_size of them are
+    pending or the oldest waited max_delay seconds. Bodies are streamed with
+    upload_fileobj, which switches to a multipart upload for large batches.
+    A failed upload is attempted up to attempts times with exponential
+    backoff and then kept for the next call, but never more than
+    max_pending_bytes of snapshots are held: the oldest batches are dropped
+    first. Calls are expected from a single thread, such as the publisher
+    thread of the snapshot sink.
+    """
+
+    def __init__(self, client, bucket, batch_size=1, max_delay=5.0, attempts=3, backoff=0.5,
+                 max_pending_bytes=16 << 20):
+        assert batch_size >= 1, "batch_size must be at least 1"
+        assert attempts >= 1, "attempts must be at least 1"
+        self.client = client
+        self.bucket = bucket
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_pending_bytes = max_pending_bytes
+        # Snapshots of the batch being collected, and batches whose upload failed, as lists of (key, jpeg)
+        self.batch = []
+        self.batch_start = None
+        self.failed = deque()
+        self.pending_bytes = 0
+        self.uploaded = 0
+        self.requests = 0
+        self.retries = 0
+        self.dropped = 0
+
+    def __call__(self, report, jpeg):
+        if not self.batch:
+            self.batch_start = timeit.default_timer()
+        self.batch.append((str(report.timestamp).replace(" ", "_"), jpeg))
+        self.pending_bytes += len(jpeg)
+        if len(self.batch) >= self.batch_size or timeit.default_timer() - self.batch_start >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Upload the pending snapshots, oldest first, stopping at and raising the first error."""
+        if self.batch:
+            self.failed.append(self.batch)
+            self.batch = []
+        error = None
+        while self.failed:
+            try:
+                self._upload(self.failed[0])
+            except Exception as upload_error:
+                # Leave this and the newer batches for the next call rather than retrying them all now
+                error = upload_error
+                break
+            batch = self.failed.popleft()
+            self.pending_bytes -= sum(len(jpeg) for _, jpeg in batch)
+            self.uploaded += len(batch)
+        # Bound the memory held for retries by dropping the oldest snapshots
+        while self.pending_bytes > self.max_pending_bytes and self.failed:
+            batch = self.failed.popleft()
+            self.pending_bytes -= sum(len(jpeg) for _, jpeg in batch)
+            self.dropped += len(batch)
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Upload the pending snapshots before exiting, reporting instead of raising errors."""
+        try:
+            self.flush()
+        except Exception as error:
+            print("[ERROR]: S3 upload failed, {0} snapshots lost: {1}".format(self.pending(), error))
+
+    def pending(self):
+        """Return the number of snapshots waiting for upload."""
+        return len(self.batch) + sum(len(batch) for batch in self.failed)
+
+    def _upload(self, batch):
+        if len(batch) == 1:
+            key, body = batch[0][0] + ".jpeg", batch[0][1]
+            content_type = "image/jpeg"
+        else:
+            key, body = "{0}_{1}.tar".format(batch[0][0], len(batch)), tar_snapshots(batch)
+            content_type = "application/x-tar"
+        for attempt in range(self.attempts):
+            if attempt:
+                self.retries += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                self.requests += 1
+                self.client.upload_fileobj(Fileobj=io.BytesIO(body), Bucket=self.bucket, Key=key,
+                                           ExtraArgs={"ContentType": content_type})
+                return
+            except Exception:
+                if attempt == self.attempts - 1:
+                    raise
+
+    def stats(self):
+        """Return the uploaded, request, retry and dropped counters and the pending snapshots and bytes."""
+        return OrderedDict([("uploaded", self.uploaded), ("requests", self.requests), ("retries", self.retries),
+                            ("dropped", self.dropped), ("pending", self.pending()),
+                            ("pending_bytes", self.pending_bytes)])
+
+
+def tar_snapshots(batch):
+    """Return an uncompressed tar archive, built in memory, of (name, jpeg) snapshots as <name>.jpeg members."""
+    buffer = io.BytesIO()
+    archive = tarfile.open(fileobj=buffer, mode="w")
+    for name, jpeg in batch:
+        member = tarfile.TarInfo(name + ".jpeg")
+        member.size = len(jpeg)
+        archive.addfile(member, io.BytesIO(jpeg))
+    archive.close()
+    return buffer.getvalue()
@@ -0,0 +1,274 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import os
+import ctypes
+import subprocess
+import timeit
+import multiprocessing
+from collections import deque
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+import numpy as np
+
+from openvino.inference_engine import IENetwork, IEPlugin
+
+from faas_common.frame_ring import FORK_CONTEXT
+from faas_common.network_cache import NetworkCache, load_network
+
+
+def parse_cpu_list(value):
+    """Return the CPUs of a Linux cpulist string such as "0-3,8,10-11"."""
+    cpus = []
+    for part in value.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def numa_cpu_sets():
+    """Return the list of CPUs of every NUMA node, or of the whole machine if there is no NUMA information."""
+    nodes_dir = "/sys/devices/system/node"
+    cpu_sets = []
+    if os.path.isdir(nodes_dir):
+        nodes = [name for name in os.listdir(nodes_dir) if name.startswith("node") and name[4:].isdigit()]
+        for name in sorted(nodes, key=lambda node: int(node[4:])):
+            with open(os.path.join(nodes_dir, name, "cpulist")) as cpulist_file:
+                cpus = parse_cpu_list(cpulist_file.read())
+            if cpus:
+                cpu_sets.append(cpus)
+    return cpu_sets or [list(range(multiprocessing.cpu_count()))]
+
+
+def worker_cpu_sets(num_workers, cpu_sets=None):
+    """Assign workers to NUMA nodes in turn and split the CPUs of a node between the workers it gets."""
+    cpu_sets = cpu_sets or numa_cpu_sets()
+    node_workers = [[] for _ in cpu_sets]
+    for worker_id in range(num_workers):
+        node_workers[worker_id % len(cpu_sets)].append(worker_id)
+    assignment = [None] * num_workers
+    for cpus, workers in zip(cpu_sets, node_workers):
+        for i, worker_id in enumerate(workers):
+            share = cpus[i * len(cpus) // len(workers):(i + 1) * len(cpus) // len(workers)]
+            # More workers than CPUs on the node: let them share the whole node
+            assignment[worker_id] = share or cpus
+    return assignment
+
+
+def pin_to_cpus(cpus):
+    """Restrict the calling process to the given CPUs."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    else:
+        # Python 2 has no affinity API, fall back to taskset from util-linux
+        with open(os.devnull, "w") as devnull:
+            subprocess.call(["taskset", "-p", "-c", ",".join(str(cpu) for cpu in cpus), str(os.getpid())],
+                            stdout=devnull, stderr=devnull)
+
+
+def _worker_main(worker_id, cpus, config, slots, shape, tasks, results):
+    """Load the network in a worker process and infer the batches handed over in the shared slots."""
+    try:
+        if cpus:
+            pin_to_cpus(cpus)
+        device = config["device"]
+        plugin = IEPlugin(device=device, plugin_dirs=config["plugin_dir"])
+        cpu_extension = config["cpu_extension"] if config["cpu_extension"] and "CPU" in device else None
+        if cpu_extension:
+            plugin.add_cpu_extension(cpu_extension)
+        ie_config = {}
+        if cpus and "CPU" in device:
+            # One inference thread per CPU the worker is pinned to
+            ie_config["CPU_THREADS_NUM"] = str(len(cpus))
+            plugin.set_config(ie_config)
+        cache = NetworkCache(config["cache_dir"], config["cache_size"]) \
+            if config["cache_dir"] and config["cache_size"] else None
+        exec_net, input_blob, _, _, timings = load_network(plugin, config["model_xml"], device, 1,
+                                                           config["batch_size"], cpu_extension, cache, ie_config,
+                                                           config["plugin_dir"])
+    except Exception as error:
+        results.put(("error", worker_id, str(error)))
+        return
+    results.put(("ready", worker_id, timings))
+    inputs = [np.frombuffer(slot, dtype=np.uint8).reshape(shape) for slot in slots]
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, slot_id = task
+        try:
+            outputs = exec_net.infer({input_blob: inputs[slot_id]})
+        except Exception as error:
+            results.put(("error", worker_id, str(error)))
+            return
+        results.put(("result", seq, slot_id, dict(outputs)))
+
+
+class InferenceWorkerPool(object):
+    """Fan inference out to worker processes, each pinned to a NUMA node and holding its own loaded network.
+
+    Has the interface of InferRequestRing, so the sample loops can use either.
+    Input batches are copied into shared memory slots (slots_per_worker per
+    worker) and the first idle worker takes the next one; results come back
+    through a queue and collect() returns them in submission order.
+
+    The workers are forked when the pool is created, so create it before the
+    process starts any thread or loads an Inference Engine plugin: a child
+    forked while another thread holds a lock (of the allocator, of stdio, of
+    the plugin thread pools) deadlocks on it. Loading the networks takes a
+    while, wait_ready() waits for it and can run later on any thread.
+    """
+
+    def __init__(self, num_workers, model_xml, device, batch_size=1, cpu_extension=None, plugin_dir=None,
+                 slots_per_worker=2, cache_dir=None, cache_size=0, cpu_sets=None):
+        # Read the input and output names and the input shape, the workers load the network themselves
+        net = IENetwork.from_ir(model=model_xml, weights=os.path.splitext(model_xml)[0] + ".bin")
+        assert len(net.inputs.keys()) == 1, "Sample supports only single input topologies"
+        assert len(net.outputs) == 1, "Sample supports only single output topologies"
+        self.input_blob = next(iter(net.inputs))
+        self.out_blob = next(iter(net.outputs))
+        net.batch_size = batch_size
+        self.shape = tuple(net.inputs[self.input_blob].shape)
+        del net
+
+        self.num_slots = num_workers * slots_per_worker
+        slot_size = int(np.prod(self.shape))
+        self.slots = [FORK_CONTEXT.RawArray(ctypes.c_uint8, slot_size) for _ in range(self.num_slots)]
+        self.slot_arrays = [np.frombuffer(slot, dtype=np.uint8).reshape(self.shape) for slot in self.slots]
+        self.free_slots = deque(range(self.num_slots))
+        self.tasks = FORK_CONTEXT.Queue()
+        self.results = FORK_CONTEXT.Queue()
+        config = {"model_xml": model_xml, "device": device, "batch_size": batch_size,
+                  "cpu_extension": cpu_extension, "plugin_dir": plugin_dir,
+                  "cache_dir": cache_dir, "cache_size": cache_size}
+        self.workers = []
+        for worker_id, cpus in enumerate(worker_cpu_sets(num_workers, cpu_sets)):
+            # Forked, a spawned worker would import the sample again and run its loop
+            worker = FORK_CONTEXT.Process(target=_worker_main, args=(worker_id, cpus, config, self.slots,
+                                                                     self.shape, self.tasks, self.results))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        self.next_seq = 0
+        self.next_collect = 0
+        self.in_flight = {}
+        self.completed = {}
+        self.alpha = 0.2
+        self.latency = None
+        self.startup_timings = None
+
+    def wait_ready(self):
+        """Wait until every worker has loaded its network and return the startup timings of the first one."""
+        if self.startup_timings is not None:
+            return self.startup_timings
+        for _ in self.workers:
+            message = self.results.get()
+            if message[0] == "error":
+                self.close()
+                raise RuntimeError("Inference worker %d failed to load the network: %s" % message[1:])
+            if self.startup_timings is None:
+                self.startup_timings = message[2]
+        return self.startup_timings
+
+    def full(self):
+        """Return True if as many batches are in flight as there are shared slots."""
+        # Batches that are done but not collected yet still count, they wait for their turn in order
+        return len(self.in_flight) >= self.num_slots
+
+    def pending(self):
+        """Return the number of batches in flight."""
+        return len(self.in_flight)
+
+    def ready(self):
+        """Return True if the oldest batch is done, without waiting for it."""
+        while self.next_collect not in self.completed and self._receive(block=False):
+            pass
+        return self.next_collect in self.completed
+
+    def time_to_result(self):
+        """Return the seconds left before the oldest batch should be collected, as InferRequestRing does."""
+        if not self.in_flight:
+            return None
+        if self.latency is None:
+            return 0.0
+        return max(0.0, self.in_flight[self.next_collect][0] + self.latency / 2 - timeit.default_timer())
+
+    def submit(self, inputs, userdata=None):
+        """Copy the input batch into a free shared slot and queue it for the next idle worker."""
+        assert not self.full(), "No free slot, collect() a result first"
+        slot_id = self.free_slots.popleft()
+        np.copyto(self.slot_arrays[slot_id], inputs[self.input_blob], casting="unsafe")
+        seq = self.next_seq
+        self.next_seq += 1
+        self.in_flight[seq] = (timeit.default_timer(), userdata)
+        self.tasks.put((seq, slot_id))
+        return seq
+
+    def collect(self):
+        """Wait for the oldest batch and return (userdata, outputs, latency in seconds)."""
+        seq = self.next_collect
+        # Results of newer batches that finish first are kept until their turn comes
+        while seq not in self.completed:
+            self._receive()
+        self.next_collect += 1
+        start_time, userdata = self.in_flight.pop(seq)
+        latency = timeit.default_timer() - start_time
+        self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        return userdata, self.completed.pop(seq), latency
+
+    def _receive(self, block=True):
+        """Keep the outputs of the next batch a worker finished, return False if none was there without blocking."""
+        try:
+            message = self.results.get(block)
+        except Empty:
+            return False
+        if message[0] == "error":
+            raise RuntimeError("Inference worker %d failed: %s" % message[1:])
+        _, done_seq, slot_id, outputs = message
+        self.free_slots.append(slot_id)
+        self.completed[done_seq] = outputs
+        return True
+
+    def close(self, timeout=5.0):
+        """Stop the worker processes."""
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        # Stop the thread feeding the task queue, a process forked afterwards must not inherit it
+        self.tasks.close()
+        self.tasks.join_thread()
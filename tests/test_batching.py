@@ -0,0 +1,55 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+from faas_common.batching import FrameBatcher
+
+
+def test_time_to_ready_counts_down_from_the_first_frame(clock):
+    batcher = FrameBatcher(3, max_wait=0.1, shape=(3, 2, 2))
+    assert batcher.time_to_ready() is None
+    batcher.add(np.zeros((3, 2, 2), np.uint8))
+    assert np.isclose(batcher.time_to_ready(), 0.1)
+    clock.advance(0.06)
+    batcher.add(np.zeros((3, 2, 2), np.uint8))
+    assert np.isclose(batcher.time_to_ready(), 0.04) and not batcher.ready()
+    clock.advance(0.05)
+    assert batcher.time_to_ready() == 0.0 and batcher.ready()
+    batcher.take()
+    assert batcher.time_to_ready() is None
+
+
+def test_full_batch_is_ready_at_once(clock):
+    batcher = FrameBatcher(2, max_wait=10.0, shape=(3, 2, 2))
+    for _ in range(2):
+        batcher.add(np.zeros((3, 2, 2), np.uint8))
+    assert batcher.time_to_ready() == 0.0 and batcher.ready()
@@ -0,0 +1,98 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+import pytest
+
+from faas_common.detections import (DETECTION_DTYPE, NMS_AGNOSTIC, NMS_PER_CLASS, SsdParser, non_max_suppression,
+                                    suppress_detections)
+
+
+def _detections(*objects):
+    """Build detections from (label, confidence, xmin, ymin, xmax, ymax) tuples."""
+    return np.array(list(objects), dtype=DETECTION_DTYPE)
+
+
+# The same object reported under two labels, and an object of its own
+DUPLICATES = _detections((1, 0.6, 0.1, 0.1, 0.3, 0.3), (2, 0.9, 0.11, 0.1, 0.31, 0.3), (1, 0.8, 0.6, 0.6, 0.8, 0.8))
+
+
+def test_class_mode_keeps_overlapping_boxes_of_different_labels():
+    kept = suppress_detections(DUPLICATES, 0.5, NMS_PER_CLASS)
+    assert kept["confidence"].tolist() == pytest.approx([0.9, 0.8, 0.6])
+
+
+def test_agnostic_mode_suppresses_across_labels():
+    kept = suppress_detections(DUPLICATES, 0.5, NMS_AGNOSTIC)
+    assert kept["label"].tolist() == [2, 1]
+    assert kept["confidence"].tolist() == pytest.approx([0.9, 0.8])
+
+
+def test_iou_threshold():
+    boxes = np.array([[0.0, 0.0, 1.0, 1.0], [0.5, 0.0, 1.5, 1.0]], np.float32)
+    scores = np.array([0.9, 0.8], np.float32)
+    # The boxes overlap by a third
+    assert non_max_suppression(boxes, scores, 0.3).tolist() == [0]
+    assert non_max_suppression(boxes, scores, 0.4).tolist() == [0, 1]
+
+
+def test_merge_weights_boxes_by_confidence():
+    detections = _detections((1, 0.9, 0.1, 0.1, 0.3, 0.3), (1, 0.3, 0.14, 0.1, 0.34, 0.3),
+                             (1, 0.5, 0.6, 0.6, 0.8, 0.8))
+    kept = suppress_detections(detections, 0.5, merge=True)
+    assert kept["confidence"].tolist() == pytest.approx([0.9, 0.5])
+    assert kept["xmin"].tolist() == pytest.approx([(0.9 * 0.1 + 0.3 * 0.14) / 1.2, 0.6])
+    assert kept["xmax"].tolist() == pytest.approx([(0.9 * 0.3 + 0.3 * 0.34) / 1.2, 0.8])
+    assert kept["ymin"].tolist() == pytest.approx([0.1, 0.6])
+
+
+def test_max_detections_keeps_the_best():
+    kept = suppress_detections(DUPLICATES, 0.5, NMS_PER_CLASS, max_detections=2)
+    assert kept["confidence"].tolist() == pytest.approx([0.9, 0.8])
+    assert len(suppress_detections(DUPLICATES[:1], 0.5, max_detections=1)) == 1
+
+
+def test_boxes_beyond_max_detections_are_not_merged():
+    detections = _detections((1, 0.9, 0.1, 0.1, 0.3, 0.3), (1, 0.8, 0.6, 0.6, 0.8, 0.8),
+                             (1, 0.7, 0.62, 0.6, 0.82, 0.8))
+    kept = suppress_detections(detections, 0.5, max_detections=1, merge=True)
+    assert len(kept) == 1
+    assert kept["xmin"].tolist() == pytest.approx([0.1])
+
+
+def test_parser_caps_detections_without_nms():
+    rows = np.array([[0, 1, 0.6, 0.1, 0.1, 0.3, 0.3], [0, 1, 0.9, 0.11, 0.1, 0.31, 0.3],
+                     [0, 1, 0.4, 0.6, 0.6, 0.8, 0.8], [0, 1, 0.2, 0.0, 0.0, 0.1, 0.1]], np.float32)
+    assert SsdParser(0.3)(rows)["confidence"].tolist() == pytest.approx([0.6, 0.9, 0.4])
+    assert SsdParser(0.3, max_detections=2)(rows)["confidence"].tolist() == pytest.approx([0.9, 0.6])
+    assert SsdParser(0.3, nms_iou=0.5)(rows)["confidence"].tolist() == pytest.approx([0.9, 0.4])
+    with pytest.raises(ValueError):
+        SsdParser(0.3, nms_mode="none")
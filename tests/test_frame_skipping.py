@@ -0,0 +1,154 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+from faas_common.frame_skipping import AdaptiveFrameSkipper, INFER, REUSE, CACHED, DROP
+
+
+class StaticGate(object):
+    """MotionGate stand-in that reports every frame as unchanged and counts the commits."""
+
+    def __init__(self):
+        self.commits = 0
+
+    def changed(self, stream_id, frame):
+        return False
+
+    def commit(self, stream_id):
+        self.commits += 1
+
+
+def _complete(skipper, stream_id, result="result"):
+    """Account for the oldest inferred frame of stream_id as done and return the frames held behind it."""
+    released = skipper.release(stream_id)
+    skipper.set_result(stream_id, result)
+    return released
+
+
+def test_every_frame_is_inferred_without_targets(clock):
+    skipper = AdaptiveFrameSkipper(1)
+    assert not skipper.enabled
+    assert [skipper.decide(0, 3) for _ in range(5)] == [INFER] * 5
+
+
+def test_target_fps_reuses_fresh_results_and_drops_stale_ones(clock):
+    skipper = AdaptiveFrameSkipper(2, target_fps=1.0, max_staleness=0.3)
+    assert skipper.decide(0, 0) == INFER
+    # Nothing to reuse yet once the frame is done
+    _complete(skipper, 0, None)
+    clock.advance(0.1)
+    assert skipper.decide(0, 0) == DROP
+    skipper.set_result(0, "result")
+    clock.advance(0.1)
+    assert skipper.decide(0, 0) == REUSE
+    clock.advance(0.4)
+    assert skipper.decide(0, 0) == DROP
+    clock.advance(0.4)
+    assert skipper.decide(0, 0) == INFER
+    # Streams keep schedules of their own
+    assert skipper.decide(1, 0) == INFER
+    counts = skipper.take_counts(0)
+    assert (counts[INFER], counts[REUSE], counts[DROP], counts["skip_rate"]) == (2, 1, 2, 0.6)
+    assert skipper.take_counts(0)["skip_rate"] == 0.0
+
+
+def test_target_fps_does_not_catch_up_on_missed_frames(clock):
+    skipper = AdaptiveFrameSkipper(1, target_fps=2.0)
+    assert skipper.decide(0, 0) == INFER
+    _complete(skipper, 0)
+    clock.advance(5.0)
+    # One frame of the missed schedule is made up for, not ten
+    for _ in range(2):
+        assert skipper.decide(0, 0) == INFER
+        _complete(skipper, 0)
+    assert skipper.decide(0, 0) == REUSE
+    clock.advance(0.5)
+    assert skipper.decide(0, 0) == INFER
+
+
+def test_target_latency_skips_only_while_behind_with_frames_queued(clock):
+    skipper = AdaptiveFrameSkipper(1, target_latency=0.2)
+    skipper.update(0.5)
+    assert skipper.decide(0, 0) == INFER
+    _complete(skipper, 0)
+    assert skipper.decide(0, 1) == REUSE
+    # The EWMA has to come down below the target before queued frames are inferred again
+    skipper.update(0.0)
+    assert np.isclose(skipper.latency, 0.4)
+    assert skipper.decide(0, 1) == REUSE
+    for _ in range(5):
+        skipper.update(0.0)
+    assert skipper.decide(0, 1) == INFER
+
+
+def test_skipped_frames_are_held_until_the_results_before_them_are_in(clock):
+    skipper = AdaptiveFrameSkipper(1, target_latency=0.2)
+    skipper.update(1.0)
+    decisions = []
+    for frame_id in range(4):
+        queued = frame_id % 2
+        decision = skipper.decide(0, queued)
+        decisions.append(decision)
+        if decision == REUSE:
+            assert skipper.must_hold(0)
+            skipper.hold(0, frame_id)
+    assert decisions == [INFER, REUSE, INFER, REUSE]
+    assert _complete(skipper, 0) == [1]
+    assert skipper.must_hold(0)
+    assert _complete(skipper, 0) == [3]
+    assert not skipper.must_hold(0)
+    assert _complete(skipper, 0) == []
+
+
+def test_detect_every_infers_every_kth_frame(clock):
+    skipper = AdaptiveFrameSkipper(1, detect_every=3)
+    decisions = []
+    for _ in range(7):
+        decisions.append(skipper.decide(0, 0))
+        if decisions[-1] == INFER:
+            _complete(skipper, 0)
+    assert decisions == [INFER, REUSE, REUSE, INFER, REUSE, REUSE, INFER]
+
+
+def test_gate_caches_static_frames_once_there_is_a_result(clock):
+    gate = StaticGate()
+    skipper = AdaptiveFrameSkipper(1, gate=gate)
+    frame = np.zeros((4, 4, 3), np.uint8)
+    assert skipper.decide(0, 0, frame) == INFER
+    assert gate.commits == 1
+    _complete(skipper, 0)
+    # Static frames carry the last result forward however old it is
+    clock.advance(100.0)
+    assert skipper.decide(0, 0, frame) == CACHED
+    assert gate.commits == 1
+    # Without a frame to compare there is nothing to gate
+    assert skipper.decide(0, 0) == INFER
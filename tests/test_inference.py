@@ -0,0 +1,118 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import time
+
+import numpy as np
+import pytest
+from openvino.inference_engine import IENetwork, IEPlugin
+
+from faas_common.batching import FrameBatcher
+from faas_common.inference import InferRequestRing, next_frame_timeout
+
+
+def _ring(num_requests):
+    net = IENetwork()
+    return InferRequestRing(IEPlugin(device="CPU").load(network=net, num_requests=num_requests), num_requests), net
+
+
+def test_ready_does_not_wait_for_the_oldest_request():
+    ring, net = _ring(2)
+    assert not ring.ready()
+    inputs = {"data": np.zeros(net.inputs["data"].shape, np.uint8)}
+    ring.submit(inputs, "first")
+    ring.submit(inputs, "second")
+    assert ring.full() and not ring.ready()
+    time.sleep(0.1)
+    assert ring.ready()
+    assert ring.collect()[0] == "first"
+    assert ring.ready()
+    assert ring.collect()[0] == "second"
+    assert not ring.ready() and not ring.pending()
+
+
+def test_batches_filled_in_place_are_not_copied():
+    net = IENetwork()
+    exec_net = IEPlugin(device="CPU").load(network=net, num_requests=3)
+    ring = InferRequestRing(exec_net, 2)
+    batcher = FrameBatcher(1, 0, buffers=ring.input_buffers("data"))
+    copies = []
+    exec_net.start_async = lambda request_id, inputs: copies.append(request_id)
+    for value in range(1, 6):
+        if ring.full():
+            ring.collect()
+        batcher.add(np.full(net.inputs["data"].shape[1:], value, np.float32), value)
+        batch, userdata = batcher.take()
+        request_id = ring.submit({"data": batch}, userdata)
+        assert exec_net.requests[request_id].inputs["data"][0, 0, 0, 0] == value
+    assert copies == []
+    # A batch in a buffer of its own is copied into the request
+    ring.collect()
+    ring.submit({"data": np.zeros(net.inputs["data"].shape, np.float32)})
+    assert len(copies) == 1
+
+
+def test_input_buffers_need_a_spare_request():
+    ring, _ = _ring(2)
+    with pytest.raises(AssertionError):
+        ring.input_buffers("data")
+
+
+def test_time_to_result_is_half_the_expected_latency(clock):
+    ring, net = _ring(2)
+    inputs = {"data": np.zeros(net.inputs["data"].shape, np.uint8)}
+    assert ring.time_to_result() is None
+    ring.submit(inputs)
+    # Nothing to expect before the first result
+    assert ring.time_to_result() == 0.0
+    clock.advance(0.04)
+    ring.collect()
+    ring.submit(inputs)
+    assert np.isclose(ring.time_to_result(), 0.02)
+    clock.advance(0.03)
+    assert ring.time_to_result() == 0.0
+    ring.collect()
+    assert np.isclose(ring.latency, 0.04 + 0.2 * (0.03 - 0.04))
+
+
+def test_next_frame_timeout(clock):
+    ring, net = _ring(2)
+    inputs = {"data": np.zeros(net.inputs["data"].shape, np.uint8)}
+    batcher = FrameBatcher(2, max_wait=0.01, shape=(3, 2, 2))
+    assert next_frame_timeout(ring, batcher) is None
+    ring.latency = 0.1
+    ring.submit(inputs)
+    assert np.isclose(next_frame_timeout(ring, batcher), 0.05)
+    batcher.add(np.zeros((3, 2, 2), np.uint8))
+    assert np.isclose(next_frame_timeout(ring, batcher), 0.01)
+    # A result that is in already is taken without waiting for a frame
+    time.sleep(0.1)
+    assert next_frame_timeout(ring, batcher) == 0.0
@@ -0,0 +1,129 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import json
+
+import pytest
+
+from faas_common.kinesis import KinesisSink, PARTITION_FRAME, PARTITION_FIXED, MAX_REQUEST_BYTES
+from faas_common.publisher import Report
+
+
+class ScriptedRandom(object):
+    """Stand-in for the random module of the stub client, returning the given draws in turn."""
+
+    def __init__(self, draws):
+        self.draws = list(draws)
+
+    def random(self):
+        return self.draws.pop(0)
+
+
+def _report(frame_id, stream_id=0, **fields):
+    return Report(dict(fields, frame_id=frame_id, stream_id=stream_id), None, None)
+
+
+def _requests(client):
+    """Return the records of every put_records call, as lists of (frame_id, partition key)."""
+    return [[(json.loads(record["Data"])["frame_id"], record["PartitionKey"]) for record in kwargs["Records"]]
+            for _, kwargs in client.calls]
+
+
+@pytest.fixture
+def client(boto3_stub):
+    client = boto3_stub.client("kinesis")
+    client.calls = []
+    return client
+
+
+def test_only_failed_entries_are_sent_again(client, boto3_stub, monkeypatch):
+    sink = KinesisSink(client, "stream", max_records=4, max_delay=60, backoff=0)
+    # Entries 1 and 3 of the first request are throttled, the retry goes through
+    monkeypatch.setattr(boto3_stub, "FAILURE_RATE", 0.5)
+    monkeypatch.setattr(boto3_stub, "random", ScriptedRandom([0.9, 0.1, 0.9, 0.1, 0.9, 0.9]))
+    for frame_id in range(4):
+        sink(_report(frame_id))
+    assert _requests(client) == [[(0, "0"), (1, "0"), (2, "0"), (3, "0")], [(1, "0"), (3, "0")]]
+    stats = sink.stats()
+    assert (stats["records"], stats["requests"], stats["retried"], stats["pending"]) == (4, 2, 2, 0)
+
+
+def test_failed_entries_are_kept_in_order_for_the_next_flush(client, boto3_stub, monkeypatch):
+    sink = KinesisSink(client, "stream", max_records=3, max_delay=60, attempts=1)
+    monkeypatch.setattr(boto3_stub, "FAILURE_RATE", 0.5)
+    monkeypatch.setattr(boto3_stub, "random", ScriptedRandom([0.1, 0.9, 0.1]))
+    for frame_id in range(2):
+        sink(_report(frame_id))
+    with pytest.raises(IOError):
+        sink(_report(2))
+    monkeypatch.setattr(boto3_stub, "FAILURE_RATE", 0.0)
+    sink.close()
+    assert _requests(client)[1] == [(0, "0"), (2, "0")]
+
+
+def test_requests_are_split_at_the_record_and_byte_limits(client):
+    sink = KinesisSink(client, "stream", max_delay=60)
+    for frame_id in range(1000):
+        sink(_report(frame_id))
+    assert [len(records) for records in _requests(client)] == [500, 500]
+    del client.calls[:]
+    # Records of 0.9 MB, the sixth pushes the backlog past the 5 MB of a request
+    for frame_id in range(6):
+        sink(_report(frame_id, padding="x" * 900000))
+    assert [len(records) for records in _requests(client)] == [5, 1]
+    assert all(sum(len(record["Data"]) + len(record["PartitionKey"]) for record in kwargs["Records"])
+               <= MAX_REQUEST_BYTES for _, kwargs in client.calls)
+
+
+def test_partition_keys(client):
+    for partition, keys in ((None, ["0", "1", "0"]), (PARTITION_FRAME, ["7", "8", "9"]),
+                            (PARTITION_FIXED, ["camera", "camera", "camera"])):
+        del client.calls[:]
+        options = {"partition": partition, "partition_key": "camera"} if partition else {}
+        sink = KinesisSink(client, "stream", max_records=3, max_delay=60, **options)
+        for frame_id, stream_id in ((7, 0), (8, 1), (9, 0)):
+            sink(_report(frame_id, stream_id))
+        assert [key for _, key in _requests(client)[0]] == keys
+
+
+def test_oldest_records_are_dropped_beyond_max_pending(client, boto3_stub, monkeypatch):
+    sink = KinesisSink(client, "stream", max_records=2, max_delay=60, attempts=1, max_pending=3)
+    monkeypatch.setattr(boto3_stub, "FAILURE_RATE", 1.0)
+    sink(_report(0))
+    # Every report from the second on fills a request that fails
+    for frame_id in range(1, 6):
+        with pytest.raises(IOError):
+            sink(_report(frame_id))
+    assert (sink.dropped, len(sink.pending)) == (3, 3)
+    monkeypatch.setattr(boto3_stub, "FAILURE_RATE", 0.0)
+    del client.calls[:]
+    sink.close()
+    assert [frame_id for records in _requests(client) for frame_id, _ in records] == [3, 4, 5]
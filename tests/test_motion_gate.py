@@ -0,0 +1,95 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+from faas_common.motion_gate import MotionGate
+
+
+def _scene(value=100):
+    return np.full((480, 640, 3), value, np.uint8)
+
+
+def _gate(clock, **kwargs):
+    gate = MotionGate(2, **kwargs)
+    assert gate.changed(0, _scene())
+    gate.commit(0)
+    return gate
+
+
+def test_first_frame_of_a_stream_counts_as_changed(clock):
+    gate = _gate(clock)
+    assert not gate.changed(0, _scene())
+    assert gate.changed(1, _scene())
+
+
+def test_threshold_on_the_share_of_changed_pixels(clock):
+    gate = _gate(clock, threshold=0.01)
+    frame = _scene()
+    # A 20x20 object covers about 0.1% of the thumbnail, a 100x100 one about 3%
+    frame[200:220, 300:320] = 250
+    assert not gate.changed(0, frame)
+    frame[200:300, 300:400] = 250
+    assert gate.changed(0, frame)
+    assert 0.02 < gate.changes[0] < 0.05
+
+
+def test_small_level_changes_do_not_count(clock):
+    gate = _gate(clock, pixel_threshold=25)
+    assert not gate.changed(0, _scene(120))
+    assert gate.changed(0, _scene(130))
+
+
+def test_reference_moves_only_on_commit(clock):
+    gate = _gate(clock)
+    assert gate.changed(0, _scene(200))
+    assert gate.changed(0, _scene(200))
+    gate.commit(0)
+    assert not gate.changed(0, _scene(200))
+    assert gate.changed(0, _scene())
+
+
+def test_refresh_renews_static_scenes(clock):
+    gate = _gate(clock, refresh=60.0)
+    clock.advance(59.0)
+    assert not gate.changed(0, _scene())
+    clock.advance(1.0)
+    assert gate.changed(0, _scene())
+    gate.commit(0)
+    assert not gate.changed(0, _scene())
+
+
+def test_grayscale_frames(clock):
+    gate = MotionGate(1)
+    assert gate.changed(0, np.zeros((480, 640), np.uint8))
+    gate.commit(0)
+    assert not gate.changed(0, np.zeros((480, 640), np.uint8))
+    assert gate.changed(0, np.full((480, 640), 255, np.uint8))
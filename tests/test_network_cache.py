@@ -0,0 +1,140 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import errno
+import os
+
+import pytest
+from openvino import inference_engine
+from openvino.inference_engine import IEPlugin
+
+from faas_common import network_cache
+from faas_common.network_cache import NetworkCache, load_network
+
+
+@pytest.fixture
+def model_xml(tmpdir):
+    tmpdir.join("model.xml").write("<net/>")
+    tmpdir.join("model.bin").write("weights")
+    return str(tmpdir.join("model.xml"))
+
+
+def _load(model_xml, cache, batch_size=1, plugin_dir=None):
+    return load_network(IEPlugin(device="CPU"), model_xml, "CPU", 2, batch_size, None, cache, plugin_dir=plugin_dir)
+
+
+def test_second_load_imports_the_exported_network(tmpdir, model_xml):
+    cache = NetworkCache(str(tmpdir.join("cache")), 1 << 20)
+    _, input_blob, out_blob, shape, timings = _load(model_xml, cache, batch_size=4)
+    assert timings["cache"] == "miss"
+    exec_net, cached_input, cached_out, cached_shape, timings = _load(model_xml, cache, batch_size=4)
+    assert timings["cache"] == "hit"
+    assert (cached_input, cached_out, cached_shape) == (input_blob, out_blob, shape)
+    assert shape[0] == 4 and exec_net.batch_size == 4 and len(exec_net.requests) == 2
+
+
+def test_batch_size_is_part_of_the_key(tmpdir, model_xml):
+    cache = NetworkCache(str(tmpdir.join("cache")), 1 << 20)
+    _load(model_xml, cache, batch_size=1)
+    assert _load(model_xml, cache, batch_size=2)[4]["cache"] == "miss"
+
+
+def test_device_without_export(tmpdir, model_xml, monkeypatch):
+    monkeypatch.setattr(inference_engine, "EXPORT_SUPPORTED", False)
+    cache_dir = tmpdir.join("cache")
+    for _ in range(2):
+        assert _load(model_xml, NetworkCache(str(cache_dir), 1 << 20))[4]["cache"] == "unsupported"
+    assert cache_dir.listdir() == []
+
+
+def test_unreadable_entry_is_compiled_again(tmpdir, model_xml):
+    cache = NetworkCache(str(tmpdir.join("cache")), 1 << 20)
+    _load(model_xml, cache)
+    blob = [path for path in tmpdir.join("cache").listdir() if path.ext == ".blob"][0]
+    blob.write('{"kind": "another device", "batch_size": 1}')
+    assert _load(model_xml, cache)[4]["cache"] == "miss"
+    assert _load(model_xml, cache)[4]["cache"] == "hit"
+
+
+def test_corrupt_metadata_is_compiled_again(tmpdir, model_xml):
+    cache = NetworkCache(str(tmpdir.join("cache")), 1 << 20)
+    _load(model_xml, cache)
+    [path for path in tmpdir.join("cache").listdir() if path.ext == ".json"][0].write("{")
+    assert _load(model_xml, cache)[4]["cache"] == "miss"
+    assert _load(model_xml, cache)[4]["cache"] == "hit"
+
+
+def test_unwritable_cache_dir_does_not_fail_the_load(tmpdir, model_xml):
+    # A file in place of the directory fails like a read-only mount, even for root
+    tmpdir.join("cache").write("")
+    for _ in range(2):
+        exec_net, _, _, _, timings = _load(model_xml, NetworkCache(str(tmpdir.join("cache")), 1 << 20))
+        assert timings["cache"] == "error"
+        assert len(exec_net.requests) == 2
+
+
+def test_full_disk_leaves_no_partial_entry(tmpdir, model_xml, monkeypatch):
+    def rename(source, target):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(os, "rename", rename)
+    assert _load(model_xml, NetworkCache(str(tmpdir.join("cache")), 1 << 20))[4]["cache"] == "error"
+    assert tmpdir.join("cache").listdir() == []
+
+
+def test_plugin_dir_bypasses_the_cache(tmpdir, model_xml, monkeypatch):
+    def core():
+        raise AssertionError("IECore cannot load plugins from a plugin directory")
+
+    monkeypatch.setattr(network_cache, "IECore", core)
+    cache_dir = tmpdir.join("cache")
+    exec_net, _, _, _, timings = _load(model_xml, NetworkCache(str(cache_dir), 1 << 20), plugin_dir="/opt/plugins")
+    assert timings["cache"] == "unsupported" and "export" not in timings
+    assert len(exec_net.requests) == 2
+    assert not cache_dir.exists()
+
+
+def test_without_cache(model_xml):
+    assert _load(model_xml, None)[4]["cache"] == "disabled"
+
+
+def test_least_recently_used_entries_are_evicted(tmpdir):
+    def export(path):
+        with open(path, "w") as blob:
+            blob.write("x" * 100)
+
+    cache = NetworkCache(str(tmpdir), 250)
+    for age, key in enumerate(("a", "b", "c")):
+        cache.put(key, export, {})
+        for path in cache._paths(key):
+            os.utime(path, (1000 + age, 1000 + age))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
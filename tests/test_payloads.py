@@ -0,0 +1,58 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+from faas_common import payloads
+from faas_common.payloads import PayloadCodec, decode_payload, CODEC_MSGPACK, CODEC_PACKED
+
+
+def test_msgpack_without_the_package_fails(monkeypatch):
+    monkeypatch.setattr(payloads, "msgpack", None)
+    with pytest.raises(ImportError):
+        PayloadCodec(CODEC_MSGPACK)
+
+
+def test_msgpack_fallback_is_opt_in(monkeypatch):
+    monkeypatch.setattr(payloads, "msgpack", None)
+    codec = PayloadCodec(CODEC_MSGPACK, fallback=CODEC_PACKED)
+    assert codec.codec == CODEC_PACKED and codec.binary
+
+
+def test_packed_round_trip():
+    payload = OrderedDict([("Object0", {"label": 3, "confidence": 0.55, "xmin": 0.21, "ymin": 0.63, "xmax": 0.24,
+                                        "ymax": 0.83, "class": "car"}),
+                           ("timestamp", "2018-11-05T10:30:00"), ("stream_id", 0)])
+    message = PayloadCodec(CODEC_PACKED).encode(payload)
+    assert message[:1] == b"P"
+    assert decode_payload(message) == payload
@@ -0,0 +1,88 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import threading
+import time
+
+import pytest
+
+from faas_common.bounded_queue import DROP_OLDEST, DROP_NEWEST, BLOCK
+from faas_common.publisher import Publisher, FakeSink
+
+
+def _stalled_publisher(overflow):
+    sink = FakeSink(gate=threading.Event())
+    publisher = Publisher([("sink", sink)], queue_size=2, overflow=overflow)
+    publisher.publish(1)
+    assert sink.started.wait(5)
+    # The worker is stuck on report 1, reports 2 and 3 fill the queue
+    publisher.publish(2)
+    publisher.publish(3)
+    return publisher, sink
+
+
+@pytest.mark.parametrize("overflow, delivered", [(DROP_OLDEST, [1, 3, 4]), (DROP_NEWEST, [1, 2, 3])])
+def test_dropping_overflow(overflow, delivered):
+    publisher, sink = _stalled_publisher(overflow)
+    publisher.publish(4)
+    assert publisher.dropped() == 1
+    sink.gate.set()
+    publisher.close(5)
+    assert sink.payloads() == delivered
+    stats = publisher.stats()["sink"]
+    assert (stats["sent"], stats["dropped"], stats["high_watermark"]) == (3, 1, 2)
+
+
+def test_block_overflow_waits_for_the_sink():
+    publisher, sink = _stalled_publisher(BLOCK)
+    producer = threading.Thread(target=publisher.publish, args=(4,))
+    producer.start()
+    time.sleep(0.1)
+    assert producer.is_alive()
+    sink.gate.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    publisher.close(5)
+    assert sink.payloads() == [1, 2, 3, 4]
+    assert publisher.dropped() == 0
+
+
+def test_failing_sink_does_not_stop_the_others():
+    def failing(report):
+        raise IOError("connection refused")
+
+    sink = FakeSink(delay=0.01)
+    publisher = Publisher([("failing", failing), ("sink", sink)])
+    for payload in range(3):
+        publisher.publish(payload)
+    publisher.close(5)
+    assert sink.payloads() == [0, 1, 2]
+    assert publisher.stats()["failing"]["failed"] == 3
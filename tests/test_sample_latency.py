@@ -0,0 +1,52 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import pytest
+
+import sample_benchmark
+
+
+def _latency_ms(name, fps, frames):
+    args = sample_benchmark.build_argparser().parse_args(
+        ["-n", str(frames), "-fps", str(fps), "-fw", "320", "-fh", "240", "--latency", "0.01",
+         "--latency_per_frame", "0", "--timeout", "60"])
+    result = sample_benchmark.run_sample(name, args)
+    assert result["exit_status"] == 0 and result["frames_inferred"] == frames
+    return result["latency_ms"]
+
+
+@pytest.mark.parametrize("name", list(sample_benchmark.SAMPLES))
+def test_result_latency_does_not_depend_on_the_input_fps(name):
+    # Inference takes 10 ms, a result must not wait for the frame after it, 500 ms later at 2 fps
+    slow = _latency_ms(name, 2, 5)
+    fast = _latency_ms(name, 20, 20)
+    assert slow["p95"] < 100
+    assert abs(slow["p50"] - fast["p50"]) < 50
@@ -0,0 +1,116 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+import cv2
+import pytest
+from synthetic_video import SyntheticVideoCapture
+
+from faas_common.streams import MultiStreamCapture
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    """Make cv2.VideoCapture open synthetic 320x240 sources of 3 frames paced at 5 fps."""
+    monkeypatch.setattr(cv2, "VideoCapture", SyntheticVideoCapture)
+    for name, value in (("BENCH_FRAMES", "3"), ("BENCH_FPS", "5"), ("BENCH_WIDTH", "320"), ("BENCH_HEIGHT", "240")):
+        monkeypatch.setenv(name, value)
+
+
+@pytest.mark.parametrize("decode_processes", [False, True])
+def test_read_times_out_between_frames(camera, decode_processes):
+    cap = MultiStreamCapture(["camera.mp4"], decode_processes=decode_processes).start()
+    try:
+        frame_ids = []
+        for _ in range(3):
+            ret, frame, frame_id, stream_id = cap.read()
+            assert ret and stream_id == 0
+            frame_ids.append(frame_id)
+            cap.release(stream_id, frame)
+            if len(frame_ids) == 1:
+                # The next frame is decoded 0.2 seconds after the first one
+                start_time = time.time()
+                assert cap.read(0.05) == (None, None, None, None)
+                assert 0.04 <= time.time() - start_time < 0.15
+        assert frame_ids == [1, 2, 3]
+        assert cap.read(1.0)[0] is False
+        assert cap.read(0)[0] is False
+    finally:
+        cap.stop()
+
+
+def test_zero_timeout_polls(camera):
+    cap = MultiStreamCapture(["first.mp4", "second.mp4"]).start()
+    try:
+        served = set()
+        while len(served) < 2:
+            ret, frame, _, stream_id = cap.read(0)
+            if ret:
+                served.add(stream_id)
+            else:
+                assert ret is None
+                time.sleep(0.01)
+    finally:
+        cap.stop()
+
+
+def test_forked_decoders_wait_for_start(camera):
+    cap = MultiStreamCapture(["first.mp4", "second.mp4"], decode_processes=True).fork_decoders()
+    try:
+        assert all(stream.process.is_alive() for stream in cap.streams)
+        # Nothing is decoded before the capture is started
+        for stream in cap.streams:
+            with pytest.raises(Empty):
+                stream.ring.get(timeout=0.3)
+        cap.start()
+        frame_ids = [[], []]
+        while True:
+            ret, frame, frame_id, stream_id = cap.read(1.0)
+            if ret is False:
+                break
+            assert ret
+            frame_ids[stream_id].append(frame_id)
+            cap.release(stream_id, frame)
+        assert frame_ids == [[1, 2, 3], [1, 2, 3]]
+    finally:
+        cap.stop()
+
+
+def test_stop_before_start_ends_forked_decoders(camera):
+    cap = MultiStreamCapture(["camera.mp4"], decode_processes=True).fork_decoders()
+    cap.stop()
+    assert not cap.streams[0].process.is_alive()
+    assert cap.streams[0].process.exitcode == 0
@@ -0,0 +1,103 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy as np
+
+from faas_common.detections import DETECTION_DTYPE
+from faas_common.tracking import IouTracker
+
+
+def _detections(*objects):
+    """Build detections from (label, xmin, ymin, size) tuples of square boxes."""
+    detections = np.zeros(len(objects), dtype=DETECTION_DTYPE)
+    for index, (label, xmin, ymin, size) in enumerate(objects):
+        detections[index] = (label, 0.9, xmin, ymin, xmin + size, ymin + size)
+    return detections
+
+
+def test_moving_object_keeps_its_track_id():
+    tracker = IouTracker()
+    ids = []
+    for frame_id in range(5):
+        tracked, track_ids = tracker.step(_detections((1, 0.1 + 0.02 * frame_id, 0.1, 0.2)))
+        ids.extend(track_ids.tolist())
+    assert ids == [1] * 5
+
+
+def test_objects_too_far_to_overlap_match_by_centroid():
+    tracker = IouTracker(max_distance=0.1)
+    tracker.step(_detections((1, 0.1, 0.1, 0.05)))
+    assert tracker.step(_detections((1, 0.18, 0.1, 0.05)))[1].tolist() == [1]
+    assert tracker.step(_detections((1, 0.4, 0.1, 0.05)))[1].tolist() == [2]
+
+
+def test_labels_are_never_mixed_up():
+    tracker = IouTracker()
+    tracker.step(_detections((1, 0.1, 0.1, 0.2), (2, 0.5, 0.5, 0.2)))
+    tracked, track_ids = tracker.step(_detections((2, 0.1, 0.1, 0.2), (1, 0.5, 0.5, 0.2)))
+    assert sorted(track_ids.tolist()) == [3, 4]
+
+
+def test_tracks_coast_at_their_velocity_between_detections():
+    tracker = IouTracker(alpha=0.5)
+    tracker.step(_detections((1, 0.1, 0.1, 0.2)))
+    tracker.step(_detections((1, 0.14, 0.1, 0.2)))
+    # Half of the measured 0.04 per frame, blended with the initial zero velocity
+    tracked, track_ids = tracker.step()
+    assert track_ids.tolist() == [1]
+    assert np.isclose(tracked["xmin"][0], 0.16) and np.isclose(tracked["ymin"][0], 0.1)
+    tracked, _ = tracker.step()
+    assert np.isclose(tracked["xmin"][0], 0.18)
+    # The velocity is measured over all the frames since the last detection
+    tracker.step(_detections((1, 0.26, 0.1, 0.2)))
+    assert np.isclose(tracker.velocities[0, 0], 0.5 * 0.04 + 0.5 * 0.02)
+
+
+def test_coasting_boxes_stay_in_the_frame():
+    tracker = IouTracker(alpha=1.0)
+    tracker.step(_detections((1, 0.7, 0.1, 0.2)))
+    tracker.step(_detections((1, 0.79, 0.1, 0.2)))
+    for _ in range(3):
+        tracked, _ = tracker.step()
+    assert tracked["xmax"][0] == 1.0
+
+
+def test_missed_tracks_are_hidden_then_dropped():
+    tracker = IouTracker(max_missed=2)
+    detection = _detections((1, 0.1, 0.1, 0.2))
+    tracker.step(detection)
+    # Unmatched tracks are not reported, but come back with their id when detected again
+    assert len(tracker.step(_detections())[0]) == 0
+    assert tracker.step(detection)[1].tolist() == [1]
+    for _ in range(3):
+        assert len(tracker.step(_detections())[0]) == 0
+    assert len(tracker.ids) == 0
+    assert tracker.step(detection)[1].tolist() == [2]
@@ -0,0 +1,99 @@
+"""
+BSD 3-clause "New" or "Revised" license
+
+Copyright (C) 2018 Intel Coporation.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import datetime
+import io
+import tarfile
+
+import pytest
+
+from faas_common.publisher import Report
+from faas_common.uploads import S3Uploader
+
+
+def _report(second):
+    return Report({}, None, datetime.datetime(2018, 11, 5, 10, 30, second))
+
+
+def _uploads(client):
+    """Return the (key, content type, body) of every upload the client was called with."""
+    return [(kwargs["Key"], kwargs["ExtraArgs"]["ContentType"], kwargs["Fileobj"].read())
+            for _, kwargs in client.calls]
+
+
+@pytest.fixture
+def client(boto3_stub):
+    client = boto3_stub.client("s3")
+    client.calls = []
+    return client
+
+
+def test_single_snapshot_is_uploaded_as_jpeg(client):
+    S3Uploader(client, "bucket")(_report(0), b"jpeg")
+    assert _uploads(client) == [("2018-11-05_10:30:00.jpeg", "image/jpeg", b"jpeg")]
+    assert client.calls[0][1]["Bucket"] == "bucket"
+
+
+def test_batch_is_named_after_its_first_snapshot_and_count(client):
+    uploader = S3Uploader(client, "bucket", batch_size=3, max_delay=60)
+    for second in range(3):
+        uploader(_report(second), b"jpeg%d" % second)
+    [(key, content_type, body)] = _uploads(client)
+    assert (key, content_type) == ("2018-11-05_10:30:00_3.tar", "application/x-tar")
+    archive = tarfile.open(fileobj=io.BytesIO(body))
+    assert [(member.name, archive.extractfile(member).read()) for member in archive.getmembers()] == \
+        [("2018-11-05_10:30:0%d.jpeg" % second, b"jpeg%d" % second) for second in range(3)]
+
+
+def test_failed_upload_is_retried_and_kept(client, boto3_stub):
+    uploader = S3Uploader(client, "bucket", attempts=3, backoff=0)
+    boto3_stub.FAILURE_RATE = 1.0
+    with pytest.raises(IOError):
+        uploader(_report(0), b"jpeg0")
+    assert (uploader.requests, uploader.retries, uploader.pending()) == (3, 2, 1)
+    # The snapshot kept from the failed upload goes first once S3 is reachable again
+    boto3_stub.FAILURE_RATE = 0.0
+    uploader(_report(1), b"jpeg1")
+    assert [key for key, _, _ in _uploads(client)[3:]] == ["2018-11-05_10:30:00.jpeg", "2018-11-05_10:30:01.jpeg"]
+    assert (uploader.uploaded, uploader.pending(), uploader.pending_bytes) == (2, 0, 0)
+
+
+def test_oldest_snapshots_are_dropped_beyond_max_pending(client, boto3_stub):
+    uploader = S3Uploader(client, "bucket", attempts=1, max_pending_bytes=250)
+    boto3_stub.FAILURE_RATE = 1.0
+    for second in range(4):
+        with pytest.raises(IOError):
+            uploader(_report(second), b"x" * 100)
+    assert (uploader.dropped, uploader.pending(), uploader.pending_bytes) == (2, 2, 200)
+    boto3_stub.FAILURE_RATE = 0.0
+    del client.calls[:]
+    uploader.close()
+    assert [key for key, _, _ in _uploads(client)] == ["2018-11-05_10:30:02.jpeg", "2018-11-05_10:30:03.jpeg"]